@@ -1,13 +1,46 @@
 # app/__init__.py
 
 from flask import Flask
-from flask_mysqldb import MySQL
 from flask_cors import CORS
 from config import get_config
+from services.db_pool import MySQLPool
+from services.live_feed import LiveFeed
+from services.metrics import Metrics
+from services.query_profiler import QueryProfiler
+from services.response_cache import ResponseCache
+from services.serialization import MsgspecJSONProvider, mysql_conversions
+from services.thresholds import ThresholdRules
+from services.token_versions import TokenVersions
+from services.user_cache import UserCache
+from services.write_buffer import WriteBuffer
 import os
 
-# Initialize MySQL
-mysql = MySQL()
+# Pooled MySQL connections, checked out per app context
+mysql = MySQLPool()
+
+# Write-behind buffer for single-reading ingest (disabled unless configured)
+write_buffer = WriteBuffer()
+
+# Cache of authenticated users so token_required skips the users table when warm
+user_cache = UserCache()
+
+# Token versions for revoking stateless JWTs
+token_versions = TokenVersions()
+
+# Warning thresholds, compiled once per process and reloaded when they change
+threshold_rules = ThresholdRules()
+
+# Read-through cache for dashboard responses, invalidated by sensor_data writes
+response_cache = ResponseCache()
+
+# Fan-out of newly inserted readings to /data/stream subscribers
+live_feed = LiveFeed()
+
+# Prometheus request and query metrics served at /metrics
+metrics = Metrics()
+
+# Opt-in per-request SQL profiling and slow-query capture
+query_profiler = QueryProfiler()
 
 def create_app():
     app = Flask(__name__)
@@ -16,6 +49,11 @@ def create_app():
     config = get_config()
     app.config.from_object(config)
 
+    # Encode responses with msgspec, and have MySQLdb return TIME columns as
+    # time-of-day values that encode as HH:MM:SS
+    app.json = MsgspecJSONProvider(app)
+    app.config.setdefault('MYSQL_CUSTOM_OPTIONS', {}).setdefault('conv', mysql_conversions())
+
     # Enable CORS with proper configuration
     CORS(app, 
          resources={r"/*": {
@@ -30,9 +68,21 @@ def create_app():
 
     # Initialize MySQL
     mysql.init_app(app)
+    write_buffer.init_app(app)
+    user_cache.init_app(app)
+    token_versions.init_app(app)
+    threshold_rules.init_app(app)
+    response_cache.init_app(app)
+    live_feed.init_app(app)
+    metrics.init_app(app)
+    query_profiler.init_app(app)
 
     # Register Blueprints
     from routes import api
     app.register_blueprint(api)
 
+    # Register CLI commands
+    from commands import register_commands
+    register_commands(app)
+
     return app
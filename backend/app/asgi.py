@@ -0,0 +1,91 @@
+# app/asgi.py
+#
+# Async serving mode. The read endpoints run as coroutines on an aiomysql
+# pool (routes/async_reads.py); every other route is handed to the regular
+# Flask app in a worker thread. Serve with hypercorn:
+#
+#   hypercorn asgi:app --bind 0.0.0.0:5000 --workers 2
+
+import asyncio
+
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from quart import Quart, request
+from werkzeug.exceptions import HTTPException
+
+from app import create_app, live_feed, metrics, write_buffer
+from config import get_config
+from services.async_db import AsyncMySQL
+from services.live_feed import AsyncLiveFeed
+from services.serialization import MsgspecJSONProvider
+
+# Largest request body passed through to the Flask app (batch ingest)
+WSGI_MAX_BODY_SIZE = 16 * 1024 * 1024
+
+
+class ReadSplitter:
+    """ASGI app sending requests the async app has a route for to it, and
+    everything else (writes, auth, /warnings, /stats, preflights) to Flask."""
+
+    def __init__(self, async_app, wsgi_app):
+        self.async_app = async_app
+        self.wsgi_app = AsyncioWSGIMiddleware(wsgi_app, max_body_size=WSGI_MAX_BODY_SIZE)
+        self.routes = async_app.url_map.bind('localhost')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and not self._is_async_route(scope):
+            await self.wsgi_app(scope, receive, send)
+        else:
+            # Async reads, plus lifespan events so the pool starts and stops
+            await self.async_app(scope, receive, send)
+
+    def _is_async_route(self, scope):
+        if scope['method'] == 'OPTIONS':
+            return False
+        try:
+            self.routes.match(scope['path'], method=scope['method'])
+        except HTTPException:
+            return False
+        return True
+
+
+def create_async_app():
+    async_app = Quart(__name__)
+    async_app.config.from_object(get_config())
+    async_app.json = MsgspecJSONProvider(async_app)
+
+    db = AsyncMySQL(async_app)
+    feed = AsyncLiveFeed(live_feed, db)
+    async_app.extensions['async_mysql'] = db
+    async_app.extensions['async_live_feed'] = feed
+    metrics.init_app(async_app)
+
+    @async_app.before_serving
+    async def start():
+        await db.start()
+        feed.start()
+
+    @async_app.after_serving
+    async def stop():
+        await feed.stop()
+        await db.close()
+        # Flush readings the Flask ingest routes buffered in this process
+        await asyncio.to_thread(write_buffer.stop)
+
+    @async_app.after_request
+    async def add_cors_headers(response):
+        # Same policy the Flask app applies with flask_cors
+        origin = request.headers.get('Origin')
+        if origin and origin == async_app.config['CORS_ORIGIN']:
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers['Access-Control-Allow-Credentials'] = 'true'
+            response.vary.add('Origin')
+        return response
+
+    from routes.async_reads import api
+    async_app.register_blueprint(api)
+    return async_app
+
+
+def create_asgi_app():
+    flask_app = create_app()
+    return ReadSplitter(create_async_app(), flask_app)
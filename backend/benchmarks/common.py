@@ -0,0 +1,157 @@
+# benchmarks/common.py
+
+import random
+import socket
+import statistics
+import subprocess
+import time
+from datetime import datetime, timedelta
+
+import MySQLdb
+
+from config import get_config
+
+LOCATIONS = [f'LOC{i:03d}' for i in range(50)]
+COLUMNS = ('location', 'ph_value', 'temperature', 'turbidity', 'date', 'time', 'recorded_at')
+
+# Tables the API needs, for benchmarking against an empty database. The
+# column order of users matters: the routes read it with SELECT *.
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        firstname VARCHAR(255) NOT NULL,
+        lastname VARCHAR(255) NOT NULL,
+        username VARCHAR(255) NOT NULL UNIQUE,
+        password VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL,
+        user_type VARCHAR(50) NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sensor_data (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        location VARCHAR(255) NOT NULL,
+        ph_value DOUBLE NOT NULL,
+        temperature DOUBLE NOT NULL,
+        turbidity DOUBLE NOT NULL,
+        date DATE NOT NULL,
+        time TIME NOT NULL,
+        recorded_at DATETIME NULL
+    )
+    """,
+]
+
+
+def connect(database=None):
+    config = get_config()
+    return MySQLdb.connect(
+        host=config.MYSQL_HOST,
+        user=config.MYSQL_USER,
+        passwd=config.MYSQL_PASSWORD,
+        db=database or config.MYSQL_DB
+    )
+
+
+def create_database(name):
+    """Create the database `name` with the API's tables and sensor_data indexes."""
+    from commands import SENSOR_DATA_INDEXES
+
+    config = get_config()
+    conn = MySQLdb.connect(host=config.MYSQL_HOST, user=config.MYSQL_USER, passwd=config.MYSQL_PASSWORD)
+    cur = conn.cursor()
+    cur.execute(f"CREATE DATABASE IF NOT EXISTS `{name}`")
+    cur.execute(f"USE `{name}`")
+    for statement in SCHEMA:
+        cur.execute(statement)
+    cur.execute("SHOW INDEX FROM sensor_data")
+    existing = {row[2] for row in cur.fetchall()}
+    for index, columns in SENSOR_DATA_INDEXES.items():
+        if index not in existing:
+            cur.execute(f"ALTER TABLE sensor_data ADD INDEX {index} {columns}")
+    cur.close()
+    conn.close()
+
+
+def create_scratch_table(conn, table):
+    """Create an empty copy of sensor_data (columns and indexes) to benchmark against."""
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {table}")
+    cur.execute(f"CREATE TABLE {table} LIKE sensor_data")
+    conn.commit()
+    cur.close()
+
+
+def grow_table(conn, table, target_rows, days=365, seed=42, chunk_size=5000, end=None):
+    """Add random readings until the table holds target_rows.
+
+    Timestamps are uniform over the `days` days before `end` (default now),
+    so growing a table in steps keeps the same distribution as seeding it in
+    one go. The seed is mixed with the current size so each step is
+    reproducible.
+    """
+    cur = conn.cursor()
+    cur.execute(f"SELECT COUNT(*) FROM {table}")
+    current = cur.fetchone()[0]
+    rng = random.Random(seed * 1_000_003 + current)
+    end = (end or datetime.now()).replace(microsecond=0)
+    span = days * 86400
+    placeholders = '(' + ', '.join(['%s'] * len(COLUMNS)) + ')'
+
+    while current < target_rows:
+        count = min(chunk_size, target_rows - current)
+        params = []
+        for _ in range(count):
+            recorded_at = end - timedelta(seconds=rng.randrange(span))
+            params.extend((
+                rng.choice(LOCATIONS),
+                round(rng.uniform(5, 10), 1),
+                round(rng.uniform(0, 35), 1),
+                round(rng.uniform(0, 10), 1),
+                recorded_at.strftime('%Y-%m-%d'),
+                recorded_at.strftime('%H:%M:%S'),
+                recorded_at
+            ))
+        cur.execute(
+            f"INSERT INTO {table} ({', '.join(COLUMNS)}) VALUES " + ', '.join([placeholders] * count),
+            params
+        )
+        conn.commit()
+        current += count
+    cur.close()
+
+
+def summarize(timings_ms):
+    ordered = sorted(timings_ms)
+    return {
+        'runs': len(ordered),
+        'min_ms': round(ordered[0], 3),
+        'p50_ms': round(statistics.median(ordered), 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+        'max_ms': round(ordered[-1], 3),
+    }
+
+
+def wait_for_port(process, port, timeout=30):
+    """Wait until a server started as `process` accepts connections on port."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited with status {process.returncode} before listening on port {port}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'Server did not start listening on port {port}')
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
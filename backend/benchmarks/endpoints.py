@@ -0,0 +1,421 @@
+# benchmarks/endpoints.py
+#
+# Benchmarks every API endpoint against a local MySQL seeded with the same
+# readings on every run, at several table sizes:
+#
+#   python -m benchmarks.endpoints --sizes 100000 1000000 10000000 \
+#       --output results/$(git rev-parse --short HEAD).json
+#   python -m benchmarks.endpoints --compare results/abc123.json results/def456.json
+#
+# Run from the backend directory. The harness creates its own database
+# (--database) on the MySQL server from the MYSQL_* settings, seeds it with
+# benchmarks.common.grow_table and serves the app from it with serve.py.
+# Readings are anchored to midnight of the run's day so the 24-hour windows
+# have data; the anchor and seed are written to the results. The response
+# cache and ETags are off so every request reaches the database. Install
+# the extra packages it needs (aiohttp, gunicorn, hypercorn) with
+# `pip install -r benchmarks/requirements.txt`; RSS is read from /proc, so
+# Linux only.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import aiohttp
+import jwt
+from werkzeug.security import generate_password_hash
+
+from benchmarks.common import LOCATIONS, connect, create_database, grow_table, stop_server, summarize, wait_for_port
+from config import get_config
+
+BENCH_USER = ('Bench', 'User', 'bench', 'bench@example.com', 'admin')
+
+
+def endpoints(anchor, days):
+    """(name, method, path, request factory) of every benchmarked request.
+
+    The factory returns the request's keyword arguments for aiohttp (json=,
+    data= or params=) and is None for requests without a body.
+    """
+    start, end = (anchor - timedelta(days=days)).date(), anchor.date()
+    location = LOCATIONS[0]
+    compared = ','.join(LOCATIONS[:4])
+
+    def reading(rng):
+        return {
+            'location': rng.choice(LOCATIONS),
+            'ph_value': round(rng.uniform(5, 10), 1),
+            'temperature': round(rng.uniform(0, 35), 1),
+            'turbidity': round(rng.uniform(0, 10), 1),
+        }
+
+    def stamped(rng):
+        now = datetime.now()
+        return dict(reading(rng), date=now.strftime('%Y-%m-%d'), time=now.strftime('%H:%M:%S'))
+
+    def as_strings(values):
+        return {key: str(value) for key, value in values.items()}
+
+    def batch(rng):
+        return {'json': [stamped(rng) for _ in range(100)]}
+
+    # /data and /all-data are paged: unpaged they return the whole table
+    return [
+        ('summary-insights', 'GET', '/summary-insights', None),
+        ('warnings', 'GET', '/warnings', None),
+        ('recent-data', 'GET', '/recent-data', None),
+        ('correlation-data', 'GET', f'/correlation-data?location={location}', None),
+        ('data', 'GET', '/data?limit=500', None),
+        ('data-location', 'GET', f'/data?limit=500&location={location}', None),
+        ('all-data', 'GET', '/all-data?limit=500', None),
+        ('graph-data', 'GET',
+         f'/graph-data?startDate={start}&endDate={end}&location={location}&dataType=temperature', None),
+        ('compare-graph-data', 'GET',
+         f'/compare-graph-data?startDate={start}&endDate={end}&locations={compared}&dataType=ph_value', None),
+        ('create-data', 'POST', '/create-data', lambda rng: {'json': reading(rng)}),
+        ('create-data-batch', 'POST', '/create-data/batch', batch),
+        # The unauthenticated device routes: JSON body, query string and form
+        ('test-create-data', 'POST', '/test-create-data', lambda rng: {'json': reading(rng)}),
+        ('test-create-data-url', 'GET', '/test-create-data-url',
+         lambda rng: {'params': as_strings(reading(rng))}),
+        ('data-old', 'POST', '/data-old', lambda rng: {'data': as_strings(stamped(rng))}),
+    ]
+
+
+class RssSampler:
+    """Samples the summed resident memory of a process and its descendants."""
+
+    def __init__(self, pid, interval=0.25):
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak_kb = self.sample()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def peak_mb(self):
+        return round(self.peak_kb / 1024, 1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_kb = max(self.peak_kb, self.sample())
+
+    def sample(self):
+        parents = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # The command name may contain spaces; fields after it are fixed
+                    fields = f.read().rsplit(')', 1)[1].split()
+                parents.setdefault(int(fields[1]), []).append(int(entry))
+            except (OSError, IndexError):
+                continue
+        total, pending = 0, [self.pid]
+        while pending:
+            pid = pending.pop()
+            pending.extend(parents.get(pid, []))
+            try:
+                with open(f'/proc/{pid}/status') as f:
+                    for line in f:
+                        if line.startswith('VmRSS:'):
+                            total += int(line.split()[1])
+                            break
+            except OSError:
+                continue
+        return total
+
+
+def seed(database, size, anchor, seed_value, days):
+    conn = connect(database)
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM sensor_data")
+    if cur.fetchone()[0] > size:
+        # Sizes run in ascending order, so this only happens on a reused database
+        cur.execute("TRUNCATE TABLE sensor_data")
+    started = time.monotonic()
+    grow_table(conn, 'sensor_data', size, days=days, seed=seed_value, end=anchor)
+    cur.execute("ANALYZE TABLE sensor_data")
+    cur.fetchall()
+    cur.close()
+    conn.close()
+    return round(time.monotonic() - started, 1)
+
+
+def rebuild_rollups(database, first_day, last_day):
+    from services import rollups
+
+    conn = connect(database)
+    cur = conn.cursor()
+    rollups.create_tables(cur)
+    day = first_day
+    while day <= last_day:
+        rollups.rebuild_day(cur, day)
+        conn.commit()
+        day += timedelta(days=1)
+    cur.close()
+    conn.close()
+
+
+def bench_user(database):
+    conn = connect(database)
+    cur = conn.cursor()
+    firstname, lastname, username, email, user_type = BENCH_USER
+    cur.execute("SELECT id FROM users WHERE username = %s", (username,))
+    row = cur.fetchone()
+    if row is None:
+        cur.execute("""
+            INSERT INTO users (firstname, lastname, username, password, email, user_type)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (firstname, lastname, username, generate_password_hash('bench-password-1'), email, user_type))
+        conn.commit()
+        row = (cur.lastrowid,)
+    cur.close()
+    conn.close()
+    return row[0]
+
+
+def start_server(args, database):
+    env = dict(os.environ)
+    env.update({
+        'MYSQL_DB': database,
+        'PORT': str(args.port),
+        'SERVER_WORKERS': str(args.workers),
+        'SERVER_ACCESS_LOG': '',
+        'RESPONSE_CACHE_BACKEND': 'none',
+        'CONDITIONAL_GET': 'false',
+        'ROLLUPS_ENABLED': 'true' if args.rollups else 'false',
+        # Keep the metrics files of a server running on this host untouched
+        'PROMETHEUS_MULTIPROC_DIR': tempfile.mkdtemp(prefix='water360-bench-metrics-'),
+    })
+    if args.threads:
+        env['SERVER_THREADS'] = str(args.threads)
+    command = [sys.executable, 'serve.py', '--mode', args.mode]
+    if args.cpus:
+        command = ['taskset', '-c', args.cpus] + command
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(process, args.port)
+    return process
+
+
+async def client(session, url, method, body, rng, deadline, timings, statuses):
+    while time.monotonic() < deadline:
+        options = body(rng) if body else {}
+        started = time.perf_counter()
+        try:
+            async with session.request(method, url, **options) as response:
+                await response.read()
+                status = str(response.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = type(e).__name__
+        statuses[status] = statuses.get(status, 0) + 1
+        if status.startswith('2'):
+            timings.append((time.perf_counter() - started) * 1000)
+
+
+async def load(url, token, method, body, concurrency, duration, seed_value):
+    headers = {'Authorization': f'Bearer {token}'}
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(headers=headers, connector=connector, timeout=timeout) as session:
+        timings, statuses = [], {}
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(*(
+            client(session, url, method, body, random.Random(seed_value + i), deadline, timings, statuses)
+            for i in range(concurrency)
+        ))
+        elapsed = time.monotonic() - started
+    return timings, statuses, elapsed
+
+
+def trim_ingested(database, mark):
+    # Keep the table at its benchmark size for the next endpoint and size
+    conn = connect(database)
+    cur = conn.cursor()
+    cur.execute("DELETE FROM sensor_data WHERE id > %s", (mark,))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def max_id(database):
+    conn = connect(database)
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM sensor_data")
+    value = cur.fetchone()[0]
+    cur.close()
+    conn.close()
+    return value
+
+
+def run(args):
+    config = get_config()
+    anchor = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    create_database(args.database)
+    user_id = bench_user(args.database)
+    token = jwt.encode({'user_id': user_id, 'exp': datetime.utcnow() + timedelta(hours=24)},
+                       config.SECRET_KEY, algorithm='HS256')
+    selected = [e for e in endpoints(anchor, args.graph_days) if not args.only or e[0] in args.only]
+    base_url = f'http://127.0.0.1:{args.port}'
+
+    results = []
+    seeding = {}
+    for size in sorted(args.sizes):
+        seeding[size] = seed(args.database, size, anchor, args.seed, args.days)
+        if args.rollups:
+            rebuild_rollups(args.database, (anchor - timedelta(days=args.days)).date(), anchor.date())
+        print(f'sensor_data seeded to {size:,} rows ({seeding[size]}s)', flush=True)
+
+        process = start_server(args, args.database)
+        try:
+            for name, method, path, body in selected:
+                mark = max_id(args.database)
+                url = base_url + path
+                if args.warmup:
+                    asyncio.run(load(url, token, method, body, args.concurrency, args.warmup, args.seed))
+                with RssSampler(process.pid) as rss:
+                    timings, statuses, elapsed = asyncio.run(
+                        load(url, token, method, body, args.concurrency, args.duration, args.seed))
+                if body is not None:
+                    trim_ingested(args.database, mark)
+                    if args.rollups:
+                        rebuild_rollups(args.database, anchor.date(), datetime.now().date())
+
+                result = {
+                    'size': size,
+                    'endpoint': name,
+                    'method': method,
+                    'path': path,
+                    'requests': len(timings),
+                    'statuses': statuses,
+                    'throughput_rps': round(len(timings) / elapsed, 1),
+                    'latency': summarize(timings) if timings else None,
+                    'peak_rss_mb': rss.peak_mb,
+                }
+                results.append(result)
+                latency = result['latency'] or {}
+                print(f"{size:>10,} {name:<20} {result['throughput_rps']:>8.1f} req/s  "
+                      f"p50 {latency.get('p50_ms', 0):>8.1f}  p95 {latency.get('p95_ms', 0):>8.1f}  "
+                      f"p99 {latency.get('p99_ms', 0):>8.1f} ms  rss {rss.peak_mb:>7.1f} MB  "
+                      f"non-2xx {sum(v for k, v in statuses.items() if not k.startswith('2'))}", flush=True)
+        finally:
+            stop_server(process)
+
+    return {'meta': run_metadata(args, anchor, seeding), 'results': results}
+
+
+def run_metadata(args, anchor, seeding):
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain'], text=True, stderr=subprocess.DEVNULL).strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    conn = connect(args.database)
+    cur = conn.cursor()
+    cur.execute("SELECT VERSION()")
+    mysql_version = cur.fetchone()[0]
+    cur.close()
+    conn.close()
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'finished_at': datetime.now().isoformat(timespec='seconds'),
+        'anchor': anchor.isoformat(),
+        'seed': args.seed,
+        'days': args.days,
+        'locations': len(LOCATIONS),
+        'seconds_to_seed': seeding,
+        'mode': args.mode,
+        'workers': args.workers,
+        'threads': args.threads,
+        'cpus': args.cpus,
+        'rollups': args.rollups,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'mysql': mysql_version,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(base_path, head_path):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(head_path) as f:
+        head = json.load(f)
+    print(f"base {base['meta'].get('commit')}  head {head['meta'].get('commit')}")
+    before = {(r['size'], r['endpoint']): r for r in base['results']}
+
+    def change(old, new):
+        return f'{(new - old) / old * 100:+7.1f}%' if old else '      -'
+
+    print(f"{'rows':>10} {'endpoint':<20} {'p50 ms':>16} {'p95 ms':>16} {'p99 ms':>16} {'req/s':>16}")
+    for result in head['results']:
+        old = before.get((result['size'], result['endpoint']))
+        if old is None or not old['latency'] or not result['latency']:
+            continue
+        cells = []
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            cells.append(f"{result['latency'][key]:>8.1f} {change(old['latency'][key], result['latency'][key])}")
+        cells.append(f"{result['throughput_rps']:>8.1f} {change(old['throughput_rps'], result['throughput_rps'])}")
+        print(f"{result['size']:>10,} {result['endpoint']:<20} " + ' '.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every API endpoint at several table sizes.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--database', default='water360_bench', help='Created if missing; its data is replaced')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--days', type=int, default=365, help='Days of readings before the anchor')
+    parser.add_argument('--graph-days', type=int, default=30, help='Date range of the graph queries')
+    parser.add_argument('--only', nargs='+', help='Endpoint names to run (default: all)')
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, help='Threads per worker (default: serve.py picks)')
+    parser.add_argument('--cpus', help='CPU list passed to taskset, e.g. 0-1')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20, help='Measured seconds per endpoint')
+    parser.add_argument('--warmup', type=float, default=3, help='Unmeasured seconds per endpoint')
+    parser.add_argument('--rollups', action='store_true', help='Build rollups and serve the graphs from them')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'), help='Compare two result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run(args)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
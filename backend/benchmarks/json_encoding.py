@@ -0,0 +1,76 @@
+# benchmarks/json_encoding.py
+#
+# Compares Flask's default jsonify with the msgspec provider on /all-data
+# shaped payloads (no database needed):
+#
+#   python -m benchmarks.json_encoding --rows 10000 100000
+
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.common import LOCATIONS, summarize
+from services.serialization import MsgspecJSONProvider
+
+
+def make_rows(count, seed=42):
+    # DATE comes back as date and DECIMAL aggregates as Decimal; time is a
+    # string because the default provider cannot encode time values
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        rows.append({
+            'id': i + 1,
+            'location': rng.choice(LOCATIONS),
+            'ph_value': round(rng.uniform(5, 10), 1),
+            'temperature': Decimal(f'{rng.uniform(0, 35):.2f}'),
+            'turbidity': round(rng.uniform(0, 10), 1),
+            'date': start + timedelta(days=i % 365),
+            'time': f'{rng.randrange(24):02d}:{rng.randrange(60):02d}:00',
+        })
+    return rows
+
+
+def time_provider(provider_class, rows, repeat):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    timings = []
+    size = 0
+    with app.app_context():
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = jsonify(rows)
+            size = len(response.get_data())
+            timings.append((time.perf_counter() - started) * 1000)
+    return {**summarize(timings), 'bytes': size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare jsonify encoders on sensor-shaped payloads.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = []
+    for count in args.rows:
+        rows = make_rows(count)
+        for name, provider_class in (('jsonify_default', DefaultJSONProvider), ('msgspec', MsgspecJSONProvider)):
+            result = {'rows': count, 'encoder': name, **time_provider(provider_class, rows, args.repeat)}
+            results.append(result)
+            print(f"{count:>8,} rows  {name:<16} p50 {result['p50_ms']:>9.1f} ms  p95 {result['p95_ms']:>9.1f} ms  {result['bytes']:>11,} bytes")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
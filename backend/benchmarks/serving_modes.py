@@ -0,0 +1,191 @@
+# benchmarks/serving_modes.py
+#
+# Load-tests the read endpoints in both serving modes of serve.py, the
+# launcher the image runs: gunicorn with gthread workers (sync Flask) and
+# hypercorn (async app/asgi.py), with the same worker count pinned to the
+# same CPUs:
+#
+#   python -m benchmarks.serving_modes --cpus 0-1 --workers 2 \
+#       --concurrency 16 64 256 --sse 200 --output serving.json
+#
+# Run from the backend directory against a local MySQL holding test data
+# (see benchmarks.common.grow_table). Needs taskset and the packages in
+# benchmarks/requirements.txt. Response caching and ETags are turned off in
+# the servers so every request reaches the database; --user-id must be an
+# existing users row.
+#
+# A sync worker serves one request per thread and an open /data/stream
+# holds its thread, so with more --sse connections than workers x threads
+# the rest wait for a thread; the results record how many streams opened.
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import aiohttp
+import jwt
+
+from benchmarks.common import stop_server, summarize, wait_for_port
+from config import get_config
+
+MODES = ('sync', 'async')
+# Seconds to wait for the --sse streams to open before measuring anyway
+SSE_OPEN_TIMEOUT = 10
+
+
+def endpoint_mix(location, start, end):
+    return [
+        f'/graph-data?startDate={start}&endDate={end}&location={location}&dataType=temperature',
+        f'/compare-graph-data?startDate={start}&endDate={end}&locations={location}&dataType=ph_value',
+        '/all-data?limit=500',
+        '/data?limit=500',
+        '/recent-data',
+        '/summary-insights',
+    ]
+
+
+def start_server(mode, workers, threads, port, cpus, keep_cache):
+    env = dict(os.environ)
+    env.update({
+        'PORT': str(port),
+        'SERVER_WORKERS': str(workers),
+        'SERVER_ACCESS_LOG': '',
+        # Keep the metrics files of a server running on this host untouched
+        'PROMETHEUS_MULTIPROC_DIR': tempfile.mkdtemp(prefix='water360-bench-metrics-'),
+    })
+    if threads:
+        env['SERVER_THREADS'] = str(threads)
+    if not keep_cache:
+        env.update({'RESPONSE_CACHE_BACKEND': 'none', 'CONDITIONAL_GET': 'false'})
+    command = [sys.executable, 'serve.py', '--mode', mode]
+    if cpus:
+        command = ['taskset', '-c', cpus] + command
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(process, port)
+    return process
+
+
+async def hold_sse(session, base_url, ready):
+    # An idle dashboard tab: one open /data/stream connection
+    try:
+        async with session.get(f'{base_url}/data/stream') as response:
+            ready.set()
+            async for _ in response.content:
+                pass
+    except (aiohttp.ClientError, asyncio.CancelledError):
+        pass
+
+
+async def client(session, base_url, paths, offset, deadline, timings, errors):
+    i = offset
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            async with session.get(base_url + path) as response:
+                await response.read()
+                if response.status != 200:
+                    errors[str(response.status)] = errors.get(str(response.status), 0) + 1
+                    continue
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            continue
+        timings.setdefault(path.split('?')[0], []).append((time.perf_counter() - started) * 1000)
+
+
+async def load(base_url, token, paths, concurrency, duration, sse):
+    headers = {'Authorization': f'Bearer {token}'}
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(headers=headers, connector=connector, timeout=timeout) as session:
+        streams, opened = [], []
+        for _ in range(sse):
+            ready = asyncio.Event()
+            streams.append(asyncio.ensure_future(hold_sse(session, base_url, ready)))
+            opened.append(ready)
+        if opened:
+            # Streams that get no thread stay pending; measure with the rest open
+            waiters = [asyncio.ensure_future(ready.wait()) for ready in opened]
+            await asyncio.wait(waiters, timeout=SSE_OPEN_TIMEOUT)
+            for waiter in waiters:
+                waiter.cancel()
+        sse_open = sum(ready.is_set() for ready in opened)
+
+        timings, errors = {}, {}
+        deadline = time.monotonic() + duration
+        started = time.monotonic()
+        await asyncio.gather(*(client(session, base_url, paths, i, deadline, timings, errors) for i in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+        for stream in streams:
+            stream.cancel()
+        await asyncio.gather(*streams, return_exceptions=True)
+
+    completed = sum(len(values) for values in timings.values())
+    return {
+        'sse_open': sse_open,
+        'requests': completed,
+        'errors': errors,
+        'throughput_rps': round(completed / elapsed, 1),
+        'overall': summarize([value for values in timings.values() for value in values]) if completed else None,
+        'endpoints': {path: summarize(values) for path, values in sorted(timings.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare sync and async serving of the read endpoints.')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, help='Threads per sync worker (default: what serve.py picks)')
+    parser.add_argument('--cpus', help='CPU list passed to taskset, e.g. 0-1; the same for both modes')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[16, 64, 256])
+    parser.add_argument('--duration', type=float, default=30, help='Seconds per concurrency level')
+    parser.add_argument('--sse', type=int, default=0, help='Idle /data/stream connections held open during the run')
+    parser.add_argument('--user-id', type=int, default=1)
+    parser.add_argument('--location', default='LOC000')
+    parser.add_argument('--days', type=int, default=30, help='Date range of the graph queries')
+    parser.add_argument('--keep-cache', action='store_true', help='Leave the response cache and ETags on')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    config = get_config()
+    token = jwt.encode({'user_id': args.user_id, 'exp': datetime.utcnow() + timedelta(hours=12)},
+                       config.SECRET_KEY, algorithm='HS256')
+    end = datetime.now().date()
+    paths = endpoint_mix(args.location, end - timedelta(days=args.days), end)
+    base_url = f'http://127.0.0.1:{args.port}'
+
+    results = []
+    for mode in args.modes:
+        process = start_server(mode, args.workers, args.threads, args.port, args.cpus, args.keep_cache)
+        try:
+            # Warm up connections, pools and caches before measuring
+            asyncio.run(load(base_url, token, paths, 4, 3, 0))
+            for concurrency in args.concurrency:
+                result = asyncio.run(load(base_url, token, paths, concurrency, args.duration, args.sse))
+                result.update({'mode': mode, 'workers': args.workers, 'threads': args.threads, 'cpus': args.cpus,
+                               'concurrency': concurrency, 'sse_connections': args.sse})
+                results.append(result)
+                overall = result['overall'] or {}
+                print(f"{mode:<6} c={concurrency:<4} {result['throughput_rps']:>8.1f} req/s  "
+                      f"p50 {overall.get('p50_ms', 0):>8.1f} ms  p95 {overall.get('p95_ms', 0):>8.1f} ms  "
+                      f"p99 {overall.get('p99_ms', 0):>8.1f} ms  errors {sum(result['errors'].values())}"
+                      + (f"  sse open {result['sse_open']}/{args.sse}" if args.sse else ''))
+        finally:
+            stop_server(process)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/summary_insights.py
+#
+# Compares the /summary-insights query strategies on a scratch copy of
+# sensor_data grown to 1M, 10M and 50M rows:
+#
+#   python -m benchmarks.summary_insights --sizes 1000000 10000000 50000000
+#
+# Run from the backend directory against a disposable database; the scratch
+# table is created with CREATE TABLE ... LIKE sensor_data, so run
+# `flask add-recorded-at` on that database first.
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import connect, create_scratch_table, grow_table, summarize
+
+PARAMETERS = ['ph_value', 'temperature', 'turbidity']
+
+
+def legacy_concat(cur, table, since):
+    # The original handler: a MAX and a MIN query per parameter, each with a
+    # correlated subquery over an unindexable CONCAT(date, ' ', time) filter
+    queries = 0
+    for param in PARAMETERS:
+        for agg in ('MAX', 'MIN'):
+            cur.execute(f"""
+                SELECT {param}, location
+                FROM {table}
+                WHERE CONCAT(date, ' ', time) >= %s
+                AND {param} = (SELECT {agg}({param}) FROM {table} WHERE CONCAT(date, ' ', time) >= %s)
+            """, (since, since))
+            cur.fetchall()
+            queries += 1
+    return queries
+
+
+def legacy_indexed(cur, table, since):
+    # Same six queries on the indexed recorded_at column
+    queries = 0
+    for param in PARAMETERS:
+        for agg in ('MAX', 'MIN'):
+            cur.execute(f"""
+                SELECT {param}, location
+                FROM {table}
+                WHERE recorded_at >= %s
+                AND {param} = (SELECT {agg}({param}) FROM {table} WHERE recorded_at >= %s)
+            """, (since, since))
+            cur.fetchall()
+            queries += 1
+    return queries
+
+
+def single_pass(cur, table, since):
+    # Kept in step with services.reads.summary_insights
+    extremes = ', '.join(f"MAX({param}) OVER () AS max_{param}, MIN({param}) OVER () AS min_{param}" for param in PARAMETERS)
+    matches = ' OR '.join(f"{param} IN (max_{param}, min_{param})" for param in PARAMETERS)
+    cur.execute(f"""
+        SELECT *
+        FROM (
+            SELECT location, {', '.join(PARAMETERS)}, {extremes}
+            FROM {table}
+            WHERE recorded_at >= %s
+        ) AS windowed
+        WHERE {matches}
+    """, (since,))
+    cur.fetchall()
+    return 1
+
+
+STRATEGIES = {
+    'legacy_concat': legacy_concat,
+    'legacy_indexed': legacy_indexed,
+    'single_pass': single_pass,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 10_000_000, 50_000_000])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--table', default='sensor_data_bench')
+    parser.add_argument('--strategies', nargs='+', choices=sorted(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    conn = connect()
+    create_scratch_table(conn, args.table)
+    results = []
+
+    for size in sorted(args.sizes):
+        grow_table(conn, args.table, size)
+        since = (datetime.now() - timedelta(hours=24)).strftime('%Y-%m-%d %H:%M:%S')
+        cur = conn.cursor()
+        for name in args.strategies:
+            strategy = STRATEGIES[name]
+            queries = strategy(cur, args.table, since)  # warm-up
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                strategy(cur, args.table, since)
+                timings.append((time.perf_counter() - started) * 1000)
+            result = {'rows': size, 'strategy': name, 'queries': queries, **summarize(timings)}
+            results.append(result)
+            print(f"{size:>11,} rows  {name:<15} {queries} queries  p50 {result['p50_ms']:>10.1f} ms  p95 {result['p95_ms']:>10.1f} ms")
+        cur.close()
+
+    conn.close()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+# commands.py
+
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+SENSOR_DATA_INDEXES = {
+    'idx_sensor_data_location_recorded_at': '(location, recorded_at)',
+    'idx_sensor_data_recorded_at': '(recorded_at)',
+    # InnoDB appends the primary key, so these also serve ORDER BY id seeks on /data
+    'idx_sensor_data_location': '(location)',
+    'idx_sensor_data_date': '(date)',
+}
+
+
+@click.command('add-token-version')
+@with_appcontext
+def add_token_version():
+    """Add the users.token_version column used to revoke stateless tokens."""
+    from app import mysql
+
+    cur = mysql.connection.cursor()
+    cur.execute("SHOW COLUMNS FROM users LIKE 'token_version'")
+    if cur.fetchone():
+        click.echo('users.token_version already exists')
+    else:
+        cur.execute("ALTER TABLE users ADD COLUMN token_version INT NOT NULL DEFAULT 0")
+        click.echo('Added users.token_version')
+    cur.close()
+
+
+@click.command('revoke-tokens')
+@click.argument('user_id', type=int)
+@with_appcontext
+def revoke_tokens(user_id):
+    """Revoke every stateless token issued to USER_ID.
+
+    Only the database is changed here: running servers reload token versions
+    every TOKEN_VERSION_REFRESH seconds and reject the tokens from then on.
+    """
+    from app import token_versions
+
+    token_versions.bump(user_id)
+    click.echo(f'Revoked tokens for user {user_id}; servers reject them within '
+               f"{current_app.config['TOKEN_VERSION_REFRESH']}s")
+
+
+@click.command('add-recorded-at')
+@click.option('--chunk-size', default=10000, show_default=True, help='Rows updated per transaction.')
+@click.option('--pause-ms', default=50, show_default=True, help='Pause between chunks to limit load on the server.')
+@click.option('--fix-collation', is_flag=True,
+              help='Change a case-sensitive sensor_data.location collation. Copies the table and '
+                   'blocks writes while it runs.')
+@with_appcontext
+def add_recorded_at(chunk_size, pause_ms, fix_collation):
+    """Add and backfill sensor_data.recorded_at and create the sensor_data indexes.
+
+    These steps run online. The location filters also rely on a
+    case-insensitive collation of sensor_data.location; if it is not, the
+    command warns, and --fix-collation changes it in a table copy that
+    blocks writes, so run that in a maintenance window.
+
+    Safe to re-run: the backfill only touches rows where recorded_at is still
+    NULL, so rows written by old app versions during a rollout are picked up
+    on the next run.
+    """
+    from app import mysql
+
+    cur = mysql.connection.cursor()
+    cur.execute("SHOW COLUMNS FROM sensor_data LIKE 'recorded_at'")
+    if not cur.fetchone():
+        # Nullable column without a default: an instant/in-place change on MySQL 8
+        cur.execute("ALTER TABLE sensor_data ADD COLUMN recorded_at DATETIME NULL")
+        click.echo('Added sensor_data.recorded_at')
+
+    # Walk the primary key in ranges so each UPDATE holds its locks briefly
+    cur.execute("SELECT MIN(id), MAX(id) FROM sensor_data")
+    min_id, max_id = cur.fetchone()
+    updated = 0
+    if min_id is not None:
+        for start in range(min_id, max_id + 1, chunk_size):
+            cur.execute("""
+                UPDATE sensor_data
+                SET recorded_at = TIMESTAMP(date, time)
+                WHERE id >= %s AND id < %s AND recorded_at IS NULL
+            """, (start, start + chunk_size))
+            mysql.connection.commit()
+            updated += cur.rowcount
+            if pause_ms:
+                time.sleep(pause_ms / 1000)
+    click.echo(f'Backfilled recorded_at on {updated} rows')
+
+    # correlation-data compares location with a plain = so it can use the
+    # (location, recorded_at) index, and relies on a case-insensitive
+    # collation to keep matching "us" to "US" as LOWER() on both sides did
+    cur.execute("SHOW FULL COLUMNS FROM sensor_data LIKE 'location'")
+    _, column_type, collation, nullable = cur.fetchone()[:4]
+    if collation and collation.endswith(('_bin', '_cs')):
+        charset = collation.split('_')[0]
+        if not fix_collation:
+            click.echo(f'Warning: sensor_data.location uses the case-sensitive collation {collation}, so '
+                       f'location filters are case-sensitive. Re-run with --fix-collation in a '
+                       f'maintenance window to change it.', err=True)
+        else:
+            click.echo(f'Changing sensor_data.location collation from {collation} to {charset}_general_ci; '
+                       f'this copies the table and blocks writes until it finishes', err=True)
+            # A collation change cannot run in place. Do it before the index
+            # builds below so they are not copied along with the table.
+            cur.execute(f"""
+                ALTER TABLE sensor_data
+                MODIFY location {column_type} CHARACTER SET {charset} COLLATE {charset}_general_ci
+                {'NULL' if nullable == 'YES' else 'NOT NULL'},
+                ALGORITHM=COPY, LOCK=SHARED
+            """)
+            click.echo(f'Changed sensor_data.location collation to {charset}_general_ci')
+
+    cur.execute("SHOW INDEX FROM sensor_data")
+    existing = {row[2] for row in cur.fetchall()}
+    for name, columns in SENSOR_DATA_INDEXES.items():
+        if name not in existing:
+            # Secondary index builds run in place and allow concurrent DML
+            cur.execute(f"ALTER TABLE sensor_data ADD INDEX {name} {columns}, ALGORITHM=INPLACE, LOCK=NONE")
+            click.echo(f'Added index {name}')
+    cur.close()
+
+
+@click.command('add-data-version')
+@with_appcontext
+def add_data_version():
+    """Create the sensor_data_version row the read endpoints' ETags use.
+
+    Updates and deletes bump it, so every worker and replica sees a changed
+    ETag. Run before deploying with CONDITIONAL_GET on; until then responses
+    are served without an ETag, and running servers pick the table up only
+    after a restart.
+    """
+    from app import mysql
+    from services.conditional import VERSION_TABLE, create_version_table
+
+    cur = mysql.connection.cursor()
+    create_version_table(cur)
+    mysql.connection.commit()
+    cur.close()
+    click.echo(f'{VERSION_TABLE} is ready; restart running servers to turn ETags on')
+
+
+@click.command('add-warning-thresholds')
+@with_appcontext
+def add_warning_thresholds():
+    """Create the warning_thresholds table for per-location warning limits.
+
+    A row with a NULL location replaces the configured default for its
+    parameter; a NULL min_value or max_value means no limit on that side.
+    """
+    from app import mysql
+
+    cur = mysql.connection.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS warning_thresholds (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            parameter VARCHAR(64) NOT NULL,
+            location VARCHAR(255) NULL,
+            min_value DOUBLE NULL,
+            max_value DOUBLE NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            UNIQUE KEY uq_warning_thresholds (parameter, location)
+        )
+    """)
+    cur.close()
+    click.echo('warning_thresholds is ready')
+
+
+@click.command('rebuild-rollups')
+@click.option('--start', type=click.DateTime(['%Y-%m-%d']), help='First day to rebuild (default: oldest reading).')
+@click.option('--end', type=click.DateTime(['%Y-%m-%d']), help='Last day to rebuild (default: newest reading).')
+@with_appcontext
+def rebuild_rollups(start, end):
+    """Create the hourly/daily rollup tables and rebuild them from sensor_data.
+
+    Run after bulk loads or direct edits to sensor_data. Each day is rebuilt
+    and committed on its own so locks are held briefly.
+    """
+    from app import mysql
+    from services import rollups
+
+    cur = mysql.connection.cursor()
+    rollups.create_tables(cur)
+    if start is None or end is None:
+        cur.execute("SELECT MIN(recorded_at), MAX(recorded_at) FROM sensor_data")
+        oldest, newest = cur.fetchone()
+        if oldest is None:
+            click.echo('sensor_data has no readings with recorded_at set')
+            cur.close()
+            return
+        start = start or oldest
+        end = end or newest
+
+    day = start.date()
+    while day <= end.date():
+        rollups.rebuild_day(cur, day)
+        mysql.connection.commit()
+        day += timedelta(days=1)
+    cur.close()
+    click.echo(f'Rebuilt rollups from {start.date()} to {end.date()}')
+
+
+@click.command('load-synthetic-data')
+@click.option('--locations', default=100, show_default=True, help='Number of generated locations (LOC0001, LOC0002, ...).')
+@click.option('--names', help='Comma-separated location names to use instead of --locations.')
+@click.option('--start', type=click.DateTime(['%Y-%m-%d', '%Y-%m-%d %H:%M:%S']), help='First reading (default: --days before --end).')
+@click.option('--end', type=click.DateTime(['%Y-%m-%d', '%Y-%m-%d %H:%M:%S']), help='Last reading (default: now).')
+@click.option('--days', default=30, show_default=True, help='Length of the range when --start is not given.')
+@click.option('--interval', default=300, show_default=True, help='Seconds between readings of one location.')
+@click.option('--seed', default=42, show_default=True, help='Same seed, locations and range give the same rows.')
+@click.option('--method', type=click.Choice(['infile', 'insert']), default='infile', show_default=True,
+              help='LOAD DATA LOCAL INFILE (needs local_infile=ON on the server) or multi-row INSERTs.')
+@click.option('--batch-rows', default=200000, show_default=True, help='Rows loaded per transaction.')
+@click.option('--csv', 'csv_path', type=click.Path(dir_okay=False, writable=True),
+              help='Write the rows to this CSV file instead of the database.')
+@with_appcontext
+def load_synthetic_data(locations, names, start, end, days, interval, seed, method, batch_rows, csv_path):
+    """Bulk-load generated sensor readings for capacity testing.
+
+    Each location gets a seeded series with diurnal and seasonal temperature,
+    drifting pH and turbidity spikes, one reading per --interval seconds, and
+    the rows go straight to sensor_data. Rollups are rebuilt for the loaded
+    days when ROLLUPS_ENABLED is on.
+    """
+    from app import mysql
+    from services import rollups, synthetic
+
+    location_names = [name.strip() for name in names.split(',') if name.strip()] if names else \
+        [f'LOC{i:04d}' for i in range(1, locations + 1)]
+    if not location_names or any(',' in name or len(name) > 255 for name in location_names):
+        raise click.BadParameter('need at least one location name of up to 255 characters')
+    if interval < 1:
+        raise click.BadParameter('must be at least 1 second', param_hint='--interval')
+    end = (end or datetime.now()).replace(microsecond=0)
+    start = start or end - timedelta(days=days)
+    if start > end:
+        raise click.BadParameter('must not be after --end', param_hint='--start')
+
+    total = len(location_names) * (int((end - start).total_seconds()) // interval + 1)
+    click.echo(f'Generating {total:,} readings for {len(location_names)} locations '
+               f'from {start} to {end}, every {interval}s')
+    rows = synthetic.generate(location_names, start, end, interval, seed)
+    progress = synthetic.Progress(total, click.echo)
+    started = time.monotonic()
+
+    if csv_path:
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            written = synthetic.write_csv(rows, f)
+        click.echo(f'Wrote {written:,} rows to {csv_path} in {time.monotonic() - started:.1f}s')
+        return
+
+    conn = mysql.open_connection(local_infile=method == 'infile')
+    try:
+        if method == 'infile':
+            loaded = synthetic.load_infile(conn, rows, batch_rows, progress)
+        else:
+            loaded = synthetic.insert_rows(conn, rows, batch_rows, progress)
+        click.echo(f'Loaded {loaded:,} rows in {time.monotonic() - started:.1f}s')
+
+        if current_app.config['ROLLUPS_ENABLED']:
+            cur = conn.cursor()
+            rollups.create_tables(cur)
+            day = start.date()
+            while day <= end.date():
+                rollups.rebuild_day(cur, day)
+                conn.commit()
+                day += timedelta(days=1)
+            cur.close()
+            click.echo(f'Rebuilt rollups from {start.date()} to {end.date()}')
+    except Exception as e:
+        if synthetic.is_local_infile_error(e):
+            raise click.ClickException(f'LOAD DATA LOCAL INFILE was refused ({e}). Enable local_infile '
+                                       f'on the server or use --method insert.')
+        raise
+    finally:
+        conn.close()
+
+
+def register_commands(app):
+    app.cli.add_command(add_token_version)
+    app.cli.add_command(revoke_tokens)
+    app.cli.add_command(add_recorded_at)
+    app.cli.add_command(add_data_version)
+    app.cli.add_command(add_warning_thresholds)
+    app.cli.add_command(rebuild_rollups)
+    app.cli.add_command(load_synthetic_data)
@@ -1,5 +1,6 @@
 # config.py
 
+import json
 import os
 from dotenv import load_dotenv
 
@@ -11,10 +12,112 @@ class BaseConfig:
     MYSQL_USER = os.getenv('MYSQL_USER', 'root')
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', '')
     MYSQL_DB = os.getenv('MYSQL_DB', 'default_db')
+    MYSQL_PORT = int(os.getenv('MYSQL_PORT', '3306'))
+    MYSQL_CONNECT_TIMEOUT = int(os.getenv('MYSQL_CONNECT_TIMEOUT', '10'))
+    MYSQL_CHARSET = os.getenv('MYSQL_CHARSET', 'utf8')
+    # Connection pool, one per worker process. Keep MYSQL_POOL_MAX_SIZE times
+    # the total number of workers below MySQL's max_connections.
+    MYSQL_POOL_MIN_SIZE = int(os.getenv('MYSQL_POOL_MIN_SIZE', '2'))
+    MYSQL_POOL_MAX_SIZE = int(os.getenv('MYSQL_POOL_MAX_SIZE', '10'))
+    MYSQL_POOL_TIMEOUT = float(os.getenv('MYSQL_POOL_TIMEOUT', '5'))
+    MYSQL_POOL_PING_INTERVAL = float(os.getenv('MYSQL_POOL_PING_INTERVAL', '30'))
+    MYSQL_POOL_RECYCLE = float(os.getenv('MYSQL_POOL_RECYCLE', '3600'))
+    # aiomysql pool of the async serving mode (asgi.py), also per worker process
+    ASYNC_MYSQL_POOL_MIN_SIZE = int(os.getenv('ASYNC_MYSQL_POOL_MIN_SIZE', '2'))
+    ASYNC_MYSQL_POOL_MAX_SIZE = int(os.getenv('ASYNC_MYSQL_POOL_MAX_SIZE', '50'))
     DEBUG = False
     TESTING = False
     CORS_ORIGIN = os.getenv('CORS_ORIGIN', 'http://localhost:3000')
 
+    # Sensor data ingestion
+    INGEST_BATCH_MAX_ROWS = int(os.getenv('INGEST_BATCH_MAX_ROWS', '5000'))
+    INGEST_BATCH_CHUNK_SIZE = int(os.getenv('INGEST_BATCH_CHUNK_SIZE', '500'))
+    INGEST_WRITE_BEHIND = os.getenv('INGEST_WRITE_BEHIND', 'false').lower() == 'true'
+    INGEST_BUFFER_MAX_ROWS = int(os.getenv('INGEST_BUFFER_MAX_ROWS', '10000'))
+    INGEST_BUFFER_FLUSH_ROWS = int(os.getenv('INGEST_BUFFER_FLUSH_ROWS', '500'))
+    INGEST_BUFFER_FLUSH_MS = int(os.getenv('INGEST_BUFFER_FLUSH_MS', '200'))
+    INGEST_BUFFER_PUT_TIMEOUT_MS = int(os.getenv('INGEST_BUFFER_PUT_TIMEOUT_MS', '100'))
+    # A flush that fails on a lost connection, lock timeout or deadlock is
+    # retried this many times, waiting RETRY_BACKOFF_MS and doubling each time
+    INGEST_BUFFER_FLUSH_RETRIES = int(os.getenv('INGEST_BUFFER_FLUSH_RETRIES', '5'))
+    INGEST_BUFFER_RETRY_BACKOFF_MS = int(os.getenv('INGEST_BUFFER_RETRY_BACKOFF_MS', '200'))
+    # Hourly/daily rollups maintained on ingest and read by the graph endpoints.
+    # Create and fill them with `flask rebuild-rollups` before turning this on.
+    ROLLUPS_ENABLED = os.getenv('ROLLUPS_ENABLED', 'false').lower() == 'true'
+
+    # Downsampled /graph-data (?points=, ?bucket=, ?mode=lttb): points returned when
+    # none are asked for, the most a request may get, and the most readings
+    # fed to LTTB (longer ranges are averaged down to this first)
+    GRAPH_DEFAULT_POINTS = int(os.getenv('GRAPH_DEFAULT_POINTS', '500'))
+    GRAPH_MAX_POINTS = int(os.getenv('GRAPH_MAX_POINTS', '2000'))
+    GRAPH_LTTB_MAX_INPUT = int(os.getenv('GRAPH_LTTB_MAX_INPUT', '50000'))
+
+    # Keyset pagination for /data and /all-data
+    DATA_PAGE_DEFAULT_LIMIT = int(os.getenv('DATA_PAGE_DEFAULT_LIMIT', '500'))
+    DATA_PAGE_MAX_LIMIT = int(os.getenv('DATA_PAGE_MAX_LIMIT', '5000'))
+    # Rows fetched and encoded per chunk for ?stream=json|ndjson responses
+    STREAM_CHUNK_ROWS = int(os.getenv('STREAM_CHUNK_ROWS', '1000'))
+
+    # Response cache for dashboard endpoints: 'redis' (shared), 'memory' or 'none'.
+    # 'memory' only sees writes made by its own process, so it is only safe
+    # with a single worker process and one replica; it is off by default.
+    RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'none').lower()
+    RESPONSE_CACHE_URL = os.getenv('RESPONSE_CACHE_URL', 'redis://localhost:6379/0')
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '15'))  # seconds
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '512'))
+
+    # ETag / If-None-Match support on the read endpoints. Needs the version table
+    # (flask add-data-version); without it tagging turns itself off with a
+    # warning. Costs one extra statement on every tagged request.
+    CONDITIONAL_GET = os.getenv('CONDITIONAL_GET', 'true').lower() == 'true'
+    # Ids below MAX(id) whose rows are counted into the ETag, to notice rows
+    # that commit after a higher id; cover the largest concurrent batches
+    CONDITIONAL_GET_TRAILING_IDS = int(os.getenv('CONDITIONAL_GET_TRAILING_IDS', '10000'))
+
+    # Server-Sent Events feed of new readings (/data/stream). Under gunicorn
+    # every open stream holds one of the worker's threads (SERVER_THREADS).
+    SSE_POLL_INTERVAL = float(os.getenv('SSE_POLL_INTERVAL', '2'))
+    SSE_HEARTBEAT = float(os.getenv('SSE_HEARTBEAT', '15'))
+    SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', '1000'))
+    SSE_BACKLOG_LIMIT = int(os.getenv('SSE_BACKLOG_LIMIT', '1000'))
+    # Ids below the newest sent row that the tailer checks again for rows
+    # committed late by concurrent writers; raise it for large ingest batches
+    SSE_RESCAN_IDS = int(os.getenv('SSE_RESCAN_IDS', '1000'))
+
+    # Prometheus metrics at /metrics. Under gunicorn set PROMETHEUS_MULTIPROC_DIR
+    # (serve.py does) so the endpoint reports all workers, not just one.
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+    # Per-request SQL profiling. Statements slower than QUERY_PROFILE_SLOW_MS are
+    # logged with their EXPLAIN plan; a sampled share of requests keeps every
+    # statement with rows examined (needs performance_schema, on by default).
+    QUERY_PROFILE_ENABLED = os.getenv('QUERY_PROFILE_ENABLED', 'false').lower() == 'true'
+    QUERY_PROFILE_SAMPLE_RATE = float(os.getenv('QUERY_PROFILE_SAMPLE_RATE', '0.01'))
+    QUERY_PROFILE_SLOW_MS = float(os.getenv('QUERY_PROFILE_SLOW_MS', '200'))
+    QUERY_PROFILE_RING_SIZE = int(os.getenv('QUERY_PROFILE_RING_SIZE', '50'))
+    # X-Query-Profile summary header on sampled responses
+    QUERY_PROFILE_HEADER = os.getenv('QUERY_PROFILE_HEADER', 'false').lower() == 'true'
+    # Let clients force a profile with the request header X-Query-Profile: 1
+    QUERY_PROFILE_ALLOW_FORCE = os.getenv('QUERY_PROFILE_ALLOW_FORCE', 'false').lower() == 'true'
+
+    # Authentication
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '1024'))
+    # Changed or deleted users are served from the cache until their entry expires
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '60'))  # seconds
+    # Stateless mode puts the user profile in the token so requests skip the users table.
+    # Requires the users.token_version column (flask add-token-version).
+    JWT_STATELESS = os.getenv('JWT_STATELESS', 'false').lower() == 'true'
+    TOKEN_VERSION_REFRESH = int(os.getenv('TOKEN_VERSION_REFRESH', '30'))  # seconds
+
+    # Warnings: parameter -> [min, max] or {"default": [min, max], "locations": {"LK": [min, max]}}.
+    # Rows in the optional warning_thresholds table (flask add-warning-thresholds) override these.
+    WARNING_THRESHOLDS = json.loads(os.getenv(
+        'WARNING_THRESHOLDS',
+        '{"ph_value": [6.5, 8.5], "temperature": [0, 33], "turbidity": [1, 5]}'
+    ))
+    WARNING_RULES_REFRESH = int(os.getenv('WARNING_RULES_REFRESH', '30'))  # seconds
+
 class DevelopmentConfig(BaseConfig):
     DEBUG = True
 
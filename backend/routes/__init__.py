@@ -1,15 +1,49 @@
 # routes/__init__.py
 
-from flask import Blueprint, request, jsonify, current_app as app
+from flask import Blueprint, Response, request, jsonify, stream_with_context, current_app as app
+import hmac
 import jwt
 from datetime import datetime, timedelta
 from functools import wraps
 from werkzeug.security import generate_password_hash, check_password_hash
-from app import mysql
+from app import live_feed, metrics, mysql, query_profiler, response_cache, threshold_rules, token_versions, user_cache, write_buffer
 from models import User
+from services import ingest, reads, rollups, streaming
+from services.conditional import bump_data_version, conditional
+from services.write_buffer import BufferFull
 
 api = Blueprint('api', __name__)
 
+def save_reading(row):
+    # With write-behind enabled the row is handed to the background flusher,
+    # otherwise it is inserted and committed right away
+    if write_buffer.enabled:
+        write_buffer.put(row)
+        return
+    cur = mysql.connection.cursor()
+    ingest.insert_readings(cur, [row])
+    mysql.connection.commit()
+    cur.close()
+    response_cache.bump_version()
+    live_feed.notify()
+
+def buffer_full_response():
+    response = jsonify({'error': 'Ingest buffer is full, retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def run_read(plan):
+    # Execute a read plan from services.reads and build its response
+    if plan.stream:
+        return streaming.stream_query(plan.query, plan.params, plan.stream)
+    cur = mysql.connection.cursor()
+    cur.execute(plan.query, plan.params)
+    rows = cur.fetchall()
+    columns = [desc[0] for desc in cur.description] if cur.description else []
+    cur.close()
+    body, status = plan.shape(rows, columns)
+    return jsonify(body), status
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -26,22 +60,39 @@ def token_required(f):
         try:
             data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
             user_id = data['user_id']
-            # Fetch the user from the database
-            cur = mysql.connection.cursor()
-            cur.execute("SELECT * FROM users WHERE id = %s", (user_id,))
-            user_data = cur.fetchone()
-            cur.close()
-            if not user_data:
-                return jsonify({'message': 'User not found'}), 401
-            current_user = User(
-                id=user_data[0],
-                firstname=user_data[1],
-                lastname=user_data[2],
-                username=user_data[3],
-                password=user_data[4],
-                email=user_data[5],
-                user_type=user_data[6]
-            )
+            if app.config['JWT_STATELESS'] and 'ver' in data:
+                # Stateless token: the profile travels in the claims
+                if data['ver'] < token_versions.current(user_id):
+                    return jsonify({'message': 'Token has been revoked!'}), 401
+                current_user = User(
+                    id=user_id,
+                    firstname=data['firstname'],
+                    lastname=data['lastname'],
+                    username=data['username'],
+                    password=None,
+                    email=data['email'],
+                    user_type=data['user_type']
+                )
+            else:
+                # Serve the user from the per-process cache, falling back to the database
+                current_user = user_cache.get(user_id)
+                if current_user is None:
+                    cur = mysql.connection.cursor()
+                    cur.execute("SELECT * FROM users WHERE id = %s", (user_id,))
+                    user_data = cur.fetchone()
+                    cur.close()
+                    if not user_data:
+                        return jsonify({'message': 'User not found'}), 401
+                    current_user = User(
+                        id=user_data[0],
+                        firstname=user_data[1],
+                        lastname=user_data[2],
+                        username=user_data[3],
+                        password=user_data[4],
+                        email=user_data[5],
+                        user_type=user_data[6]
+                    )
+                    user_cache.set(current_user)
         except jwt.ExpiredSignatureError:
             return jsonify({'message': 'Token has expired!'}), 401
         except jwt.InvalidTokenError:
@@ -131,11 +182,6 @@ def login():
         cur.close()
 
         if user_data and check_password_hash(user_data[4], password):
-            token = jwt.encode(
-                {'user_id': user_data[0], 'exp': datetime.utcnow() + timedelta(hours=24)},
-                app.config['SECRET_KEY'],
-                algorithm='HS256'
-            )
             user = {
                 'id': user_data[0],
                 'firstname': user_data[1],
@@ -144,6 +190,18 @@ def login():
                 'email': user_data[5],
                 'user_type': user_data[6]
             }
+            claims = {'user_id': user_data[0], 'exp': datetime.utcnow() + timedelta(hours=24)}
+            if app.config['JWT_STATELESS']:
+                # Carry the non-secret profile so token_required never needs the database
+                claims.update({
+                    'username': user['username'],
+                    'firstname': user['firstname'],
+                    'lastname': user['lastname'],
+                    'email': user['email'],
+                    'user_type': user['user_type'],
+                    'ver': token_versions.current(user_data[0])
+                })
+            token = jwt.encode(claims, app.config['SECRET_KEY'], algorithm='HS256')
             return jsonify({'token': token, 'user': user}), 200
         else:
             return jsonify({'message': 'Invalid credentials'}), 401
@@ -154,40 +212,16 @@ def login():
 # for Homepage.js
 @api.route('/summary-insights', methods=['GET'])
 @token_required
+@conditional(window_hours=24)
+@response_cache.cached()
 def summary_insights(current_user):
     try:
-        cur = mysql.connection.cursor()
-        now = datetime.now()
-        last_24h = now - timedelta(hours=24)
-        last_24h_str = last_24h.strftime('%Y-%m-%d %H:%M:%S')
-
-        parameters = ['ph_value', 'temperature', 'turbidity']
-        summary = {}
-
-        for param in parameters:
-            cur.execute(f"""
-                SELECT {param}, location
-                FROM sensor_data
-                WHERE CONCAT(date, ' ', time) >= %s
-                AND {param} = (SELECT MAX({param}) FROM sensor_data WHERE CONCAT(date, ' ', time) >= %s)
-            """, (last_24h_str, last_24h_str))
-            highest = cur.fetchall()
-
-            cur.execute(f"""
-                SELECT {param}, location
-                FROM sensor_data
-                WHERE CONCAT(date, ' ', time) >= %s
-                AND {param} = (SELECT MIN({param}) FROM sensor_data WHERE CONCAT(date, ' ', time) >= %s)
-            """, (last_24h_str, last_24h_str))
-            lowest = cur.fetchall()
-
-            summary[param] = {
-                'highest': [{'value': row[0], 'location': row[1]} for row in highest],
-                'lowest': [{'value': row[0], 'location': row[1]} for row in lowest]
-            }
+        plan = reads.summary_insights(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        cur.close()
-        return jsonify(summary), 200
+    try:
+        return run_read(plan)
     except Exception as e:
         app.logger.error(f"Error retrieving summary insights: {e}", exc_info=True)
         return jsonify({'error': 'Internal Server Error'}), 500
@@ -197,6 +231,8 @@ def summary_insights(current_user):
 # For example, the 'warnings' route:
 @api.route('/warnings', methods=['GET'])
 @token_required
+@conditional(window_hours=24)
+@response_cache.cached()
 def get_warnings(current_user):
     try:
         cur = mysql.connection.cursor()
@@ -204,26 +240,19 @@ def get_warnings(current_user):
         last_24h = now - timedelta(hours=24)
         last_24h_str = last_24h.strftime('%Y-%m-%d %H:%M:%S')
 
-        thresholds = {
-            'ph_value': (6.5, 8.5),
-            'temperature': (0, 33),
-            'turbidity': (1, 5)
-        }
+        # Every parameter and location is checked in one pass over the window
+        rules = threshold_rules.get(cur)
+        violations = rules.evaluate(cur, last_24h_str)
 
         warnings = []
-
-        for param, (min_val, max_val) in thresholds.items():
-            cur.execute(f"""
-                SELECT DISTINCT location
-                FROM sensor_data
-                WHERE CONCAT(date, ' ', time) >= %s
-                AND ({param} < %s OR {param} > %s)
-            """, (last_24h_str, min_val, max_val))
-            locations = [row[0] for row in cur.fetchall()]
+        for param in rules.parameters:
+            details = violations[param]
+            locations = [item['location'] for item in details]
             if locations:
                 warnings.append({
                     'parameter': param,
                     'locations': locations,
+                    'details': details,
                     'message': f"{param.replace('_', ' ').title()} out of safe limits in: {', '.join(locations)}"
                 })
 
@@ -279,39 +308,16 @@ def correlation_data(current_user):
 
 @api.route('/correlation-data', methods=['GET'])
 @token_required
+@conditional(window_hours=24)
+@response_cache.cached()
 def correlation_data(current_user):
-    from app import mysql  # Import here to avoid circular import
-    from datetime import datetime, timedelta
-
-    location = request.args.get('location', 'US')  # Default location is 'US'
-
     try:
-        cur = mysql.connection.cursor()
-
-        # Calculate last 24 hours based on the server's timezone
-        now = datetime.now()
-        last_24h = now - timedelta(hours=24)
-        last_24h_str = last_24h.strftime('%Y-%m-%d %H:%M:%S')
-
-        # Query database for the last 24 hours and the specified location
-        query = """
-            SELECT temperature, turbidity, ph_value
-            FROM sensor_data
-            WHERE CONCAT(date, ' ', time) >= %s AND LOWER(location) = LOWER(%s)
-        """
-        cur.execute(query, (last_24h_str, location))
-        rows = cur.fetchall()
-        cur.close()
-
-        # Structure the data into arrays
-        data = {'temperature': [], 'turbidity': [], 'ph_value': []}
-        for row in rows:
-            data['temperature'].append(row[0])
-            data['turbidity'].append(row[1])
-            data['ph_value'].append(row[2])
-
-        return jsonify(data), 200
+        plan = reads.correlation_data(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
+    try:
+        return run_read(plan)
     except Exception as e:
         app.logger.error(f"Error retrieving correlation data: {e}", exc_info=True)
         return jsonify({'error': 'Internal Server Error'}), 500
@@ -319,31 +325,16 @@ def correlation_data(current_user):
 # for Homepage.js
 @api.route('/recent-data', methods=['GET'])
 @token_required
+@conditional(window_hours=24)
+@response_cache.cached()
 def recent_data(current_user):
-    from app import mysql  # Import here to avoid circular import
-    from datetime import datetime, timedelta
-
     try:
-        cur = mysql.connection.cursor()
-        # Get average entries for the last 24 hours
-        now = datetime.now()
-        last_24h = now - timedelta(hours=24)
-        last_24h_str = last_24h.strftime('%Y-%m-%d %H:%M:%S')
-
-        cur.execute("""
-            SELECT location, AVG(ph_value) AS ph_value, AVG(temperature) AS temperature, AVG(turbidity) AS turbidity, date, time
-            FROM sensor_data
-            WHERE CONCAT(date, ' ', time) >= %s
-            GROUP BY location, date, time
-            ORDER BY date DESC, time DESC
-        """, (last_24h_str,))
-        rows = cur.fetchall()
-        cur.close()
+        plan = reads.recent_data(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        columns = ['location', 'ph_value', 'temperature', 'turbidity', 'date', 'time']
-        data = [dict(zip(columns, row)) for row in rows]
-
-        return jsonify(data), 200
+    try:
+        return run_read(plan)
     except Exception as e:
         app.logger.error(f"Error retrieving recent data: {e}", exc_info=True)
         return jsonify({'error': 'Internal Server Error'}), 500
@@ -354,93 +345,61 @@ def recent_data(current_user):
 # live-update nav page
 @api.route('/data', methods=['GET'])
 @token_required
+@conditional()
 def get_data(current_user):
-    from app import mysql  # Import here to avoid circular import
-
-    date_filter = request.args.get('date')
-    location_filter = request.args.get('location')
-
     try:
-        cur = mysql.connection.cursor()
-        query = "SELECT * FROM sensor_data"
-        filters = []
-        params = []
-
-        # Add filters if provided
-        if date_filter:
-            filters.append("date = %s")
-            params.append(date_filter)
-        if location_filter:
-            filters.append("location = %s")
-            params.append(location_filter)
-
-        # Append filters to the query if any
-        if filters:
-            query += " WHERE " + " AND ".join(filters)
-
-        # Add ORDER BY clause to sort by id in descending order
-        query += " ORDER BY id DESC"
-
-        cur.execute(query, params)
-        rows = cur.fetchall()
-
-        # Handle cases where no rows are returned
-        if not rows:
-            return jsonify({'message': 'No data found'}), 404
+        plan = reads.data(request.args, app.config)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        # Ensure cur.description is not None
-        if cur.description:
-            columns = [desc[0] for desc in cur.description]
-            data = [dict(zip(columns, row)) for row in rows]
-        else:
-            data = []
-
-        cur.close()
-        return jsonify(data), 200
+    try:
+        return run_read(plan)
     except Exception as e:
-        app.logger.error(f"Error retrieving data: {e}")
+        app.logger.error(f"Error retrieving data: {e}", exc_info=True)
         return jsonify({'error': 'Internal Server Error'}), 500
 
 
+# live-update nav page: push new readings as Server-Sent Events
+@api.route('/data/stream', methods=['GET'])
+@token_required
+def data_stream(current_user):
+    location_filter = request.args.get('location')
+    # Browsers resend the id of the last event they saw when reconnecting
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID must be an integer'}), 400
+
+    # token_required may have checked out a pooled connection. Give it back
+    # now: stream_with_context keeps the request context around for as long
+    # as the dashboard stays open, and whether teardown runs before or after
+    # the stream depends on the Flask version. The feed runs its queries in
+    # short-lived app contexts of its own.
+    mysql.teardown(None)
+    response = Response(
+        stream_with_context(live_feed.events(location_filter, last_id)),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
 #from the graph  from NAV 
 @api.route('/graph-data', methods=['GET'])
 @token_required
+@conditional()
+@response_cache.cached()
 def get_graph_data(current_user):
-    from app import mysql  # Import here to avoid circular import
-
-    # Get query parameters
-    start_date = request.args.get('startDate')
-    end_date = request.args.get('endDate')
-    location = request.args.get('location')
-    data_type = request.args.get('dataType')  # Get dataType from the query parameters
-
-    # Validate inputs
-    if not start_date or not end_date or not location or not data_type:
-        return jsonify({'error': 'startDate, endDate, location, and dataType are required'}), 400
-
-    # Validate dataType to prevent SQL injection
-    if data_type not in ['ph_value', 'temperature', 'turbidity']:
-        return jsonify({'error': 'Invalid dataType. Must be "ph_value" or "temperature" or "turbidity"'}), 400
-
     try:
-        cur = mysql.connection.cursor()
+        plan = reads.graph_data(request.args, app.config)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        # Dynamically use the selected dataType column in the query
-        query = f"""
-            SELECT date, AVG({data_type}) AS value
-            FROM sensor_data
-            WHERE date >= %s AND date <= %s AND location = %s
-            GROUP BY date
-            ORDER BY date
-        """
-        cur.execute(query, (start_date, end_date, location))
-        rows = cur.fetchall()
-        cur.close()
-
-        # Convert data to JSON format
-        data = [{'date': row[0], 'value': row[1]} for row in rows]
-
-        return jsonify(data), 200
+    try:
+        return run_read(plan)
     except Exception as e:
         app.logger.error(f"Error retrieving graph data: {e}", exc_info=True)
         return jsonify({'error': 'Internal Server Error'}), 500
@@ -449,51 +408,16 @@ def get_graph_data(current_user):
 # compare_graph NAV
 @api.route('/compare-graph-data', methods=['GET'])
 @token_required
+@conditional()
+@response_cache.cached()
 def compare_graph_data(current_user):
-    from app import mysql  # Import here to avoid circular import
-
-    # Get query parameters
-    start_date = request.args.get('startDate')
-    end_date = request.args.get('endDate')
-    locations = request.args.get('locations')  # Get locations as a comma-separated string
-    data_type = request.args.get('dataType')  # Get dataType (e.g., ph_value or temperature)
-
-    # Validate inputs
-    if not start_date or not end_date or not locations or not data_type:
-        return jsonify({'error': 'startDate, endDate, locations, and dataType are required'}), 400
-
-    # Validate data_type to prevent SQL injection
-    if data_type not in ['ph_value', 'temperature','turbidity']:
-        return jsonify({'error': 'Invalid dataType. Must be "ph_value" or "temperature" or "turbidity"'}), 400
-
     try:
-        # Split locations into a list
-        location_list = locations.split(',')
+        plan = reads.compare_graph_data(request.args, app.config)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        cur = mysql.connection.cursor()
-
-        # Query to get daily averages grouped by location and date
-        query = f"""
-            SELECT location, date, AVG({data_type}) AS value
-            FROM sensor_data
-            WHERE date >= %s AND date <= %s AND location IN ({','.join(['%s'] * len(location_list))})
-            GROUP BY location, date
-            ORDER BY date, location
-        """
-        params = [start_date, end_date] + location_list
-        cur.execute(query, params)
-        rows = cur.fetchall()
-        cur.close()
-
-        # Convert data to JSON format
-        data = {}
-        for row in rows:
-            location, date, value = row
-            if location not in data:
-                data[location] = []
-            data[location].append({'date': date, 'value': value})
-
-        return jsonify(data), 200
+    try:
+        return run_read(plan)
     except Exception as e:
         app.logger.error(f"Error retrieving comparison graph data: {e}", exc_info=True)
         return jsonify({'error': 'Internal Server Error'}), 500
@@ -502,21 +426,15 @@ def compare_graph_data(current_user):
 
 @api.route('/all-data', methods=['GET'])
 @token_required
+@conditional()
 def all_data(current_user):
     try:
-        cur = mysql.connection.cursor()
-        cur.execute("""
-            SELECT id, location, ph_value, temperature, turbidity, date, time
-            FROM sensor_data
-            ORDER BY date DESC, time DESC
-        """)
-        rows = cur.fetchall()
-        cur.close()
+        plan = reads.all_data(request.args, app.config)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        columns = ['id', 'location', 'ph_value', 'temperature', 'turbidity', 'date', 'time']
-        data = [dict(zip(columns, row)) for row in rows]
-
-        return jsonify(data), 200
+    try:
+        return run_read(plan)
     except Exception as e:
         app.logger.error(f"Error retrieving all data: {e}", exc_info=True)
         return jsonify({'error': 'Internal Server Error'}), 500
@@ -525,9 +443,6 @@ def all_data(current_user):
 @api.route('/create-data', methods=['POST'])
 @token_required
 def create_data(current_user):
-    from app import mysql
-    from datetime import datetime
-
     try:
         data = request.json
         location = data.get('location')
@@ -538,34 +453,79 @@ def create_data(current_user):
         if not all([location, ph_value, temperature, turbidity]):
             return jsonify({'error': 'All fields are required'}), 400
 
-        now = datetime.now()
-        date = now.strftime('%Y-%m-%d')
-        time = now.strftime('%H:%M:%S')
+        # Check the values are numbers; the current date and time are filled in
+        try:
+            row = ingest.parse_reading({'location': location, 'ph_value': ph_value,
+                                        'temperature': temperature, 'turbidity': turbidity})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-        cur = mysql.connection.cursor()
-        cur.execute("""
-            INSERT INTO sensor_data (location, ph_value, temperature, turbidity, date, time)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (location, ph_value, temperature, turbidity, date, time))
-        mysql.connection.commit()
-        cur.close()
+        # Insert data into the database (or queue it for the write-behind flusher)
+        save_reading(row)
 
         return jsonify({'message': 'Record created successfully'}), 201
+    except BufferFull:
+        return buffer_full_response()
     except Exception as e:
         app.logger.error(f"Error creating new record: {e}", exc_info=True)
         return jsonify({'error': 'Internal Server Error'}), 500
 
 
 
+# batch ingestion for field gateways
+@api.route('/create-data/batch', methods=['POST'])
+@token_required
+def create_data_batch(current_user):
+    try:
+        readings, errors = ingest.read_batch(request)
+        if readings is None:
+            return jsonify({'error': 'Body must be a JSON array of readings, an object with a "readings" array, or NDJSON'}), 400
+
+        max_rows = app.config['INGEST_BATCH_MAX_ROWS']
+        if len(readings) + len(errors) > max_rows:
+            return jsonify({'error': f'A batch can contain at most {max_rows} readings'}), 413
+
+        rows = []
+        for index, reading in readings:
+            try:
+                rows.append(ingest.parse_reading(reading))
+            except ValueError as e:
+                errors.append({'index': index, 'error': str(e)})
+
+        # All valid rows go in with one commit, invalid ones are reported back per row
+        if rows:
+            cur = mysql.connection.cursor()
+            ingest.insert_readings(cur, rows, app.config['INGEST_BATCH_CHUNK_SIZE'])
+            mysql.connection.commit()
+            cur.close()
+            response_cache.bump_version()
+            live_feed.notify()
+
+        errors.sort(key=lambda error: error['index'])
+        result = {'inserted': len(rows), 'rejected': len(errors), 'errors': errors}
+        return jsonify(result), 201 if rows else 400
+    except Exception as e:
+        app.logger.error(f"Error creating batch records: {e}", exc_info=True)
+        return jsonify({'error': 'Internal Server Error'}), 500
+
+
 @api.route('/delete-data/<int:id>', methods=['OPTIONS', 'DELETE'])
 @token_required
 def delete_data(current_user, id):
     try:
         cur = mysql.connection.cursor()
+        if app.config['ROLLUPS_ENABLED']:
+            cur.execute("SELECT location, recorded_at FROM sensor_data WHERE id = %s FOR UPDATE", (id,))
+            points = cur.fetchall()
         cur.execute("DELETE FROM sensor_data WHERE id = %s", (id,))
-        mysql.connection.commit()
         affected_rows = cur.rowcount
+        if app.config['ROLLUPS_ENABLED'] and affected_rows:
+            rollups.refresh_buckets(cur, points)
+        if affected_rows:
+            bump_data_version(cur)
+        mysql.connection.commit()
         cur.close()
+        response_cache.bump_version()
 
         if affected_rows == 0:
             return jsonify({'message': 'No record found with that ID'}), 404
@@ -589,14 +549,23 @@ def update_data(current_user, id):
             return jsonify({'error': 'All fields are required'}), 400
 
         cur = mysql.connection.cursor()
+        if app.config['ROLLUPS_ENABLED']:
+            cur.execute("SELECT location, recorded_at FROM sensor_data WHERE id = %s FOR UPDATE", (id,))
+            points = cur.fetchall()
         cur.execute("""
             UPDATE sensor_data
             SET location = %s, ph_value = %s, temperature = %s, turbidity = %s
             WHERE id = %s
         """, (location, ph_value, temperature, turbidity, id))
-        mysql.connection.commit()
         affected_rows = cur.rowcount
+        if app.config['ROLLUPS_ENABLED'] and affected_rows:
+            # Both the old and the new location's buckets may have changed
+            rollups.refresh_buckets(cur, list(points) + [(location, recorded_at) for _, recorded_at in points])
+        if affected_rows:
+            bump_data_version(cur)
+        mysql.connection.commit()
         cur.close()
+        response_cache.bump_version()
 
         if affected_rows == 0:
             return jsonify({'message': 'No record found with that ID or no changes made'}), 404
@@ -612,9 +581,6 @@ def update_data(current_user, id):
 
 @api.route('/test-create-data', methods=['POST'])
 def test_create_data():
-    from app import mysql
-    from datetime import datetime
-
     try:
         # Extract data from the request
         data = request.json
@@ -627,21 +593,19 @@ def test_create_data():
         if not all([location, ph_value, temperature, turbidity]):
             return jsonify({'error': 'All fields are required'}), 400
 
-        # Automatically set current date and time
-        now = datetime.now()
-        date = now.strftime('%Y-%m-%d')
-        time = now.strftime('%H:%M:%S')
+        # Check the values are numbers; the current date and time are filled in
+        try:
+            row = ingest.parse_reading({'location': location, 'ph_value': ph_value,
+                                        'temperature': temperature, 'turbidity': turbidity})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-        # Insert data into the database
-        cur = mysql.connection.cursor()
-        cur.execute("""
-            INSERT INTO sensor_data (location, ph_value, temperature, turbidity, date, time)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (location, ph_value, temperature, turbidity, date, time))
-        mysql.connection.commit()
-        cur.close()
+        # Insert data into the database (or queue it for the write-behind flusher)
+        save_reading(row)
 
         return jsonify({'message': 'Record added successfully for testing'}), 201
+    except BufferFull:
+        return buffer_full_response()
     except Exception as e:
         app.logger.error(f"Error creating test record: {e}", exc_info=True)
         return jsonify({'error': 'Internal Server Error'}), 500
@@ -651,9 +615,6 @@ def test_create_data():
 
 @api.route('/test-create-data-url', methods=['GET'])
 def test_create_data_url():
-    from app import mysql
-    from datetime import datetime
-
     try:
         # Extract data from query parameters
         location = request.args.get('location')
@@ -665,21 +626,19 @@ def test_create_data_url():
         if not all([location, ph_value, temperature, turbidity]):
             return jsonify({'error': 'All query parameters are required'}), 400
 
-        # Automatically set current date and time
-        now = datetime.now()
-        date = now.strftime('%Y-%m-%d')
-        time = now.strftime('%H:%M:%S')
+        # Check the values are numbers; the current date and time are filled in
+        try:
+            row = ingest.parse_reading({'location': location, 'ph_value': ph_value,
+                                        'temperature': temperature, 'turbidity': turbidity})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-        # Insert data into the database
-        cur = mysql.connection.cursor()
-        cur.execute("""
-            INSERT INTO sensor_data (location, ph_value, temperature, turbidity, date, time)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (location, ph_value, temperature, turbidity, date, time))
-        mysql.connection.commit()
-        cur.close()
+        # Insert data into the database (or queue it for the write-behind flusher)
+        save_reading(row)
 
         return jsonify({'message': 'Record added successfully via URL'}), 201
+    except BufferFull:
+        return buffer_full_response()
     except Exception as e:
         app.logger.error(f"Error creating record via URL: {e}", exc_info=True)
         return jsonify({'error': 'Internal Server Error'}), 500
@@ -687,8 +646,6 @@ def test_create_data_url():
 
 @api.route('/data-old', methods=['POST'])
 def data_old():
-    from app import mysql
-
     try:
         # Extract data from the POST request
         data = request.form
@@ -704,18 +661,58 @@ def data_old():
         if not all([location, ph_value, temperature, turbidity, date, time]):
             return jsonify({'error': 'All fields (location, ph_value, temperature, turbidity, date, time) are required'}), 400
 
-        # Insert data into the database
-        cur = mysql.connection.cursor()
-        query = """
-            INSERT INTO sensor_data (location, ph_value, temperature, turbidity, date, time)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        cur.execute(query, (location, ph_value, temperature, turbidity, date, time))
-        mysql.connection.commit()
-        cur.close()
+        try:
+            row = ingest.parse_reading({'location': location, 'ph_value': ph_value, 'temperature': temperature,
+                                        'turbidity': turbidity, 'date': date, 'time': time})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Insert data into the database (or queue it for the write-behind flusher)
+        save_reading(row)
 
         return jsonify({'message': 'Data inserted successfully'}), 201
+    except BufferFull:
+        return buffer_full_response()
     except Exception as e:
         app.logger.error(f"Error in /data-old: {e}", exc_info=True)
         return jsonify({'error': 'Internal Server Error'}), 500
 
+
+
+#------------------------------runtime stats for this worker process
+
+@api.route('/stats', methods=['GET'])
+@token_required
+def runtime_stats(current_user):
+    return jsonify({
+        'ingest_buffer': write_buffer.get_stats(),
+        'user_cache': user_cache.get_stats(),
+        'db_pool': mysql.get_stats(),
+        'response_cache': response_cache.get_stats(),
+        'live_feed': {'subscribers': live_feed.subscriber_count()},
+        'query_profiler': query_profiler.get_stats()
+    }), 200
+
+
+# Requests of this worker that ran a query slower than QUERY_PROFILE_SLOW_MS, newest first.
+# Admins only: the statements carry other users' query parameters.
+@api.route('/stats/slow-requests', methods=['GET'])
+@token_required
+def slow_requests(current_user):
+    if current_user.user_type != 'admin':
+        return jsonify({'message': 'Admin access required'}), 403
+    return jsonify({'requests': query_profiler.recent_slow_requests()}), 200
+
+
+# Prometheus scrape target. Not behind token_required, since the scraper has
+# no user account; set METRICS_TOKEN to require it as a bearer token.
+@api.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    if not metrics.enabled:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    expected = app.config['METRICS_TOKEN']
+    supplied = request.headers.get('Authorization', '')
+    if expected and not hmac.compare_digest(supplied, f'Bearer {expected}'):
+        return jsonify({'message': 'Invalid metrics token'}), 401
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
@@ -0,0 +1,253 @@
+# routes/async_reads.py
+#
+# Async versions of the read endpoints in routes/__init__.py, served by the
+# Quart app in app/asgi.py. Queries and response shapes come from
+# services.reads, so both serving modes answer identically. The blueprint is
+# also named 'api' so ETags and response cache keys match the Flask ones.
+
+import asyncio
+from functools import wraps
+
+import jwt
+from quart import Blueprint, Response, current_app as app, jsonify, make_response, request
+from quart.wrappers.response import DataBody
+
+from app import response_cache, token_versions, user_cache
+from models import User
+from services import reads
+from services.conditional import etag_failed, etag_query, make_etag, tag, tagging_enabled
+from services.streaming import STREAM_FORMATS, encode_chunk
+from services.token_versions import VERSIONS_QUERY
+
+api = Blueprint('api', __name__)
+
+
+def db():
+    return app.extensions['async_mysql']
+
+
+def token_required(f):
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        token = None
+        # JWT is passed in the request header
+        if 'Authorization' in request.headers:
+            auth_header = request.headers['Authorization']
+            if auth_header.startswith('Bearer '):
+                token = auth_header[7:]  # Remove 'Bearer ' prefix
+            else:
+                token = auth_header
+        if not token:
+            return jsonify({'message': 'Token is missing!'}), 401
+        try:
+            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+            user_id = data['user_id']
+            if app.config['JWT_STATELESS'] and 'ver' in data:
+                # Stateless token: the profile travels in the claims
+                if token_versions.stale():
+                    rows, _ = await db().fetch(VERSIONS_QUERY)
+                    token_versions.load(rows)
+                if data['ver'] < token_versions.get(user_id):
+                    return jsonify({'message': 'Token has been revoked!'}), 401
+                current_user = User(
+                    id=user_id,
+                    firstname=data['firstname'],
+                    lastname=data['lastname'],
+                    username=data['username'],
+                    password=None,
+                    email=data['email'],
+                    user_type=data['user_type']
+                )
+            else:
+                # Serve the user from the per-process cache, falling back to the database
+                current_user = user_cache.get(user_id)
+                if current_user is None:
+                    rows, _ = await db().fetch("SELECT * FROM users WHERE id = %s", (user_id,))
+                    if not rows:
+                        return jsonify({'message': 'User not found'}), 401
+                    current_user = User(*rows[0][:7])
+                    user_cache.set(current_user)
+        except jwt.ExpiredSignatureError:
+            return jsonify({'message': 'Token has expired!'}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({'message': 'Token is invalid!'}), 401
+        return await f(current_user, *args, **kwargs)
+    return decorated
+
+
+def conditional(window_hours=None):
+    """Async counterpart of services.conditional.conditional."""
+    def decorator(f):
+        @wraps(f)
+        async def decorated(*args, **kwargs):
+            if not tagging_enabled(app):
+                return await f(*args, **kwargs)
+
+            try:
+                rows, _ = await db().fetch(*etag_query(window_hours, app.config['CONDITIONAL_GET_TRAILING_IDS']))
+                etag = make_etag(request, rows[0] if rows else None)
+            except Exception as e:
+                # Serve the full response rather than failing the request
+                etag_failed(app, e)
+                return await f(*args, **kwargs)
+            if request.if_none_match.contains(etag):
+                response = app.response_class('', status=304)
+            else:
+                response = await make_response(await f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            return tag(response, etag)
+        return decorated
+    return decorator
+
+
+def cached(f):
+    """Async counterpart of response_cache.cached()."""
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        if not response_cache.enabled:
+            return await f(*args, **kwargs)
+
+        # The redis backend does network I/O, both for the data version that
+        # goes into the key and for the lookup, so keep it off the event loop
+        blocking = response_cache.backend.blocking
+        if blocking:
+            key, body = await asyncio.to_thread(response_cache.fetch, request._get_current_object())
+        else:
+            key, body = response_cache.fetch(request)
+        if body is not None:
+            return response_cache.hit_response(await make_response(body))
+
+        response = await make_response(await f(*args, **kwargs))
+        if key is not None and response.status_code == 200 and isinstance(response.response, DataBody):
+            body = await response.get_data()
+            if blocking:
+                await asyncio.to_thread(response_cache.store, key, body)
+            else:
+                response_cache.store(key, body)
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    return decorated
+
+
+async def run_read(plan):
+    # Execute a read plan from services.reads and build its response
+    if plan.stream:
+        return stream_query(plan.query, plan.params, plan.stream)
+    rows, columns = await db().fetch(plan.query, plan.params)
+    body, status = plan.shape(rows, columns)
+    return jsonify(body), status
+
+
+def stream_query(query, params, fmt):
+    """Async counterpart of services.streaming.stream_query."""
+    chunk_rows = app.config['STREAM_CHUNK_ROWS']
+    dumps = app.json.dumps
+    logger = app.logger
+    source = db()
+
+    async def generate():
+        first = True
+        try:
+            if fmt == 'json':
+                yield '['
+            async for rows, columns in source.stream(query, params, chunk_rows):
+                yield encode_chunk(rows, columns, fmt, first, dumps)
+                first = False
+            if fmt == 'json':
+                yield ']'
+        except Exception as e:
+            logger.error(f"Error streaming query results: {e}", exc_info=True)
+
+    response = Response(generate(), mimetype=STREAM_FORMATS[fmt])
+    # A full-table stream can take longer than Quart's RESPONSE_TIMEOUT
+    response.timeout = None
+    return response
+
+
+async def read_view(planner, label):
+    try:
+        plan = planner()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        return await run_read(plan)
+    except Exception as e:
+        app.logger.error(f"Error retrieving {label}: {e}", exc_info=True)
+        return jsonify({'error': 'Internal Server Error'}), 500
+
+
+@api.route('/summary-insights', methods=['GET'])
+@token_required
+@conditional(window_hours=24)
+@cached
+async def summary_insights(current_user):
+    return await read_view(lambda: reads.summary_insights(request.args), 'summary insights')
+
+
+@api.route('/correlation-data', methods=['GET'])
+@token_required
+@conditional(window_hours=24)
+@cached
+async def correlation_data(current_user):
+    return await read_view(lambda: reads.correlation_data(request.args), 'correlation data')
+
+
+@api.route('/recent-data', methods=['GET'])
+@token_required
+@conditional(window_hours=24)
+@cached
+async def recent_data(current_user):
+    return await read_view(lambda: reads.recent_data(request.args), 'recent data')
+
+
+@api.route('/data', methods=['GET'])
+@token_required
+@conditional()
+async def get_data(current_user):
+    return await read_view(lambda: reads.data(request.args, app.config), 'data')
+
+
+@api.route('/data/stream', methods=['GET'])
+@token_required
+async def data_stream(current_user):
+    location_filter = request.args.get('location')
+    # Browsers resend the id of the last event they saw when reconnecting
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID must be an integer'}), 400
+
+    feed = app.extensions['async_live_feed']
+    response = Response(feed.events(location_filter, last_id), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    # SSE connections stay open; Quart would otherwise cut them off
+    response.timeout = None
+    return response
+
+
+@api.route('/graph-data', methods=['GET'])
+@token_required
+@conditional()
+@cached
+async def get_graph_data(current_user):
+    return await read_view(lambda: reads.graph_data(request.args, app.config), 'graph data')
+
+
+@api.route('/compare-graph-data', methods=['GET'])
+@token_required
+@conditional()
+@cached
+async def compare_graph_data(current_user):
+    return await read_view(lambda: reads.compare_graph_data(request.args, app.config), 'comparison graph data')
+
+
+@api.route('/all-data', methods=['GET'])
+@token_required
+@conditional()
+async def all_data(current_user):
+    return await read_view(lambda: reads.all_data(request.args, app.config), 'all data')
@@ -0,0 +1,200 @@
+# serve.py
+#
+# Production launcher. Sizes the server from the container's cgroup CPU and
+# memory limits instead of gunicorn's defaults:
+#
+#   python serve.py              # gunicorn, gthread workers, Flask app
+#   python serve.py --mode async # hypercorn, asgi.py
+#   python serve.py --print      # show the chosen settings and exit
+#
+# Any setting can be pinned with its SERVER_* environment variable.
+
+import argparse
+import os
+import shutil
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Rough resident size of one worker with the app loaded, used to keep the
+# worker count inside the memory limit
+WORKER_MEMORY_MB = int(os.getenv('SERVER_WORKER_MEMORY_MB', '150'))
+# Memory left for the master process and per-request spikes
+MEMORY_HEADROOM_MB = int(os.getenv('SERVER_MEMORY_HEADROOM_MB', '96'))
+
+
+def cgroup_cpu_limit():
+    """CPUs this container may use: the CFS quota if set, else the CPUs we can run on."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: a quota of -1 means unlimited
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = int(f.read())
+            if quota > 0:
+                return quota / period
+        except (OSError, ValueError):
+            pass
+    try:
+        return float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return float(os.cpu_count() or 1)
+
+
+def cgroup_memory_limit_mb():
+    """Memory limit in MB, or None when the container is not limited."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value == 'max':
+            return None
+        limit = int(value) // (1024 * 1024)
+        # cgroup v1 reports "unlimited" as a huge page-aligned number
+        return limit if limit < 1024 * 1024 * 1024 else None
+    return None
+
+
+def plan(mode):
+    """Pick worker settings for the detected limits.
+
+    Workers: 1 below one CPU, otherwise 2 per CPU (a process spends much of
+    a request waiting on MySQL, so two keep a CPU busy), then capped so
+    that they fit the memory limit. Threads cover the waiting inside a
+    process and are capped at the connection pool size, as extra threads
+    would only queue for a connection.
+
+    Sync mode always defaults to gthread workers, whatever the limits: an
+    open /data/stream holds its thread for as long as the client stays, and
+    a plain sync worker would serve nothing else meanwhile and be killed by
+    the heartbeat timeout. Async mode runs hypercorn's asyncio workers.
+    """
+    cpus = cgroup_cpu_limit()
+    memory_mb = cgroup_memory_limit_mb()
+
+    workers = 1 if cpus < 1 else int(cpus * 2)
+    if memory_mb is not None:
+        workers = min(workers, max(1, (memory_mb - MEMORY_HEADROOM_MB) // WORKER_MEMORY_MB))
+    workers = int(os.getenv('SERVER_WORKERS', workers))
+
+    pool_size = int(os.getenv('MYSQL_POOL_MAX_SIZE', '10'))
+    threads = int(os.getenv('SERVER_THREADS', min(8, pool_size)))
+
+    max_requests = int(os.getenv('SERVER_MAX_REQUESTS', '5000'))
+    return {
+        'mode': mode,
+        'cpu_limit': round(cpus, 2),
+        'memory_limit_mb': memory_mb,
+        'bind': f"0.0.0.0:{os.getenv('PORT', '5000')}",
+        'workers': workers,
+        'worker_class': os.getenv('SERVER_WORKER_CLASS', 'asyncio' if mode == 'async' else 'gthread'),
+        'threads': threads,
+        # Recycle workers now and then to cap slow leaks; the jitter keeps
+        # them from all restarting at once
+        'max_requests': max_requests,
+        'max_requests_jitter': int(os.getenv('SERVER_MAX_REQUESTS_JITTER', max_requests // 10)),
+        # Heartbeat timeout; gthread workers keep beating during long requests
+        'timeout': int(os.getenv('SERVER_TIMEOUT', '60')),
+        # Kubernetes sends SIGKILL 30s after SIGTERM by default, so finish
+        # in-flight requests and the write buffer flush inside that
+        'graceful_timeout': int(os.getenv('SERVER_GRACEFUL_TIMEOUT', '25')),
+        'keepalive': int(os.getenv('SERVER_KEEPALIVE', '5')),
+    }
+
+
+def drain_write_buffer(worker):
+    # Runs in each worker as it exits, after it stopped accepting requests
+    from app import write_buffer
+
+    write_buffer.stop()
+
+
+def prepare_metrics_dir():
+    """Give the workers an empty directory for their Prometheus sample files.
+
+    Must run before the app (and prometheus_client) is imported. Files left
+    by a previous run would otherwise be summed into the new counters.
+    """
+    if os.getenv('METRICS_ENABLED', 'true').lower() != 'true':
+        return
+    path = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/water360-metrics')
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def mark_worker_dead(worker):
+    # Drops the exited worker's in-progress gauge; its counters are kept
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def run_gunicorn(settings):
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key in ('bind', 'workers', 'worker_class', 'threads', 'max_requests',
+                        'max_requests_jitter', 'timeout', 'graceful_timeout', 'keepalive'):
+                self.cfg.set(key, settings[key])
+            # Import the app once in the master so workers fork with it loaded
+            self.cfg.set('preload_app', True)
+            # The heartbeat file on tmpfs, so a slow overlay disk cannot stall workers
+            self.cfg.set('worker_tmp_dir', '/dev/shm' if os.path.isdir('/dev/shm') else None)
+            self.cfg.set('worker_exit', lambda server, worker: drain_write_buffer(worker))
+            self.cfg.set('child_exit', lambda server, worker: mark_worker_dead(worker))
+            self.cfg.set('accesslog', os.getenv('SERVER_ACCESS_LOG', '-') or None)
+
+        def load(self):
+            from app import create_app
+
+            return create_app()
+
+    Server().run()
+
+
+def run_hypercorn(settings):
+    from hypercorn.config import Config
+    from hypercorn.run import run
+
+    config = Config()
+    config.application_path = 'asgi:app'
+    config.bind = [settings['bind']]
+    config.workers = settings['workers']
+    config.worker_class = settings['worker_class']
+    config.graceful_timeout = settings['graceful_timeout']
+    config.keep_alive_timeout = settings['keepalive']
+    config.accesslog = os.getenv('SERVER_ACCESS_LOG', '-') or None
+    run(config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the backend sized to the container limits.')
+    parser.add_argument('--mode', choices=['sync', 'async'], default=os.getenv('SERVER_MODE', 'sync'))
+    parser.add_argument('--print', action='store_true', help='Print the chosen settings and exit')
+    args = parser.parse_args()
+
+    settings = plan(args.mode)
+    print('Server settings: ' + ', '.join(f'{key}={value}' for key, value in settings.items()), flush=True)
+    if args.print:
+        return
+    prepare_metrics_dir()
+    if args.mode == 'async':
+        run_hypercorn(settings)
+    else:
+        run_gunicorn(settings)
+
+
+if __name__ == '__main__':
+    main()
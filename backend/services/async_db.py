@@ -0,0 +1,135 @@
+# services/async_db.py
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from services.db_pool import QUERY_OBSERVERS, PoolTimeout, observe_query
+from services.serialization import pymysql_conversions
+
+
+class AsyncMySQL:
+    """aiomysql connection pool for the async app (app/asgi.py).
+
+    Reads the same MYSQL_* settings as the sync pool, with its own
+    ASYNC_MYSQL_POOL_MIN_SIZE / ASYNC_MYSQL_POOL_MAX_SIZE, since one event
+    loop can keep far more queries in flight than a thread pool. Connections
+    run in autocommit mode so every read sees the latest committed rows.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.pool = None
+        self._waiters = 0
+        self._stats = {
+            'checkouts': 0,
+            'waited_checkouts': 0,
+            'timeouts': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+
+    async def start(self):
+        import aiomysql
+
+        config = self.app.config
+        self.pool = await aiomysql.create_pool(
+            host=config['MYSQL_HOST'],
+            port=config['MYSQL_PORT'],
+            user=config['MYSQL_USER'],
+            password=config['MYSQL_PASSWORD'],
+            db=config['MYSQL_DB'],
+            charset=config['MYSQL_CHARSET'],
+            connect_timeout=config['MYSQL_CONNECT_TIMEOUT'],
+            conv=pymysql_conversions(),
+            autocommit=True,
+            minsize=config['ASYNC_MYSQL_POOL_MIN_SIZE'],
+            maxsize=config['ASYNC_MYSQL_POOL_MAX_SIZE'],
+            pool_recycle=int(config['MYSQL_POOL_RECYCLE']),
+        )
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+
+    @asynccontextmanager
+    async def connection(self):
+        """Check out a connection, waiting at most MYSQL_POOL_TIMEOUT seconds.
+
+        The connection is released however the block exits.
+        """
+        timeout = self.app.config['MYSQL_POOL_TIMEOUT']
+        started = time.monotonic()
+        self._waiters += 1
+        try:
+            conn = await asyncio.wait_for(self.pool.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self._stats['timeouts'] += 1
+            raise PoolTimeout(f'No database connection available after {timeout}s '
+                              f'({self.pool.maxsize} in use)')
+        finally:
+            self._waiters -= 1
+
+        wait_ms = (time.monotonic() - started) * 1000
+        self._stats['checkouts'] += 1
+        self._stats['total_wait_ms'] += wait_ms
+        self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], wait_ms)
+        if wait_ms >= 1:
+            self._stats['waited_checkouts'] += 1
+        try:
+            yield conn
+        finally:
+            self.pool.release(conn)
+
+    async def fetch(self, query, params=()):
+        """Run a query and return (rows, column names)."""
+        async with self.connection() as conn:
+            async with conn.cursor() as cur:
+                started = time.perf_counter()
+                try:
+                    await cur.execute(query, params)
+                finally:
+                    if QUERY_OBSERVERS:
+                        observe_query(query, params, time.perf_counter() - started, cur.rowcount)
+                rows = await cur.fetchall()
+                columns = [desc[0] for desc in cur.description] if cur.description else []
+        return rows, columns
+
+    async def stream(self, query, params, chunk_rows):
+        """Yield (rows, column names) chunks read through an unbuffered cursor."""
+        import aiomysql
+
+        async with self.connection() as conn:
+            cur = await conn.cursor(aiomysql.SSCursor)
+            try:
+                started = time.perf_counter()
+                await cur.execute(query, params)
+                if QUERY_OBSERVERS:
+                    observe_query(query, params, time.perf_counter() - started, None)
+                columns = [desc[0] for desc in cur.description]
+                while True:
+                    rows = await cur.fetchmany(chunk_rows)
+                    if not rows:
+                        break
+                    yield rows, columns
+            finally:
+                await cur.close()
+
+    def get_stats(self):
+        stats = dict(self._stats)
+        if self.pool is not None:
+            stats['size'] = self.pool.size
+            stats['idle'] = self.pool.freesize
+            stats['in_use'] = self.pool.size - self.pool.freesize
+            stats['min_size'] = self.pool.minsize
+            stats['max_size'] = self.pool.maxsize
+        stats['waiters'] = self._waiters
+        stats['avg_wait_ms'] = stats['total_wait_ms'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        return stats
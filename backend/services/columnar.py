@@ -0,0 +1,29 @@
+# services/columnar.py
+
+RESPONSE_FORMATS = ('rows', 'columnar')
+
+
+def wants_columnar(args):
+    """Return True for ?format=columnar; raise ValueError for unknown formats."""
+    fmt = args.get('format', 'rows')
+    if fmt not in RESPONSE_FORMATS:
+        raise ValueError('format must be "rows" or "columnar"')
+    return fmt == 'columnar'
+
+
+def to_columnar(columns, rows):
+    """Turn query rows into one list per column.
+
+    Locations repeat on nearly every row, so they are dictionary-encoded: the
+    location column holds indexes into dictionaries['location']. Rows may carry
+    extra trailing values (e.g. sort keys); only the named columns are kept.
+    """
+    values = [list(column) for column in zip(*rows)] if rows else [[] for _ in columns]
+    data = dict(zip(columns, values))
+    result = {'format': 'columnar', 'count': len(rows), 'columns': list(columns), 'data': data}
+
+    if 'location' in data:
+        dictionary = {}
+        data['location'] = [dictionary.setdefault(location, len(dictionary)) for location in data['location']]
+        result['dictionaries'] = {'location': list(dictionary)}
+    return result
@@ -0,0 +1,134 @@
+# services/conditional.py
+
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+
+# One-row table whose version is bumped, in the same transaction, by every
+# update and delete of sensor_data (created by `flask add-data-version`)
+VERSION_TABLE = 'sensor_data_version'
+NO_SUCH_TABLE = 1146
+
+
+def create_version_table(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+            id TINYINT PRIMARY KEY,
+            version BIGINT NOT NULL,
+            changed_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)
+        )
+    """)
+    cur.execute(f"INSERT IGNORE INTO {VERSION_TABLE} (id, version) VALUES (1, 0)")
+
+
+def bump_data_version(cur):
+    """Record an update or delete of sensor_data; call before committing it.
+
+    Inserts do not need this, they show up in the id-based parts of the ETag.
+    Until `flask add-data-version` has been run there is no table to bump, and
+    the ETag query fails too, so responses are simply not tagged.
+    """
+    try:
+        cur.execute(f"UPDATE {VERSION_TABLE} SET version = version + 1 WHERE id = 1")
+    except Exception as e:
+        if not e.args or e.args[0] != NO_SUCH_TABLE:
+            raise
+
+
+def etag_query(window_hours=None, trailing_ids=10000):
+    """The (query, params) whose result row goes into the ETag, one round trip.
+
+    Any insert raises MAX(id). A row committed after a higher id (from a
+    concurrent transaction) leaves MAX(id) alone but changes how many rows
+    the trailing id range holds; updates and deletes bump the version row.
+    """
+    window = ''
+    params = [trailing_ids]
+    if window_hours:
+        window = ', (SELECT COUNT(*) FROM sensor_data WHERE recorded_at >= %s)'
+        params.append((datetime.now() - timedelta(hours=window_hours)).strftime('%Y-%m-%d %H:%M:%S'))
+    query = f"""
+        SELECT m.max_id, (SELECT COUNT(*) FROM sensor_data WHERE id > m.max_id - %s),
+               v.version, v.changed_at{window}
+        FROM (SELECT MAX(id) AS max_id FROM sensor_data) m
+        LEFT JOIN {VERSION_TABLE} v ON v.id = 1
+    """
+    return query, tuple(params)
+
+
+def make_etag(req, row):
+    """Hash the request's endpoint and query string with the etag_query result row."""
+    parts = [req.endpoint, sorted(req.args.items(multi=True)), tuple(row) if row else None]
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def current_etag(window_hours=None):
+    """Cheap fingerprint of the data behind the current request.
+
+    Built from the request's endpoint and query string and from the data
+    itself, so every worker and replica computes the same tag: the highest
+    sensor_data id and the row count of the trailing id range (inserts), the
+    shared version row (updates and deletes) and, for endpoints over a
+    sliding window, the number of rows still inside the window. It costs one
+    extra statement per request: a primary key range of
+    CONDITIONAL_GET_TRAILING_IDS rows plus, for window endpoints, a
+    recorded_at index range over the window.
+    """
+    from app import mysql  # Import here to avoid circular import
+
+    cur = mysql.connection.cursor()
+    cur.execute(*etag_query(window_hours, current_app.config['CONDITIONAL_GET_TRAILING_IDS']))
+    row = cur.fetchone()
+    cur.close()
+    return make_etag(request, row)
+
+
+def tagging_enabled(app):
+    return app.config['CONDITIONAL_GET'] and not app.extensions.get('conditional_get_unavailable')
+
+
+def etag_failed(app, error):
+    """Log a failed ETag computation. A missing version table turns tagging
+    off for this process with one warning instead of an error per request."""
+    if error.args and error.args[0] == NO_SUCH_TABLE:
+        app.extensions['conditional_get_unavailable'] = True
+        app.logger.warning(f"ETags disabled: {error}. Run `flask add-data-version` "
+                           f"and restart to enable them, or set CONDITIONAL_GET=false.")
+    else:
+        app.logger.error(f"Error computing ETag: {error}", exc_info=True)
+
+
+def tag(response, etag):
+    response.set_etag(etag)
+    # Let browsers keep the body but revalidate on every poll
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def conditional(window_hours=None):
+    """Answer 304 Not Modified when If-None-Match matches the current ETag,
+    without running the view; otherwise tag the view's 200 response."""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if not tagging_enabled(current_app):
+                return f(*args, **kwargs)
+
+            try:
+                etag = current_etag(window_hours)
+            except Exception as e:
+                # Serve the full response rather than failing the request
+                etag_failed(current_app, e)
+                return f(*args, **kwargs)
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            return tag(response, etag)
+        return decorated
+    return decorator
@@ -0,0 +1,330 @@
+# services/db_pool.py
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import MySQLdb
+import MySQLdb.cursors
+from flask import g
+
+# Callables run after every query as observer(query, params, seconds, rows);
+# rows is None when it is not known up front (unbuffered cursors, errors)
+QUERY_OBSERVERS = []
+
+
+def add_query_observer(observer):
+    if observer not in QUERY_OBSERVERS:
+        QUERY_OBSERVERS.append(observer)
+
+
+def observe_query(query, params, seconds, rows):
+    for observer in QUERY_OBSERVERS:
+        observer(query, params, seconds, rows)
+
+
+class InstrumentedCursorMixin:
+    """Times every execute() and reports it to the query observers."""
+
+    buffered = True
+
+    def execute(self, query, args=None):
+        if not QUERY_OBSERVERS:
+            return super().execute(query, args)
+        started = time.perf_counter()
+        rows = None
+        try:
+            result = super().execute(query, args)
+            if self.buffered:
+                rows = self.rowcount
+            return result
+        finally:
+            observe_query(query, args, time.perf_counter() - started, rows)
+
+
+class InstrumentedCursor(InstrumentedCursorMixin, MySQLdb.cursors.Cursor):
+    pass
+
+
+class InstrumentedSSCursor(InstrumentedCursorMixin, MySQLdb.cursors.SSCursor):
+    buffered = False
+
+
+class PoolTimeout(TimeoutError):
+    """Raised when no connection becomes free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Bounded pool of MySQLdb connections shared by the threads of one process.
+
+    At most max_size connections are open at once; a checkout waits up to
+    `timeout` seconds for one to be returned before raising PoolTimeout.
+    Connections idle for longer than ping_interval are pinged before reuse
+    and connections older than `recycle` seconds are replaced, so neither a
+    MySQL restart nor wait_timeout hands a dead connection to a request.
+    """
+
+    def __init__(self, connect, min_size=2, max_size=10, timeout=5.0, ping_interval=30.0, recycle=3600.0):
+        if min_size > max_size:
+            raise ValueError('Pool min_size cannot be larger than max_size')
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.recycle = recycle
+        # Idle entries are (connection, opened_at, returned_at); the newest is
+        # reused first so surplus connections age out through recycle
+        self._idle = deque()
+        self._opened_at = {}
+        self._size = 0
+        self._waiters = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'waited_checkouts': 0,
+            'timeouts': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'opened': 0,
+            'closed': 0,
+            'recycled': 0,
+            'failed_pings': 0,
+        }
+
+    def fill(self):
+        """Open connections until min_size are available."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append((conn, self._opened_at[id(conn)], time.monotonic()))
+                self._cond.notify()
+
+    def acquire(self):
+        """Check out a live connection, waiting up to the checkout timeout."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        entry = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Reserve the slot now, open the connection outside the lock
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f'No database connection available after {self.timeout}s '
+                                      f'({self.max_size} in use)')
+                self._waiters += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiters -= 1
+
+            wait_ms = (time.monotonic() - started) * 1000
+            self._stats['checkouts'] += 1
+            self._stats['total_wait_ms'] += wait_ms
+            self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], wait_ms)
+            if wait_ms >= 1:
+                self._stats['waited_checkouts'] += 1
+
+        try:
+            return self._open() if entry is None else self._revive(*entry)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool.
+
+        Any open transaction is rolled back so the next user starts clean. A
+        connection that fails the rollback (dropped, or with an unread
+        result) is closed instead of being reused.
+        """
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        if discard:
+            self._close(conn)
+        with self._cond:
+            if discard:
+                self._size -= 1
+            else:
+                self._idle.append((conn, self._opened_at[id(conn)], time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of a with block.
+
+        The connection goes back to the pool however the block exits; it is
+        discarded if the block raised a MySQL OperationalError.
+        """
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except MySQLdb.OperationalError:
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard)
+
+    def close_idle(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+            stats['waiters'] = self._waiters
+        stats['min_size'] = self.min_size
+        stats['max_size'] = self.max_size
+        stats['avg_wait_ms'] = stats['total_wait_ms'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        return stats
+
+    def _open(self):
+        conn = self._connect()
+        with self._cond:
+            self._opened_at[id(conn)] = time.monotonic()
+            self._stats['opened'] += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._opened_at.pop(id(conn), None)
+            self._stats['closed'] += 1
+
+    def _revive(self, conn, opened_at, returned_at):
+        now = time.monotonic()
+        if now - opened_at > self.recycle:
+            self._close(conn)
+            with self._cond:
+                self._stats['recycled'] += 1
+            return self._open()
+        if now - returned_at > self.ping_interval:
+            try:
+                conn.ping()
+            except MySQLdb.Error:
+                self._close(conn)
+                with self._cond:
+                    self._stats['failed_pings'] += 1
+                return self._open()
+        return conn
+
+
+class MySQLPool:
+    """Pooled replacement for flask_mysqldb.MySQL.
+
+    Reads the same MYSQL_* settings. `mysql.connection` checks a connection
+    out on first use in an app context and returns it when the context is
+    torn down, whether or not the request failed; code outside a request
+    uses `with mysql.connect() as conn:`. Each worker process builds its own
+    pool on first use, since connections cannot be shared across gunicorn's
+    fork.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.teardown_appcontext(self.teardown)
+
+    @property
+    def pool(self):
+        if self._pool is not None and self._pid == os.getpid():
+            return self._pool
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                config = self.app.config
+                pool = ConnectionPool(
+                    self._connect,
+                    min_size=config['MYSQL_POOL_MIN_SIZE'],
+                    max_size=config['MYSQL_POOL_MAX_SIZE'],
+                    timeout=config['MYSQL_POOL_TIMEOUT'],
+                    ping_interval=config['MYSQL_POOL_PING_INTERVAL'],
+                    recycle=config['MYSQL_POOL_RECYCLE'],
+                )
+                try:
+                    pool.fill()
+                except Exception as e:
+                    # Not fatal: connections are opened on demand once MySQL is back
+                    self.app.logger.warning(f"Could not pre-open database connections: {e}")
+                self._pool, self._pid = pool, os.getpid()
+        return self._pool
+
+    def connect(self):
+        return self.pool.connection()
+
+    @property
+    def connection(self):
+        if 'mysql_db' not in g:
+            g.mysql_db = self.pool.acquire()
+        return g.mysql_db
+
+    def teardown(self, exception):
+        conn = g.pop('mysql_db', None)
+        if conn is not None:
+            self.pool.release(conn, discard=isinstance(exception, MySQLdb.OperationalError))
+
+    def get_stats(self):
+        if self._pool is None or self._pid != os.getpid():
+            return {'size': 0, 'idle': 0, 'in_use': 0, 'waiters': 0}
+        return self._pool.get_stats()
+
+    def open_connection(self, **options):
+        """Open an unpooled connection with the app's settings plus `options`,
+        for bulk jobs that need connection flags the pool does not set."""
+        return self._connect(**options)
+
+    def _connect(self, **options):
+        config = self.app.config
+        kwargs = {
+            'host': config['MYSQL_HOST'],
+            'user': config['MYSQL_USER'],
+            'password': config['MYSQL_PASSWORD'],
+            'database': config['MYSQL_DB'],
+            'port': config['MYSQL_PORT'],
+            'connect_timeout': config['MYSQL_CONNECT_TIMEOUT'],
+            'charset': config['MYSQL_CHARSET'],
+            'autocommit': False,
+            'cursorclass': InstrumentedCursor,
+        }
+        kwargs.update(config.get('MYSQL_CUSTOM_OPTIONS') or {})
+        kwargs.update(options)
+        return MySQLdb.connect(**kwargs)
@@ -0,0 +1,108 @@
+# services/downsample.py
+
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Bucket sizes /graph-data picks from, smallest first, in seconds
+BUCKET_SIZES = [1, 5, 10, 30, 60, 300, 900, 1800, 3600, 3 * 3600, 6 * 3600, 12 * 3600,
+                86400, 7 * 86400, 30 * 86400]
+UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+BUCKET_PATTERN = re.compile(r'^(\d+)([smhd])$')
+
+
+def parse_bucket(value):
+    """Seconds in a bucket given as e.g. "30s", "15m", "1h" or "7d"."""
+    match = BUCKET_PATTERN.match(value or '')
+    if not match or int(match.group(1)) == 0:
+        raise ValueError('bucket must be a positive number followed by s, m, h or d (e.g. "15m")')
+    return int(match.group(1)) * UNIT_SECONDS[match.group(2)]
+
+
+def format_bucket(seconds):
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds % size == 0:
+            return f'{seconds // size}{unit}'
+    return f'{seconds}s'
+
+
+def parse_range(start_date, end_date):
+    """(start, end) datetimes of a graph range, end exclusive.
+
+    Dates cover whole days, as on the daily graph; ISO datetimes allow
+    ranges of a few hours.
+    """
+    try:
+        start = datetime.fromisoformat(start_date)
+        end = datetime.fromisoformat(end_date)
+    except ValueError:
+        raise ValueError('startDate and endDate must be YYYY-MM-DD dates or ISO datetimes')
+    if len(end_date) == 10:
+        end += timedelta(days=1)
+    if end <= start:
+        raise ValueError('endDate must be after startDate')
+    return start, end
+
+
+def pick_bucket(start, end, points):
+    """The smallest bucket size that splits the range into at most `points` buckets."""
+    span = (end - start).total_seconds()
+    for size in BUCKET_SIZES:
+        if span / size <= points:
+            return size
+    return int(-(-span // points))
+
+
+def bucket_origin(start, size):
+    """Start of the bucket holding `start`: buckets of a day or less line up
+    with midnight (so an hourly bucket starts on the hour), longer ones
+    start at the range's first midnight."""
+    midnight = datetime.combine(start.date(), datetime.min.time())
+    if size > 86400:
+        return midnight
+    offset = int((start - midnight).total_seconds()) // size * size
+    return midnight + timedelta(seconds=offset)
+
+
+def lttb(x, y, threshold):
+    """Indexes of the points kept by Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last points and, from each of threshold - 2 equal
+    buckets in between, the point forming the largest triangle with the
+    previously kept point and the average of the next bucket. The areas of
+    a bucket are computed in one vectorized step and the next-bucket
+    averages for all buckets up front; only the walk over buckets, which
+    depends on the previous choice, is a Python loop.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    # bounds[k]:bounds[k + 1] is bucket k; the final bound is the last point
+    bounds = np.append(np.floor(np.arange(threshold - 1) * every).astype(np.int64) + 1, n)
+    sum_x = np.concatenate(([0.0], np.cumsum(x)))
+    sum_y = np.concatenate(([0.0], np.cumsum(y)))
+    widths = bounds[2:] - bounds[1:-1]
+    avg_x = (sum_x[bounds[2:]] - sum_x[bounds[1:-1]]) / widths
+    avg_y = (sum_y[bounds[2:]] - sum_y[bounds[1:-1]]) / widths
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for k in range(threshold - 2):
+        lo, hi = bounds[k], bounds[k + 1]
+        area = np.abs((x[a] - avg_x[k]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[k] - y[a]))
+        a = lo + int(np.argmax(area))
+        kept[k + 1] = a
+    return kept
+
+
+def lttb_rows(rows, size, threshold):
+    """Run lttb over (slot, value) rows of `size`-second buckets and return the
+    kept points as (seconds from the origin, value) pairs."""
+    x = np.fromiter((row[0] * size for row in rows), dtype=float, count=len(rows))
+    y = np.fromiter((row[1] for row in rows), dtype=float, count=len(rows))
+    return [(int(x[i]), float(y[i])) for i in lttb(x, y, threshold)]
+
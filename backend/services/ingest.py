@@ -0,0 +1,110 @@
+# services/ingest.py
+
+import json
+import math
+from datetime import datetime
+
+from flask import current_app
+
+from services import rollups
+
+INSERT_COLUMNS = ('location', 'ph_value', 'temperature', 'turbidity', 'date', 'time', 'recorded_at')
+NUMERIC_FIELDS = rollups.NUMERIC_FIELDS
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+
+def parse_reading(data, require_timestamp=False):
+    """Validate one reading and return it as a (location, ph_value, temperature,
+    turbidity, date, time) row tuple.
+
+    Raises ValueError with a message suitable for returning to the client.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Reading must be a JSON object')
+
+    location = data.get('location')
+    if not location or not isinstance(location, str):
+        raise ValueError('location is required')
+
+    values = []
+    for field in NUMERIC_FIELDS:
+        value = data.get(field)
+        if value is None or value == '':
+            raise ValueError(f'{field} is required')
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{field} must be a number')
+        # float() also takes 'nan', 'inf' and '1e999', which MySQL refuses
+        if not math.isfinite(value):
+            raise ValueError(f'{field} must be a finite number')
+        values.append(value)
+
+    date = data.get('date')
+    time = data.get('time')
+    if date or time:
+        # Buffered readings keep the time they were taken, not the time we received them
+        try:
+            datetime.strptime(f'{date} {time}', '%Y-%m-%d %H:%M:%S')
+        except (TypeError, ValueError):
+            raise ValueError('date and time must be given together as YYYY-MM-DD and HH:MM:SS')
+    elif require_timestamp:
+        raise ValueError('date and time are required')
+    else:
+        now = datetime.now()
+        date = now.strftime('%Y-%m-%d')
+        time = now.strftime('%H:%M:%S')
+
+    return (location, *values, date, time)
+
+
+def read_batch(req):
+    """Extract the list of readings from a batch request.
+
+    Accepts a JSON array, an object with a "readings" array, or NDJSON (one
+    reading per line). Returns (readings, errors) where readings is a list of
+    (index, reading) pairs and errors holds lines that were not valid JSON, or
+    (None, None) if the body is not in any supported shape.
+    """
+    if req.mimetype in NDJSON_MIMETYPES:
+        readings, errors = [], []
+        lines = req.get_data(as_text=True).splitlines()
+        for index, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                readings.append((index, json.loads(line)))
+            except ValueError:
+                errors.append({'index': index, 'error': 'Invalid JSON'})
+        return readings, errors
+
+    body = req.get_json(silent=True)
+    if isinstance(body, dict):
+        body = body.get('readings')
+    if not isinstance(body, list):
+        return None, None
+    return list(enumerate(body)), []
+
+
+def insert_readings(cur, rows, chunk_size=500):
+    """Insert (location, ph_value, temperature, turbidity, date, time) rows with
+    one multi-row INSERT per chunk, filling recorded_at from date and time and
+    folding the rows into the hourly/daily rollups when those are enabled.
+
+    Committing is left to the caller so a whole batch lands in one transaction.
+    """
+    placeholders = '(' + ', '.join(['%s'] * len(INSERT_COLUMNS)) + ')'
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        params = []
+        for row in chunk:
+            params.extend(row)
+            params.append(f'{row[4]} {row[5]}')
+        cur.execute(
+            f"INSERT INTO sensor_data ({', '.join(INSERT_COLUMNS)}) VALUES "
+            + ', '.join([placeholders] * len(chunk)),
+            params
+        )
+    if current_app.config['ROLLUPS_ENABLED']:
+        rollups.apply_readings(cur, rows)
+    return len(rows)
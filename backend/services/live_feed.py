@@ -0,0 +1,470 @@
+# services/live_feed.py
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+ROW_COLUMNS = ('id', 'location', 'ph_value', 'temperature', 'turbidity', 'date', 'time')
+
+TAIL_QUERY = f"""
+    SELECT {', '.join(ROW_COLUMNS)}
+    FROM sensor_data
+    WHERE id > %s
+    ORDER BY id
+    LIMIT %s
+"""
+MAX_ID_QUERY = "SELECT COALESCE(MAX(id), 0) FROM sensor_data"
+# Ids of the rows in an id range the tailer already passed, to find rows
+# that committed after a higher id had been sent
+LATE_IDS_QUERY = "SELECT id FROM sensor_data WHERE id > %s AND id <= %s"
+
+
+def rows_by_id_query(ids):
+    return f"SELECT {', '.join(ROW_COLUMNS)} FROM sensor_data WHERE id IN ({', '.join(['%s'] * len(ids))}) ORDER BY id"
+
+
+def backlog_query(last_id, location, limit):
+    query = f"SELECT {', '.join(ROW_COLUMNS)} FROM sensor_data WHERE id > %s"
+    params = [last_id]
+    if location:
+        query += " AND location = %s"
+        params.append(location)
+    query += " ORDER BY id LIMIT %s"
+    params.append(limit)
+    return query, params
+
+
+def sse_message(row_id, payload):
+    return f'id: {row_id}\nevent: reading\ndata: {payload}\n\n'
+
+
+class RecentIds:
+    """The last `size` distinct ids seen, for skipping rows that arrive twice."""
+
+    def __init__(self, size):
+        self.size = size
+        self._order = deque()
+        self._ids = set()
+
+    def __contains__(self, row_id):
+        return row_id in self._ids
+
+    def add(self, row_id):
+        """Remember row_id; return False if it was already seen."""
+        if row_id in self._ids:
+            return False
+        self._ids.add(row_id)
+        self._order.append(row_id)
+        if len(self._order) > self.size:
+            self._ids.discard(self._order.popleft())
+        return True
+
+
+class TailState:
+    """Position of a tailer in sensor_data.
+
+    Auto-increment ids are assigned at insert but become visible at commit,
+    so with concurrent writers a row can appear after a higher id was already
+    sent. Besides the rows past `high`, every pass therefore looks again at
+    the `rescan` ids below it and sends the ones not seen yet. Rows at or
+    below `floor` (the newest row when the first client subscribed) predate
+    the feed and are never sent.
+    """
+
+    def __init__(self, start, rescan):
+        self.floor = start
+        self.high = start
+        self.rescan = rescan
+        self.seen = RecentIds(2 * rescan)
+
+    def late_range(self):
+        return max(self.floor, self.high - self.rescan), self.high
+
+    def missing(self, ids):
+        return [row_id for row_id in ids if row_id not in self.seen]
+
+    def advance(self, rows):
+        """Return the rows not sent before and move past them."""
+        fresh = [row for row in rows if row[0] > self.floor and self.seen.add(row[0])]
+        if rows:
+            self.high = max(self.high, rows[-1][0])
+        return fresh
+
+
+class Subscription:
+    """Bounded queue of encoded rows for one SSE connection.
+
+    If the client falls more than `maxlen` rows behind, the queue is dropped
+    and the connection catches up from the database instead, so a slow client
+    never holds more than `maxlen` rows in memory.
+    """
+
+    def __init__(self, location, maxlen):
+        self.location = location.lower() if location else None
+        self.maxlen = maxlen
+        self.lagging = False
+        # Newest id when the client subscribed; the tailer starts from the
+        # lowest of these so no subscriber misses a row
+        self.start_id = None
+        self._rows = deque()
+        self._cond = threading.Condition()
+
+    def push(self, rows):
+        with self._cond:
+            self._add(rows)
+            self._cond.notify()
+
+    def _add(self, rows):
+        for row_id, location, payload in rows:
+            if self.location and location.lower() != self.location:
+                continue
+            if len(self._rows) >= self.maxlen:
+                self._rows.clear()
+                self.lagging = True
+            self._rows.append((row_id, payload))
+
+    def wait(self, timeout):
+        """Return (rows, lagging), waiting up to `timeout` seconds for rows."""
+        with self._cond:
+            if not self._rows and not self.lagging:
+                self._cond.wait(timeout)
+            rows, lagging = list(self._rows), self.lagging
+            self._rows.clear()
+            self.lagging = False
+            return rows, lagging
+
+
+class AsyncSubscription(Subscription):
+    """Subscription for the async app, filled and drained on the event loop."""
+
+    def __init__(self, location, maxlen):
+        super().__init__(location, maxlen)
+        self._ready = asyncio.Event()
+
+    def push(self, rows):
+        self._add(rows)
+        self._ready.set()
+
+    async def wait(self, timeout):
+        if not self._rows and not self.lagging:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._ready.clear()
+        rows, lagging = list(self._rows), self.lagging
+        self._rows.clear()
+        self.lagging = False
+        return rows, lagging
+
+
+class LiveFeed:
+    """In-process fan-out of newly inserted sensor_data rows.
+
+    One tailer thread per worker reads rows past its id watermark (see
+    TailState) and hands each encoded row to every subscriber. Ingest
+    handlers call notify() after committing so their rows go out
+    immediately; the tailer also polls every SSE_POLL_INTERVAL seconds to
+    pick up rows written by other replicas.
+
+    Under gunicorn each open /data/stream connection holds one gthread
+    thread for as long as the client stays connected. serve.py gives a
+    worker 8 threads, and one worker under the Kubernetes CPU limit, so a
+    handful of dashboards can take every thread of a pod. Serve many SSE
+    clients with the async mode (serve.py --mode async), where a connection
+    is a coroutine.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._listeners = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.poll_interval = app.config['SSE_POLL_INTERVAL']
+        self.heartbeat = app.config['SSE_HEARTBEAT']
+        self.queue_size = app.config['SSE_QUEUE_SIZE']
+        self.backlog_limit = app.config['SSE_BACKLOG_LIMIT']
+        self.rescan = app.config['SSE_RESCAN_IDS']
+
+    def notify(self):
+        """Wake the tailer after new rows were committed."""
+        self._wakeup.set()
+        for listener in self._listeners:
+            listener()
+
+    def add_listener(self, callback):
+        """Also call `callback` (from the writing thread) on every notify()."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def events(self, location=None, last_id=None):
+        """Generator of SSE messages for one connection.
+
+        With last_id (from Last-Event-ID) the connection first replays up to
+        SSE_BACKLOG_LIMIT newer rows, then continues with live rows; without
+        it, live rows start after the newest row at the time of subscribing.
+        """
+        sub = Subscription(location, self.queue_size)
+        # Subscribe before reading the start so rows committed meanwhile are not lost
+        self._subscribe(sub)
+        try:
+            yield f'retry: {int(self.poll_interval * 1000) + 1000}\n\n'
+            sub.start_id = self._max_id()
+            sent = RecentIds(self.backlog_limit + self.queue_size)
+            if last_id is None:
+                last_id = sub.start_id
+            else:
+                for row_id, payload in self._fetch_after(last_id, location):
+                    sent.add(row_id)
+                    yield sse_message(row_id, payload)
+                    last_id = max(last_id, row_id)
+            floor = min(last_id, sub.start_id)
+
+            while True:
+                rows, lagging = sub.wait(self.heartbeat)
+                if lagging:
+                    rows = self._fetch_after(last_id, location)
+                messages = 0
+                for row_id, payload in rows:
+                    # Replayed rows can also arrive live
+                    if row_id <= floor or not sent.add(row_id):
+                        continue
+                    yield sse_message(row_id, payload)
+                    last_id = max(last_id, row_id)
+                    messages += 1
+                if not messages:
+                    yield ': keep-alive\n\n'
+        finally:
+            self._unsubscribe(sub)
+
+    def _subscribe(self, sub):
+        with self._lock:
+            self._subscribers.add(sub)
+        self._ensure_started()
+
+    def _unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def _ensure_started(self):
+        # Threads do not survive gunicorn's fork, so each worker starts its own
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='live-feed-tailer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        state = None
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            with self._lock:
+                starts = [sub.start_id for sub in self._subscribers if sub.start_id is not None]
+            if not starts:
+                # Nobody is listening; start from the next subscriber's position
+                state = None
+                continue
+            try:
+                if state is None:
+                    state = TailState(min(starts), self.rescan)
+                self._dispatch(state)
+            except Exception as e:
+                self.app.logger.error(f"Error tailing sensor_data for live feed: {e}", exc_info=True)
+                time.sleep(self.poll_interval)
+
+    def _dispatch(self, state):
+        from app import mysql  # Import here to avoid circular import
+
+        with self.app.app_context():
+            cur = mysql.connection.cursor()
+            cur.execute(LATE_IDS_QUERY, state.late_range())
+            late = state.missing(row[0] for row in cur.fetchall())
+            if late:
+                cur.execute(rows_by_id_query(late), late)
+                self._push(state.advance(cur.fetchall()))
+            while True:
+                cur.execute(TAIL_QUERY, (state.high, self.queue_size))
+                rows = cur.fetchall()
+                if not rows:
+                    break
+                self._push(state.advance(rows))
+                if len(rows) < self.queue_size:
+                    break
+            cur.close()
+
+    def _push(self, rows):
+        if not rows:
+            return
+        # Encode each row once and share it between all subscribers. Read the
+        # subscribers now, not when the pass started, so one that subscribed
+        # meanwhile gets every row newer than its start.
+        encoded = encode_rows(self.app, rows)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.push(encoded)
+
+    def _max_id(self):
+        from app import mysql  # Import here to avoid circular import
+
+        with self.app.app_context():
+            cur = mysql.connection.cursor()
+            cur.execute(MAX_ID_QUERY)
+            max_id = cur.fetchone()[0]
+            cur.close()
+        return max_id
+
+    def _fetch_after(self, last_id, location):
+        from app import mysql  # Import here to avoid circular import
+
+        query, params = backlog_query(last_id, location, self.backlog_limit)
+        with self.app.app_context():
+            cur = mysql.connection.cursor()
+            cur.execute(query, params)
+            rows = cur.fetchall()
+            cur.close()
+        return [(row_id, payload) for row_id, _, payload in encode_rows(self.app, rows)]
+
+
+class AsyncLiveFeed:
+    """LiveFeed for the async app (app/asgi.py).
+
+    Same protocol and settings as the LiveFeed it wraps, but the tailer is a
+    task on the event loop reading through the async pool, and subscribers
+    wait on the loop, so an idle SSE connection costs a coroutine instead of
+    a thread. Rows ingested through the WSGI routes in the same process still
+    wake it via the wrapped feed's notify().
+    """
+
+    def __init__(self, feed, db):
+        self.feed = feed
+        self.db = db
+        self._subscribers = set()
+        self._wakeup = None
+        self._listener = None
+        self._task = None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._listener = lambda: loop.call_soon_threadsafe(self._wakeup.set)
+        self.feed.add_listener(self._listener)
+        self._task = loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self.feed.remove_listener(self._listener)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    async def events(self, location=None, last_id=None):
+        feed = self.feed
+        sub = AsyncSubscription(location, feed.queue_size)
+        # Subscribe before reading the start so rows committed meanwhile are not lost
+        self._subscribers.add(sub)
+        try:
+            yield f'retry: {int(feed.poll_interval * 1000) + 1000}\n\n'
+            rows, _ = await self.db.fetch(MAX_ID_QUERY)
+            sub.start_id = rows[0][0]
+            self._wakeup.set()
+            sent = RecentIds(feed.backlog_limit + feed.queue_size)
+            if last_id is None:
+                last_id = sub.start_id
+            else:
+                for row_id, payload in await self._fetch_after(last_id, location):
+                    sent.add(row_id)
+                    yield sse_message(row_id, payload)
+                    last_id = max(last_id, row_id)
+            floor = min(last_id, sub.start_id)
+
+            while True:
+                rows, lagging = await sub.wait(feed.heartbeat)
+                if lagging:
+                    rows = await self._fetch_after(last_id, location)
+                messages = 0
+                for row_id, payload in rows:
+                    # Replayed rows can also arrive live
+                    if row_id <= floor or not sent.add(row_id):
+                        continue
+                    yield sse_message(row_id, payload)
+                    last_id = max(last_id, row_id)
+                    messages += 1
+                if not messages:
+                    yield ': keep-alive\n\n'
+        finally:
+            self._subscribers.discard(sub)
+
+    async def _run(self):
+        state = None
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.feed.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            starts = [sub.start_id for sub in self._subscribers if sub.start_id is not None]
+            if not starts:
+                # Nobody is listening; start from the next subscriber's position
+                state = None
+                continue
+            try:
+                if state is None:
+                    state = TailState(min(starts), self.feed.rescan)
+                await self._dispatch(state)
+            except Exception as e:
+                self.feed.app.logger.error(f"Error tailing sensor_data for live feed: {e}", exc_info=True)
+                await asyncio.sleep(self.feed.poll_interval)
+
+    async def _dispatch(self, state):
+        rows, _ = await self.db.fetch(LATE_IDS_QUERY, state.late_range())
+        late = state.missing(row[0] for row in rows)
+        if late:
+            rows, _ = await self.db.fetch(rows_by_id_query(late), late)
+            self._push(state.advance(rows))
+        while True:
+            rows, _ = await self.db.fetch(TAIL_QUERY, (state.high, self.feed.queue_size))
+            if not rows:
+                break
+            self._push(state.advance(rows))
+            if len(rows) < self.feed.queue_size:
+                break
+
+    def _push(self, rows):
+        if rows:
+            encoded = encode_rows(self.feed.app, rows)
+            for sub in list(self._subscribers):
+                sub.push(encoded)
+
+    async def _fetch_after(self, last_id, location):
+        query, params = backlog_query(last_id, location, self.feed.backlog_limit)
+        rows, _ = await self.db.fetch(query, params)
+        return [(row_id, payload) for row_id, _, payload in encode_rows(self.feed.app, rows)]
+
+
+def encode_rows(app, rows):
+    return [(row[0], row[1], app.json.dumps(dict(zip(ROW_COLUMNS, row)))) for row in rows]
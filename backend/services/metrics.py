@@ -0,0 +1,168 @@
+# services/metrics.py
+
+import os
+import time
+from contextvars import ContextVar
+
+from services.db_pool import add_query_observer
+
+# Histogram bucket bounds. Dashboard reads should land well under a second;
+# batch ingest and unpaginated exports can take several.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROW_BUCKETS = (0, 1, 10, 100, 500, 1000, 5000, 10000, 50000, 100000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+# Label for queries run outside a request (live feed tailer, write buffer flush)
+BACKGROUND_ROUTE = 'background'
+
+# State of the request being handled by the current thread (Flask) or task (Quart)
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestState:
+    __slots__ = ('method', 'route', 'started', 'status', 'size', 'db_seconds', 'queries')
+
+    def __init__(self, method, route):
+        self.method = method
+        self.route = route
+        self.started = time.perf_counter()
+        self.status = 500
+        self.size = None
+        self.db_seconds = 0.0
+        self.queries = 0
+
+
+class Metrics:
+    """Prometheus metrics for the HTTP routes and the queries they run.
+
+    Series are labelled by route pattern (/update-data/<int:id>, not the
+    raw path) so label cardinality stays fixed. Queries are timed by the
+    instrumented cursors in services.db_pool and charged to the request
+    running them. Under gunicorn, set PROMETHEUS_MULTIPROC_DIR (serve.py
+    does) and each worker writes its samples to its own mmap file, which
+    /metrics sums at scrape time; without it the values cover this process.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self._metrics = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config['METRICS_ENABLED']
+        if not self.enabled:
+            return
+        self._create()
+        add_query_observer(self.observe_query)
+
+        if hasattr(app, 'before_serving'):
+            # Quart: hooks must be coroutines to share the view's context
+            from quart import request
+
+            @app.before_request
+            async def start_async():
+                self.start(request)
+
+            @app.after_request
+            async def record_async(response):
+                return self.record(response)
+
+            @app.teardown_request
+            async def finish_async(exception=None):
+                self.finish()
+        else:
+            from flask import request
+
+            app.before_request(lambda: self.start(request))
+            app.after_request(self.record)
+            app.teardown_request(lambda exception=None: self.finish())
+
+    def _create(self):
+        if self._metrics is not None:
+            return
+        try:
+            from prometheus_client import Counter, Gauge, Histogram
+        except ImportError:
+            raise RuntimeError('METRICS_ENABLED=true requires the prometheus-client package')
+        # Created once per process; the sync and async apps share them
+        self._metrics = {
+            'latency': Histogram(
+                'http_request_duration_seconds', 'Time to handle a request, including streaming the body',
+                ['method', 'route'], buckets=LATENCY_BUCKETS),
+            'requests': Counter(
+                'http_requests_total', 'Requests handled, by status code',
+                ['method', 'route', 'status']),
+            'in_progress': Gauge(
+                'http_requests_in_progress', 'Requests being handled (including open /data/stream connections)',
+                ['route'], multiprocess_mode='livesum'),
+            'size': Histogram(
+                'http_response_size_bytes', 'Response body size',
+                ['route'], buckets=SIZE_BUCKETS),
+            'request_db': Histogram(
+                'http_request_db_seconds', 'Time spent in database queries per request',
+                ['route'], buckets=LATENCY_BUCKETS),
+            'request_queries': Histogram(
+                'http_request_db_queries', 'Database queries per request',
+                ['route'], buckets=QUERY_COUNT_BUCKETS),
+            'query_latency': Histogram(
+                'db_query_duration_seconds', 'Time to execute one query',
+                ['route'], buckets=LATENCY_BUCKETS),
+            'query_rows': Histogram(
+                'db_query_rows', 'Rows returned or affected by one buffered query',
+                ['route'], buckets=ROW_BUCKETS),
+        }
+
+    def start(self, req):
+        route = req.url_rule.rule if req.url_rule is not None else 'unmatched'
+        _current.set(RequestState(req.method, route))
+        self._metrics['in_progress'].labels(route).inc()
+
+    def record(self, response):
+        state = _current.get()
+        if state is not None:
+            state.status = response.status_code
+            # None for streamed bodies, whose size is not known up front
+            state.size = response.content_length
+        return response
+
+    def finish(self):
+        # Teardown runs once the body has been sent, streamed ones included
+        state = _current.get()
+        if state is None:
+            return
+        _current.set(None)
+        m = self._metrics
+        m['in_progress'].labels(state.route).dec()
+        m['latency'].labels(state.method, state.route).observe(time.perf_counter() - state.started)
+        m['requests'].labels(state.method, state.route, str(state.status)).inc()
+        if state.size is not None:
+            m['size'].labels(state.route).observe(state.size)
+        m['request_db'].labels(state.route).observe(state.db_seconds)
+        m['request_queries'].labels(state.route).observe(state.queries)
+
+    def observe_query(self, query, params, seconds, rows):
+        state = _current.get()
+        if state is not None:
+            state.db_seconds += seconds
+            state.queries += 1
+            route = state.route
+        else:
+            route = BACKGROUND_ROUTE
+        self._metrics['query_latency'].labels(route).observe(seconds)
+        if rows is not None and rows >= 0:
+            self._metrics['query_rows'].labels(route).observe(rows)
+
+    def render(self):
+        """Return (body, content type) of the metrics exposition."""
+        from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            from prometheus_client import multiprocess
+
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,59 @@
+# services/pagination.py
+
+import base64
+import json
+from datetime import datetime
+
+
+def page_limit(args, config):
+    """Read the requested page size, capped at DATA_PAGE_MAX_LIMIT."""
+    limit = args.get('limit')
+    if limit is None:
+        return config['DATA_PAGE_DEFAULT_LIMIT']
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    return min(limit, config['DATA_PAGE_MAX_LIMIT'])
+
+
+def encode_cursor(values):
+    """Pack the sort key of the last row on a page into an opaque token."""
+    raw = json.dumps(values, default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, keys):
+    """Unpack a cursor from encode_cursor, returning the values for `keys`.
+
+    Returns None when no cursor was given; raises ValueError if it is malformed.
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return [values[key] for key in keys]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError('Invalid cursor')
+
+
+def since_marks(args):
+    """Read the since_id / since_ts high-water mark of a delta request.
+
+    Returns (since_id, since_ts), either of which may be None, or None when
+    neither was given; raises ValueError if a value is malformed.
+    """
+    since_id, since_ts = args.get('since_id'), args.get('since_ts')
+    if not since_id and not since_ts:
+        return None
+    try:
+        since_id = int(since_id) if since_id else None
+    except ValueError:
+        raise ValueError('since_id must be an integer')
+    try:
+        since_ts = datetime.fromisoformat(since_ts) if since_ts else None
+    except ValueError:
+        raise ValueError('since_ts must be an ISO timestamp (YYYY-MM-DDTHH:MM:SS)')
+    return since_id, since_ts
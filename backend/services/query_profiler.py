@@ -0,0 +1,236 @@
+# services/query_profiler.py
+
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+import MySQLdb
+import MySQLdb.cursors
+from flask import g, request
+
+from services.db_pool import add_query_observer
+
+# Routes whose query parameters are never logged or kept (password hashes)
+REDACTED_ROUTES = ('/signup', '/login')
+
+# Longest parameter list written to the log, in characters (batch inserts)
+MAX_LOGGED_PARAMS = 500
+
+# Rows read by the server for the last statements this connection completed.
+# The history keeps the last 10 per thread by default.
+HISTORY_QUERY = """
+    SELECT h.ROWS_EXAMINED
+    FROM performance_schema.events_statements_history h
+    JOIN performance_schema.threads t ON t.THREAD_ID = h.THREAD_ID
+    WHERE t.PROCESSLIST_ID = CONNECTION_ID()
+    ORDER BY h.EVENT_ID DESC
+    LIMIT %s
+"""
+
+_current = ContextVar('query_profile', default=None)
+
+
+class Statement:
+    __slots__ = ('sql', 'params', 'redact', 'ms', 'rows_returned', 'rows_examined', 'explain')
+
+    def __init__(self, sql, params, redact, ms, rows_returned):
+        self.sql = sql
+        self.params = params
+        self.redact = redact
+        self.ms = ms
+        self.rows_returned = rows_returned
+        self.rows_examined = None
+        self.explain = None
+
+    def logged_params(self):
+        # Batch inserts carry thousands of values; keep the start of them
+        return '<redacted>' if self.redact else repr(self.params)[:MAX_LOGGED_PARAMS]
+
+    def to_dict(self):
+        return {
+            'sql': ' '.join(self.sql.split()),
+            'params': self.logged_params(),
+            'ms': round(self.ms, 2),
+            'rows_returned': self.rows_returned,
+            'rows_examined': self.rows_examined,
+            'explain': self.explain,
+        }
+
+
+class RequestProfile:
+    __slots__ = ('method', 'path', 'route', 'started', 'sampled', 'redact', 'queries', 'db_ms', 'statements', 'slow')
+
+    def __init__(self, method, path, route, sampled):
+        self.method = method
+        self.path = path
+        self.route = route
+        self.started = time.perf_counter()
+        self.sampled = sampled
+        self.redact = route in REDACTED_ROUTES
+        self.queries = 0
+        self.db_ms = 0.0
+        # Every statement when sampled, otherwise only the slow ones
+        self.statements = []
+        self.slow = []
+
+
+class QueryProfiler:
+    """Opt-in per-request SQL profile for the Flask app.
+
+    Every query of a request is counted and timed through the instrumented
+    cursors. A statement slower than QUERY_PROFILE_SLOW_MS is logged with its
+    parameters and EXPLAIN plan, and its request is kept in a bounded ring
+    of recent slow requests (GET /stats/slow-requests, admins only). A
+    sampled fraction of requests (QUERY_PROFILE_SAMPLE_RATE) also keeps every
+    statement, with the rows MySQL examined for it read from
+    performance_schema, and reports a summary in the X-Query-Profile response
+    header when QUERY_PROFILE_HEADER is on.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.slow_ms = 0.0
+        self.header = False
+        self.allow_force = False
+        self._ring = deque()
+        self._lock = threading.Lock()
+        self._history_available = True
+        self._stats = {'profiled_requests': 0, 'sampled_requests': 0, 'slow_queries': 0, 'explain_errors': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config['QUERY_PROFILE_ENABLED']
+        self.sample_rate = app.config['QUERY_PROFILE_SAMPLE_RATE']
+        self.slow_ms = app.config['QUERY_PROFILE_SLOW_MS']
+        self.header = app.config['QUERY_PROFILE_HEADER']
+        self.allow_force = app.config['QUERY_PROFILE_ALLOW_FORCE']
+        self._ring = deque(maxlen=app.config['QUERY_PROFILE_RING_SIZE'])
+        if not self.enabled:
+            return
+        add_query_observer(self.observe_query)
+        app.before_request(self.start)
+        app.after_request(self.add_header)
+        app.teardown_request(self.finish)
+
+    def start(self):
+        sampled = random.random() < self.sample_rate
+        if not sampled and self.allow_force:
+            sampled = request.headers.get('X-Query-Profile') == '1'
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        _current.set(RequestProfile(request.method, request.path, route, sampled))
+
+    def observe_query(self, query, params, seconds, rows):
+        profile = _current.get()
+        if profile is None:
+            return
+        ms = seconds * 1000
+        profile.queries += 1
+        profile.db_ms += ms
+        slow = ms >= self.slow_ms
+        if not (slow or profile.sampled):
+            return
+        statement = Statement(query, params, profile.redact, ms, rows)
+        profile.statements.append(statement)
+        if slow:
+            profile.slow.append(statement)
+
+    def add_header(self, response):
+        profile = _current.get()
+        if profile is not None and profile.sampled and self.header:
+            # Covers the queries run so far; a streamed body runs its query later
+            slowest = max((s.ms for s in profile.statements), default=0.0)
+            response.headers['X-Query-Profile'] = (
+                f'queries={profile.queries}; db_ms={profile.db_ms:.1f}; slowest_ms={slowest:.1f}')
+        return response
+
+    def finish(self, exception=None):
+        profile = _current.get()
+        if profile is None:
+            return
+        _current.set(None)
+        with self._lock:
+            self._stats['profiled_requests'] += 1
+            self._stats['sampled_requests'] += profile.sampled
+            self._stats['slow_queries'] += len(profile.slow)
+        if not profile.statements:
+            return
+
+        # The request's connection is still checked out here (teardown_appcontext
+        # returns it afterwards); without one, only timings are recorded
+        conn = g.get('mysql_db')
+        if conn is not None and profile.sampled:
+            self._read_rows_examined(conn, profile)
+        for statement in profile.slow:
+            if conn is not None:
+                self._explain(conn, statement)
+            self.app.logger.warning(
+                f"Slow query ({statement.ms:.1f} ms, {statement.rows_returned} rows) on "
+                f"{profile.method} {profile.route}: {' '.join(statement.sql.split())} "
+                f"params={statement.logged_params()} explain={statement.explain}")
+        if profile.slow:
+            self._ring.append({
+                'at': time.time(),
+                'method': profile.method,
+                'path': profile.path,
+                'route': profile.route,
+                'duration_ms': round((time.perf_counter() - profile.started) * 1000, 2),
+                'queries': profile.queries,
+                'db_ms': round(profile.db_ms, 2),
+                'sampled': profile.sampled,
+                'statements': [s.to_dict() for s in profile.statements],
+            })
+
+    def _read_rows_examined(self, conn, profile):
+        if not self._history_available or len(profile.statements) != profile.queries:
+            return
+        # A plain cursor, so these lookups are not profiled themselves
+        cur = conn.cursor(MySQLdb.cursors.Cursor)
+        try:
+            cur.execute(HISTORY_QUERY, (profile.queries,))
+            history = list(reversed(cur.fetchall()))
+        except MySQLdb.Error as e:
+            self._history_available = False
+            self.app.logger.warning(f"performance_schema statement history unavailable, "
+                                    f"not recording rows examined: {e}")
+            return
+        finally:
+            cur.close()
+        if len(history) == len(profile.statements):
+            for statement, (examined,) in zip(profile.statements, history):
+                statement.rows_examined = examined
+
+    def _explain(self, conn, statement):
+        # Only reads are worth explaining
+        if not statement.sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return
+        cur = conn.cursor(MySQLdb.cursors.Cursor)
+        try:
+            cur.execute('EXPLAIN ' + statement.sql, statement.params)
+            columns = [desc[0] for desc in cur.description]
+            statement.explain = [dict(zip(columns, row)) for row in cur.fetchall()]
+        except MySQLdb.Error as e:
+            with self._lock:
+                self._stats['explain_errors'] += 1
+            statement.explain = f'EXPLAIN failed: {e}'
+        finally:
+            cur.close()
+
+    def recent_slow_requests(self):
+        return list(reversed(self._ring))
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'slow_ms': self.slow_ms,
+            'ring_size': len(self._ring),
+        })
+        return stats
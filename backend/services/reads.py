@@ -0,0 +1,441 @@
+# services/reads.py
+
+from datetime import datetime, timedelta
+
+from services import columnar, downsample, pagination, streaming
+
+DATA_COLUMNS = ['id', 'location', 'ph_value', 'temperature', 'turbidity', 'date', 'time']
+GRAPH_TYPES = ('ph_value', 'temperature', 'turbidity')
+GRAPH_MODES = ('buckets', 'lttb')
+SUMMARY_PARAMETERS = ['ph_value', 'temperature', 'turbidity']
+
+
+class ReadPlan:
+    """The query behind a read endpoint and how its rows become the response.
+
+    Both the Flask blueprint and the async app (app/asgi.py) execute the same
+    plans, so the two serving modes return identical responses. shape(rows,
+    columns) returns (body, status); a plan with `stream` set is sent through
+    a server-side cursor in that format instead.
+    """
+
+    def __init__(self, query, params=(), shape=None, stream=None):
+        self.query = query
+        self.params = list(params)
+        self.shape = shape or dict_rows
+        self.stream = stream
+
+
+def dict_rows(rows, columns):
+    return [dict(zip(columns, row)) for row in rows], 200
+
+
+def window_start(hours=24):
+    return (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _stream_format(args):
+    stream_format = args.get('stream')
+    if stream_format and stream_format not in streaming.STREAM_FORMATS:
+        raise ValueError('stream must be "json" or "ndjson"')
+    return stream_format
+
+
+def summary_insights(args):
+    parameters = SUMMARY_PARAMETERS
+    extremes = ', '.join(f"MAX({param}) OVER () AS max_{param}, MIN({param}) OVER () AS min_{param}" for param in parameters)
+    matches = ' OR '.join(f"{param} IN (max_{param}, min_{param})" for param in parameters)
+
+    def shape(rows, columns):
+        summary = {param: {'highest': [], 'lowest': []} for param in parameters}
+        for row in rows:
+            location = row[0]
+            for i, param in enumerate(parameters):
+                value = row[1 + i]
+                highest, lowest = row[1 + len(parameters) + 2 * i], row[2 + len(parameters) + 2 * i]
+                if value == highest:
+                    summary[param]['highest'].append({'value': value, 'location': location})
+                if value == lowest:
+                    summary[param]['lowest'].append({'value': value, 'location': location})
+        return summary, 200
+
+    # Single pass over the window: every row carries the window's highs and
+    # lows, and only rows holding at least one of them come back
+    return ReadPlan(f"""
+        SELECT *
+        FROM (
+            SELECT location, {', '.join(parameters)}, {extremes}
+            FROM sensor_data
+            WHERE recorded_at >= %s
+        ) AS windowed
+        WHERE {matches}
+    """, (window_start(),), shape)
+
+
+def correlation_data(args):
+    location = args.get('location', 'US')  # Default location is 'US'
+
+    def shape(rows, columns):
+        # Structure the data into arrays
+        data = {'temperature': [], 'turbidity': [], 'ph_value': []}
+        for row in rows:
+            data['temperature'].append(row[0])
+            data['turbidity'].append(row[1])
+            data['ph_value'].append(row[2])
+        return data, 200
+
+    # location has a case-insensitive collation (`flask add-recorded-at`
+    # checks it, --fix-collation sets it), so a plain comparison matches any
+    # case and can use the (location, recorded_at) index
+    return ReadPlan("""
+        SELECT temperature, turbidity, ph_value
+        FROM sensor_data
+        WHERE location = %s AND recorded_at >= %s
+    """, (location, window_start()), shape)
+
+
+def recent_data(args):
+    as_columns = columnar.wants_columnar(args)
+    columns = ['location', 'ph_value', 'temperature', 'turbidity', 'date', 'time']
+
+    def shape(rows, _):
+        if as_columns:
+            return columnar.to_columnar(columns, rows), 200
+        return [dict(zip(columns, row)) for row in rows], 200
+
+    # Average entries for the last 24 hours
+    return ReadPlan("""
+        SELECT location, AVG(ph_value) AS ph_value, AVG(temperature) AS temperature, AVG(turbidity) AS turbidity, date, time
+        FROM sensor_data
+        WHERE recorded_at >= %s
+        GROUP BY location, date, time
+        ORDER BY date DESC, time DESC
+    """, (window_start(),), shape)
+
+
+def data(args, config):
+    """/data: every reading, newest first, filtered by date and location.
+
+    Full list by default; keyset pages with limit/cursor, a delta with
+    since_id/since_ts, or a stream with stream=json|ndjson.
+    """
+    date_filter = args.get('date')
+    location_filter = args.get('location')
+
+    # Streaming and keyset pagination are opt-in so existing callers still get the full list
+    stream_format = _stream_format(args)
+    paged = not stream_format and ('limit' in args or 'cursor' in args)
+    as_columns = columnar.wants_columnar(args)
+    if as_columns and stream_format:
+        raise ValueError('format=columnar cannot be combined with stream')
+    since = pagination.since_marks(args)
+    if since and (stream_format or 'cursor' in args):
+        raise ValueError('since_id / since_ts cannot be combined with stream or cursor')
+    if since or paged:
+        limit = pagination.page_limit(args, config)
+    after = pagination.decode_cursor(args.get('cursor'), ('id',)) if paged and not since else None
+
+    filters = []
+    params = []
+    if date_filter:
+        filters.append("date = %s")
+        params.append(date_filter)
+    if location_filter:
+        filters.append("location = %s")
+        params.append(location_filter)
+    if since:
+        return _delta(filters, params, since, limit, as_columns)
+    if after:
+        # Seek past the last row of the previous page instead of using OFFSET
+        filters.append("id < %s")
+        params.append(after[0])
+
+    query = f"SELECT {', '.join(DATA_COLUMNS)} FROM sensor_data"
+    if filters:
+        query += " WHERE " + " AND ".join(filters)
+    query += " ORDER BY id DESC"
+    if stream_format:
+        return ReadPlan(query, params, stream=stream_format)
+    if paged:
+        # One extra row tells us whether there is a next page
+        query += " LIMIT %s"
+        params.append(limit + 1)
+
+    def shape(rows, columns):
+        if paged:
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = pagination.encode_cursor({'id': rows[-1][0]})
+            data = columnar.to_columnar(columns, rows) if as_columns else [dict(zip(columns, row)) for row in rows]
+            return {'data': data, 'next_cursor': next_cursor}, 200
+        if not rows:
+            return {'message': 'No data found'}, 404
+        if as_columns:
+            return columnar.to_columnar(columns, rows), 200
+        return [dict(zip(columns, row)) for row in rows], 200
+
+    return ReadPlan(query, params, shape)
+
+
+def _delta(filters, params, since, limit, as_columns):
+    """Rows newer than a since_id / since_ts high-water mark, oldest first.
+
+    The response carries the mark to send on the next call; has_more means
+    the limit was hit and the client should call again straight away.
+    """
+    since_id, since_ts = since
+    filters = list(filters)
+    params = list(params)
+    if since_ts is not None:
+        # Seek on (recorded_at, id) so rows sharing a timestamp are not skipped
+        # between calls when since_id is sent back along with since_ts
+        if since_id is not None:
+            filters.append("(recorded_at > %s OR (recorded_at = %s AND id > %s))")
+            params.extend([since_ts, since_ts, since_id])
+        else:
+            filters.append("recorded_at > %s")
+            params.append(since_ts)
+        order = "recorded_at, id"
+    else:
+        filters.append("id > %s")
+        params.append(since_id)
+        order = "id"
+    # One extra row tells us whether there is more to fetch
+    params.append(limit + 1)
+
+    def shape(rows, columns):
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if rows:
+            high_water_mark = {'since_id': rows[-1][0], 'since_ts': rows[-1][7] if since_ts is not None else None}
+        else:
+            # Nothing new: hand the caller's mark back unchanged
+            high_water_mark = {'since_id': since_id, 'since_ts': since_ts}
+        data = columnar.to_columnar(columns, rows) if as_columns else [dict(zip(columns, row)) for row in rows]
+        return {'data': data, 'high_water_mark': high_water_mark, 'has_more': has_more}, 200
+
+    return ReadPlan(f"""
+        SELECT {', '.join(DATA_COLUMNS)}, recorded_at
+        FROM sensor_data
+        WHERE {' AND '.join(filters)}
+        ORDER BY {order}
+        LIMIT %s
+    """, params, shape)
+
+
+def _graph_args(args, location_arg):
+    start_date = args.get('startDate')
+    end_date = args.get('endDate')
+    location = args.get(location_arg)
+    data_type = args.get('dataType')
+    if not start_date or not end_date or not location or not data_type:
+        raise ValueError(f'startDate, endDate, {location_arg}, and dataType are required')
+    # Validate dataType to prevent SQL injection
+    if data_type not in GRAPH_TYPES:
+        raise ValueError('Invalid dataType. Must be "ph_value" or "temperature" or "turbidity"')
+    return start_date, end_date, location, data_type
+
+
+def graph_data(args, config):
+    start_date, end_date, location, data_type = _graph_args(args, 'location')
+    if any(key in args for key in ('points', 'bucket', 'mode')):
+        return _downsampled_graph(args, config, start_date, end_date, location, data_type)
+
+    # Dynamically use the selected dataType column in the query
+    if config['ROLLUPS_ENABLED']:
+        # Daily rollups hold one row per location and day, so this reads
+        # one row per day in the range however many readings there are
+        query = f"""
+            SELECT bucket AS date, {data_type}_sum / readings AS value
+            FROM sensor_rollup_daily
+            WHERE bucket >= %s AND bucket <= %s AND location = %s
+            ORDER BY bucket
+        """
+    else:
+        query = f"""
+            SELECT date, AVG({data_type}) AS value
+            FROM sensor_data
+            WHERE date >= %s AND date <= %s AND location = %s
+            GROUP BY date
+            ORDER BY date
+        """
+
+    def shape(rows, columns):
+        return [{'date': row[0], 'value': row[1]} for row in rows], 200
+
+    return ReadPlan(query, (start_date, end_date, location), shape)
+
+
+def _downsampled_graph(args, config, start_date, end_date, location, data_type):
+    """/graph-data with ?points=, ?bucket= or ?mode=: a bounded number of points
+    at a resolution that follows the range, from minutes to months.
+
+    mode=buckets (the default) returns avg, min, max and count per time
+    bucket; the bucket is given or picked as the smallest that keeps the
+    range within `points` buckets. mode=lttb returns `points` readings
+    chosen by Largest-Triangle-Three-Buckets, which keeps peaks and dips that
+    averaging flattens. Its input is the series at the finest bucket that
+    stays within GRAPH_LTTB_MAX_INPUT points: the raw readings for short
+    ranges, per-bucket averages for long ones.
+    """
+    mode = args.get('mode', 'buckets')
+    if mode not in GRAPH_MODES:
+        raise ValueError('mode must be "buckets" or "lttb"')
+    max_points = config['GRAPH_MAX_POINTS']
+    points = args.get('points')
+    if points is not None:
+        try:
+            points = int(points)
+        except ValueError:
+            raise ValueError('points must be an integer')
+        if not 2 <= points <= max_points:
+            raise ValueError(f'points must be between 2 and {max_points}')
+    if 'bucket' in args and (points is not None or mode == 'lttb'):
+        raise ValueError('bucket cannot be combined with points or mode=lttb')
+
+    start, end = downsample.parse_range(start_date, end_date)
+    span = (end - start).total_seconds()
+    if mode == 'lttb':
+        size = downsample.pick_bucket(start, end, config['GRAPH_LTTB_MAX_INPUT'])
+    elif 'bucket' in args:
+        size = downsample.parse_bucket(args['bucket'])
+        if span / size > max_points:
+            raise ValueError(f'bucket {args["bucket"]} gives more than {max_points} points for this range')
+    else:
+        size = downsample.pick_bucket(start, end, points or config['GRAPH_DEFAULT_POINTS'])
+    origin = downsample.bucket_origin(start, size)
+
+    whole_days = start == datetime.combine(start.date(), datetime.min.time()) and \
+        end == datetime.combine(end.date(), datetime.min.time())
+    if config['ROLLUPS_ENABLED'] and whole_days and size % 3600 == 0:
+        # Every bucket is made of whole rollup rows
+        if size % 86400 == 0:
+            table, bound = 'sensor_rollup_daily', '%Y-%m-%d'
+        else:
+            table, bound = 'sensor_rollup_hourly', '%Y-%m-%d %H:%M:%S'
+        query = f"""
+            SELECT TIMESTAMPDIFF(SECOND, %s, bucket) DIV %s AS slot,
+                   SUM({data_type}_sum) / SUM(readings), MIN({data_type}_min), MAX({data_type}_max), SUM(readings)
+            FROM {table}
+            WHERE location = %s AND bucket >= %s AND bucket < %s
+            GROUP BY slot
+            ORDER BY slot
+        """
+    else:
+        bound = '%Y-%m-%d %H:%M:%S'
+        query = f"""
+            SELECT TIMESTAMPDIFF(SECOND, %s, recorded_at) DIV %s AS slot,
+                   AVG({data_type}), MIN({data_type}), MAX({data_type}), COUNT(*)
+            FROM sensor_data
+            WHERE location = %s AND recorded_at >= %s AND recorded_at < %s
+            GROUP BY slot
+            ORDER BY slot
+        """
+    params = (origin.strftime('%Y-%m-%d %H:%M:%S'), size, location, start.strftime(bound), end.strftime(bound))
+
+    def buckets(rows, columns):
+        return {
+            'mode': 'buckets',
+            'bucket': downsample.format_bucket(size),
+            'start': start,
+            'end': end,
+            'points': [
+                {'date': origin + timedelta(seconds=slot * size), 'value': avg, 'min': low, 'max': high, 'count': int(count)}
+                for slot, avg, low, high, count in rows
+            ],
+        }, 200
+
+    def lttb(rows, columns):
+        kept = downsample.lttb_rows(rows, size, points or config['GRAPH_DEFAULT_POINTS'])
+        return {
+            'mode': 'lttb',
+            'input_bucket': downsample.format_bucket(size),
+            'start': start,
+            'end': end,
+            'points': [{'date': origin + timedelta(seconds=offset), 'value': value} for offset, value in kept],
+        }, 200
+
+    return ReadPlan(query, params, lttb if mode == 'lttb' else buckets)
+
+
+def compare_graph_data(args, config):
+    start_date, end_date, locations, data_type = _graph_args(args, 'locations')
+    location_list = locations.split(',')
+    placeholders = ','.join(['%s'] * len(location_list))
+
+    # Daily averages grouped by location and date
+    if config['ROLLUPS_ENABLED']:
+        query = f"""
+            SELECT location, bucket AS date, {data_type}_sum / readings AS value
+            FROM sensor_rollup_daily
+            WHERE bucket >= %s AND bucket <= %s AND location IN ({placeholders})
+            ORDER BY bucket, location
+        """
+    else:
+        query = f"""
+            SELECT location, date, AVG({data_type}) AS value
+            FROM sensor_data
+            WHERE date >= %s AND date <= %s AND location IN ({placeholders})
+            GROUP BY location, date
+            ORDER BY date, location
+        """
+
+    def shape(rows, columns):
+        data = {}
+        for location, date, value in rows:
+            data.setdefault(location, []).append({'date': date, 'value': value})
+        return data, 200
+
+    return ReadPlan(query, [start_date, end_date] + location_list, shape)
+
+
+def all_data(args, config):
+    stream_format = _stream_format(args)
+    paged = not stream_format and ('limit' in args or 'cursor' in args)
+    as_columns = columnar.wants_columnar(args)
+    if as_columns and stream_format:
+        raise ValueError('format=columnar cannot be combined with stream')
+
+    if stream_format:
+        # Walking the recorded_at index backwards lets MySQL send rows as it
+        # reads them instead of sorting the whole table first
+        return ReadPlan(f"""
+            SELECT {', '.join(DATA_COLUMNS)}
+            FROM sensor_data
+            ORDER BY recorded_at DESC, id DESC
+        """, stream=stream_format)
+
+    if not paged:
+        def shape(rows, _):
+            if as_columns:
+                return columnar.to_columnar(DATA_COLUMNS, rows), 200
+            return [dict(zip(DATA_COLUMNS, row)) for row in rows], 200
+
+        return ReadPlan(f"""
+            SELECT {', '.join(DATA_COLUMNS)}
+            FROM sensor_data
+            ORDER BY date DESC, time DESC
+        """, shape=shape)
+
+    limit = pagination.page_limit(args, config)
+    after = pagination.decode_cursor(args.get('cursor'), ('recorded_at', 'id'))
+
+    # Newest first by (recorded_at, id), seeking from the previous page's last row
+    query = f"SELECT {', '.join(DATA_COLUMNS)}, recorded_at FROM sensor_data"
+    params = []
+    if after:
+        query += " WHERE recorded_at < %s OR (recorded_at = %s AND id < %s)"
+        params.extend([after[0], after[0], after[1]])
+    query += " ORDER BY recorded_at DESC, id DESC LIMIT %s"
+    params.append(limit + 1)
+
+    def shape(rows, _):
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = pagination.encode_cursor({'recorded_at': rows[-1][7], 'id': rows[-1][0]})
+        data = columnar.to_columnar(DATA_COLUMNS, rows) if as_columns else [dict(zip(DATA_COLUMNS, row)) for row in rows]
+        return {'data': data, 'next_cursor': next_cursor}, 200
+
+    return ReadPlan(query, params, shape)
@@ -0,0 +1,219 @@
+# services/response_cache.py
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import make_response, request
+
+VERSION_KEY = 'data_version'
+
+
+class InProcessBackend:
+    """LRU store with per-entry TTLs, local to one worker process.
+
+    Its data version only moves on writes handled by the same process, so
+    use it only where a single process serves every request.
+    """
+
+    blocking = False
+    # Exceptions that mean the store is unavailable; this one cannot be
+    errors = ()
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_counter(self, key):
+        return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Store shared by every replica, so one pod's write invalidates all pods.
+
+    Needs the optional `redis` package. Size is bounded by the server's
+    maxmemory policy (use allkeys-lru) rather than by this process.
+    """
+
+    # Calls do network I/O, so the async app runs them in a thread
+    blocking = True
+
+    def __init__(self, url, prefix='water360:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RESPONSE_CACHE_BACKEND=redis requires the redis package')
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self.errors = (redis.RedisError,)
+
+    def get(self, key):
+        return self._client.get(self._prefix + key)
+
+    def set(self, key, value, ttl):
+        self._client.set(self._prefix + key, value, ex=max(1, int(ttl)))
+
+    def get_counter(self, key):
+        value = self._client.get(self._prefix + key)
+        return int(value) if value is not None else 0
+
+    def incr(self, key):
+        return self._client.incr(self._prefix + key)
+
+    def size(self):
+        return None
+
+
+class ResponseCache:
+    """Read-through cache of JSON responses keyed by endpoint and query string.
+
+    Every key includes the current data version, and writes call
+    bump_version(), so responses computed before a write are never served
+    after it. That only holds when every process shares the version, i.e.
+    with the redis backend; the in-process backend is for single-process
+    setups, and the cache is off unless RESPONSE_CACHE_BACKEND is set.
+
+    The cache is best-effort: while the backend is unreachable requests are
+    served uncached and errors are logged, never raised to the view or to a
+    write that already committed.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.logger = None
+        self.ttl = 0
+        self._hits = 0
+        self._misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.logger = app.logger
+        self.ttl = app.config['RESPONSE_CACHE_TTL']
+        kind = app.config['RESPONSE_CACHE_BACKEND']
+        if kind == 'memory':
+            self.backend = InProcessBackend(app.config['RESPONSE_CACHE_SIZE'])
+        elif kind == 'redis':
+            self.backend = RedisBackend(app.config['RESPONSE_CACHE_URL'])
+        elif kind == 'none':
+            self.backend = None
+        else:
+            raise ValueError(f"Invalid RESPONSE_CACHE_BACKEND: {kind}")
+
+    @property
+    def enabled(self):
+        return self.backend is not None and self.ttl > 0
+
+    def data_version(self):
+        return self.backend.get_counter(VERSION_KEY) if self.enabled else 0
+
+    def bump_version(self):
+        """Call after committing any change to sensor_data."""
+        if not self.enabled:
+            return
+        try:
+            self.backend.incr(VERSION_KEY)
+        except self.backend.errors as e:
+            # Entries cached before the write can be served until they expire
+            self.logger.warning(f"Could not bump the response cache version: {e}")
+
+    def cached(self, ttl=None):
+        """Cache successful responses of the decorated view for `ttl` seconds."""
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                if not self.enabled:
+                    return f(*args, **kwargs)
+
+                key, body = self.fetch(request)
+                if body is not None:
+                    return self.hit_response(make_response(body))
+
+                response = make_response(f(*args, **kwargs))
+                if key is not None and response.status_code == 200 and not response.is_streamed:
+                    self.store(key, response.get_data(), ttl)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return decorated
+        return decorator
+
+    def key(self, req):
+        args = '&'.join(f'{name}={value}' for name, value in sorted(req.args.items(multi=True)))
+        digest = hashlib.sha1(args.encode()).hexdigest()
+        return f'response:{self.data_version()}:{req.endpoint}:{digest}'
+
+    def fetch(self, req):
+        """(key, cached body) for a request; (None, None) when the backend is down."""
+        try:
+            key = self.key(req)
+            return key, self.lookup(key)
+        except self.backend.errors as e:
+            self.logger.warning(f"Response cache unavailable, serving uncached: {e}")
+            return None, None
+
+    def store(self, key, body, ttl=None):
+        try:
+            self.backend.set(key, body, ttl or self.ttl)
+        except self.backend.errors as e:
+            self.logger.warning(f"Could not store a cached response: {e}")
+
+    def lookup(self, key):
+        body = self.backend.get(key)
+        if body is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return body
+
+    def hit_response(self, response):
+        response.mimetype = 'application/json'
+        response.headers['X-Cache'] = 'HIT'
+        return response
+
+    def get_stats(self):
+        try:
+            version = self.data_version()
+        except self.backend.errors:
+            version = None
+        lookups = self._hits + self._misses
+        return {
+            'enabled': self.enabled,
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'size': self.backend.size() if self.backend else 0,
+            'ttl': self.ttl,
+            'data_version': version,
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_ratio': self._hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,138 @@
+# services/rollups.py
+
+from datetime import datetime, timedelta
+
+NUMERIC_FIELDS = ('ph_value', 'temperature', 'turbidity')
+
+HOURLY_TABLE = 'sensor_rollup_hourly'
+DAILY_TABLE = 'sensor_rollup_daily'
+
+AGGREGATE_COLUMNS = ['readings'] + [f'{field}_{agg}' for field in NUMERIC_FIELDS for agg in ('sum', 'min', 'max')]
+
+
+def create_tables(cur):
+    stats = ', '.join(f'{column} DOUBLE NOT NULL' for column in AGGREGATE_COLUMNS[1:])
+    for table, bucket_type in ((HOURLY_TABLE, 'DATETIME'), (DAILY_TABLE, 'DATE')):
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                location VARCHAR(255) NOT NULL,
+                bucket {bucket_type} NOT NULL,
+                readings INT NOT NULL,
+                {stats},
+                PRIMARY KEY (location, bucket)
+            )
+        """)
+
+
+def _raw_aggregates():
+    return ', '.join(['COUNT(*)'] + [f'{agg.upper()}({field})' for field in NUMERIC_FIELDS for agg in ('sum', 'min', 'max')])
+
+
+def _rollup_aggregates():
+    columns = ['SUM(readings)']
+    for field in NUMERIC_FIELDS:
+        columns += [f'SUM({field}_sum)', f'MIN({field}_min)', f'MAX({field}_max)']
+    return ', '.join(columns)
+
+
+def _upsert(cur, table, groups):
+    if not groups:
+        return
+    columns = ['location', 'bucket'] + AGGREGATE_COLUMNS
+    updates = ['readings = readings + VALUES(readings)']
+    for field in NUMERIC_FIELDS:
+        updates += [
+            f'{field}_sum = {field}_sum + VALUES({field}_sum)',
+            f'{field}_min = LEAST({field}_min, VALUES({field}_min))',
+            f'{field}_max = GREATEST({field}_max, VALUES({field}_max))',
+        ]
+    placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    params = []
+    # Sorted by primary key so concurrent upserts lock rows in the same order
+    for (location, bucket), stats in sorted(groups.items()):
+        params.extend((location, bucket, *stats))
+    cur.execute(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+        + ', '.join([placeholders] * len(groups))
+        + f" ON DUPLICATE KEY UPDATE {', '.join(updates)}",
+        params
+    )
+
+
+def apply_readings(cur, rows):
+    """Fold newly inserted (location, ph_value, temperature, turbidity, date, time)
+    rows into the hourly and daily rollups."""
+    hourly, daily = {}, {}
+    for row in rows:
+        location = row[0]
+        values = [float(value) for value in row[1:4]]
+        recorded_at = datetime.strptime(f'{row[4]} {row[5]}', '%Y-%m-%d %H:%M:%S')
+        for groups, bucket in ((hourly, recorded_at.replace(minute=0, second=0)), (daily, recorded_at.date())):
+            stats = groups.get((location, bucket))
+            if stats is None:
+                stats = [0] + [stat for value in values for stat in (0.0, value, value)]
+                groups[(location, bucket)] = stats
+            stats[0] += 1
+            for i, value in enumerate(values):
+                stats[1 + 3 * i] += value
+                stats[2 + 3 * i] = min(stats[2 + 3 * i], value)
+                stats[3 + 3 * i] = max(stats[3 + 3 * i], value)
+    _upsert(cur, HOURLY_TABLE, hourly)
+    _upsert(cur, DAILY_TABLE, daily)
+
+
+def refresh_buckets(cur, points):
+    """Recompute the rollups covering (location, recorded_at) points from raw rows.
+
+    Used after updates and deletes, where min and max cannot be adjusted
+    incrementally.
+    """
+    hours = {(location, recorded_at.replace(minute=0, second=0, microsecond=0)) for location, recorded_at in points if recorded_at}
+    days = {(location, hour.date()) for location, hour in hours}
+    columns = ', '.join(['location', 'bucket'] + AGGREGATE_COLUMNS)
+
+    for location, hour in sorted(hours):
+        cur.execute(f"DELETE FROM {HOURLY_TABLE} WHERE location = %s AND bucket = %s", (location, hour))
+        cur.execute(f"""
+            INSERT INTO {HOURLY_TABLE} ({columns})
+            SELECT %s, %s, {_raw_aggregates()}
+            FROM sensor_data
+            WHERE location = %s AND recorded_at >= %s AND recorded_at < %s
+            HAVING COUNT(*) > 0
+        """, (location, hour, location, hour, hour + timedelta(hours=1)))
+
+    for location, day in sorted(days):
+        start = datetime.combine(day, datetime.min.time())
+        cur.execute(f"DELETE FROM {DAILY_TABLE} WHERE location = %s AND bucket = %s", (location, day))
+        cur.execute(f"""
+            INSERT INTO {DAILY_TABLE} ({columns})
+            SELECT %s, %s, {_rollup_aggregates()}
+            FROM {HOURLY_TABLE}
+            WHERE location = %s AND bucket >= %s AND bucket < %s
+            HAVING COUNT(*) > 0
+        """, (location, day, location, start, start + timedelta(days=1)))
+
+
+def rebuild_day(cur, day):
+    """Rebuild every location's rollups for one calendar day from sensor_data."""
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    columns = ', '.join(['location', 'bucket'] + AGGREGATE_COLUMNS)
+
+    cur.execute(f"DELETE FROM {HOURLY_TABLE} WHERE bucket >= %s AND bucket < %s", (start, end))
+    cur.execute(f"""
+        INSERT INTO {HOURLY_TABLE} ({columns})
+        SELECT location, TIMESTAMP(DATE(recorded_at), MAKETIME(HOUR(recorded_at), 0, 0)) AS hour_bucket, {_raw_aggregates()}
+        FROM sensor_data
+        WHERE recorded_at >= %s AND recorded_at < %s
+        GROUP BY location, hour_bucket
+    """, (start, end))
+
+    cur.execute(f"DELETE FROM {DAILY_TABLE} WHERE bucket = %s", (day,))
+    cur.execute(f"""
+        INSERT INTO {DAILY_TABLE} ({columns})
+        SELECT location, %s, {_rollup_aggregates()}
+        FROM {HOURLY_TABLE}
+        WHERE bucket >= %s AND bucket < %s
+        GROUP BY location
+    """, (day, start, end))
@@ -0,0 +1,72 @@
+# services/serialization.py
+
+import json
+from datetime import time
+
+import msgspec
+from flask.json.provider import JSONProvider
+from MySQLdb.constants import FIELD_TYPE
+from MySQLdb.converters import conversions
+from MySQLdb.times import TimeDelta_or_None
+
+
+def convert_time(value):
+    """MySQLdb converter for TIME columns.
+
+    sensor_data.time is a time of day, so it comes back as datetime.time and
+    encodes as "HH:MM:SS" instead of the timedelta MySQLdb uses by default.
+    Values outside 00:00:00-23:59:59 keep the timedelta conversion.
+    """
+    if isinstance(value, bytes):
+        value = value.decode()
+    try:
+        return time.fromisoformat(value)
+    except ValueError:
+        return TimeDelta_or_None(value)
+
+
+def mysql_conversions():
+    conv = conversions.copy()
+    conv[FIELD_TYPE.TIME] = convert_time
+    return conv
+
+
+def pymysql_conversions():
+    """The same TIME handling for PyMySQL-based drivers (aiomysql)."""
+    from pymysql import converters
+
+    conv = converters.conversions.copy()
+    conv[FIELD_TYPE.TIME] = convert_time
+    return conv
+
+
+def _enc_hook(value):
+    # msgspec already handles date/datetime/time (ISO 8601) and Decimal;
+    # anything else that exposes an isoformat() is treated the same way
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class MsgspecJSONProvider(JSONProvider):
+    """JSON provider that encodes responses with msgspec.
+
+    Query results are encoded directly from MySQLdb values: DATE as
+    "YYYY-MM-DD", DATETIME as ISO 8601, TIME (see convert_time) as "HH:MM:SS"
+    and DECIMAL as a JSON number. Request bodies are still parsed with the
+    standard library so invalid JSON raises ValueError as Flask expects.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.encoder = msgspec.json.Encoder(enc_hook=_enc_hook, decimal_format='number')
+
+    def dumps(self, obj, **kwargs):
+        return self.encoder.encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encoder.encode(obj), mimetype='application/json')
@@ -0,0 +1,56 @@
+# services/streaming.py
+
+from flask import Response, current_app, stream_with_context
+
+from services.db_pool import InstrumentedSSCursor
+
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def stream_query(query, params, fmt):
+    """Stream the rows of a query as a JSON array or NDJSON.
+
+    Rows are read through an unbuffered server-side cursor and encoded
+    STREAM_CHUNK_ROWS at a time, so memory use does not grow with the size of
+    the result. Errors after the first chunk has been sent can only end the
+    stream early, so they are logged rather than turned into an error response.
+    """
+    from app import mysql  # Import here to avoid circular import
+
+    chunk_rows = current_app.config['STREAM_CHUNK_ROWS']
+    dumps = current_app.json.dumps
+
+    def generate():
+        cur = mysql.connection.cursor(InstrumentedSSCursor)
+        first = True
+        try:
+            cur.execute(query, params)
+            columns = [desc[0] for desc in cur.description]
+            if fmt == 'json':
+                yield '['
+            while True:
+                rows = cur.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield encode_chunk(rows, columns, fmt, first, dumps)
+                first = False
+            if fmt == 'json':
+                yield ']'
+        except Exception as e:
+            current_app.logger.error(f"Error streaming query results: {e}", exc_info=True)
+        finally:
+            cur.close()
+
+    return Response(stream_with_context(generate()), mimetype=STREAM_FORMATS[fmt])
+
+
+def encode_chunk(rows, columns, fmt, first, dumps):
+    """Encode one fetchmany() chunk of a stream in `fmt`."""
+    if fmt == 'json':
+        # Encode the chunk as one array and drop its brackets
+        encoded = dumps([dict(zip(columns, row)) for row in rows])[1:-1]
+        return ('' if first else ',') + encoded
+    return '\n'.join(dumps(dict(zip(columns, row))) for row in rows) + '\n'
@@ -0,0 +1,196 @@
+# services/synthetic.py
+
+import math
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+import MySQLdb
+
+from services.ingest import INSERT_COLUMNS
+
+# Rows per multi-row INSERT statement for --method insert
+INSERT_CHUNK_ROWS = 5000
+
+LOAD_DATA_QUERY = f"""
+    LOAD DATA LOCAL INFILE %s INTO TABLE sensor_data
+    CHARACTER SET utf8mb4
+    FIELDS TERMINATED BY ',' LINES TERMINATED BY '\\n'
+    ({', '.join(INSERT_COLUMNS)})
+"""
+
+# Server or client refusing LOAD DATA LOCAL (local_infile off on either side)
+LOCAL_INFILE_ERRORS = (1148, 2068, 3948)
+
+
+class SensorModel:
+    """Simulated water sensor at one location.
+
+    Temperature follows a seasonal cycle plus a diurnal one peaking mid
+    afternoon, with autocorrelated noise. pH drifts as a mean-reverting
+    random walk with a small daytime rise from photosynthesis. Turbidity
+    sits near a low baseline and jumps on random runoff events, decaying
+    back over hours. Every parameter is drawn from a generator seeded with
+    the run seed and the location name, so a location's series does not
+    depend on which other locations are generated.
+    """
+
+    def __init__(self, location, seed, interval):
+        rng = random.Random(f'{seed}:{location}')
+        self.rng = rng
+        self.location = location
+        hours = interval / 3600
+
+        self.temp_base = rng.uniform(14, 26)
+        self.temp_season = rng.uniform(2, 7)
+        self.temp_diurnal = rng.uniform(1.5, 5)
+        self.temp_noise = 0.0
+        self.temp_persistence = math.exp(-hours / 3)
+
+        self.ph_mean = rng.uniform(6.8, 7.9)
+        self.ph = self.ph_mean + rng.gauss(0, 0.2)
+        self.ph_pull = min(1.0, hours / 72)
+        self.ph_step = 0.04 * math.sqrt(hours)
+        self.ph_diurnal = rng.uniform(0.05, 0.2)
+
+        self.turbidity_base = rng.uniform(0.8, 3.0)
+        self.spike = 0.0
+        self.spike_decay = math.exp(-hours / rng.uniform(6, 24))
+        self.spike_chance = rng.uniform(0.02, 0.15) / 24 * hours
+
+    def reading(self, season, daylight):
+        """(ph_value, temperature, turbidity) for the next sample.
+
+        season and daylight are in [-1, 1]: the phase of the year (1 at the
+        warmest) and of the day (1 at the warmest hour).
+        """
+        rng = self.rng
+        self.temp_noise = self.temp_noise * self.temp_persistence + rng.gauss(0, 0.3)
+        temperature = (self.temp_base + self.temp_season * season
+                       + self.temp_diurnal * daylight + self.temp_noise)
+
+        self.ph += self.ph_pull * (self.ph_mean - self.ph) + rng.gauss(0, self.ph_step)
+        ph_value = min(9.5, max(5.5, self.ph + self.ph_diurnal * daylight))
+
+        self.spike *= self.spike_decay
+        if rng.random() < self.spike_chance:
+            self.spike += rng.uniform(5, 60)
+        turbidity = self.turbidity_base * math.exp(rng.gauss(0, 0.15)) + self.spike
+
+        return ph_value, temperature, turbidity
+
+
+def generate(locations, start, end, interval, seed):
+    """Yield (location, ph_value, temperature, turbidity, date, time, recorded_at)
+    rows every `interval` seconds from start to end, all locations per
+    timestamp, in time order. Values are rounded to two decimals and dates
+    and times are strings, ready for either writer.
+    """
+    models = [SensorModel(location, seed, interval) for location in locations]
+    step = timedelta(seconds=interval)
+    at = start
+    while at <= end:
+        date, clock = at.strftime('%Y-%m-%d'), at.strftime('%H:%M:%S')
+        recorded_at = f'{date} {clock}'
+        # Warmest around late July and at 15:00
+        season = math.cos(2 * math.pi * (at.timetuple().tm_yday - 205) / 365.25)
+        daylight = math.cos(2 * math.pi * (at.hour + at.minute / 60 - 15) / 24)
+        for model in models:
+            ph_value, temperature, turbidity = model.reading(season, daylight)
+            yield (model.location, round(ph_value, 2), round(temperature, 2), round(turbidity, 2),
+                   date, clock, recorded_at)
+        at += step
+
+
+def csv_line(row):
+    return f'{row[0]},{row[1]},{row[2]},{row[3]},{row[4]},{row[5]},{row[6]}\n'
+
+
+def write_csv(rows, f):
+    count = 0
+    for row in rows:
+        f.write(csv_line(row))
+        count += 1
+    return count
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_infile(conn, rows, batch_rows, progress=None):
+    """Load rows with LOAD DATA LOCAL INFILE, one temporary CSV and one
+    transaction per batch. Needs local_infile enabled on the server and the
+    connection."""
+    cur = conn.cursor()
+    fd, path = tempfile.mkstemp(prefix='water360-load-', suffix='.csv')
+    os.close(fd)
+    loaded = 0
+    try:
+        for batch in _batches(rows, batch_rows):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.writelines(csv_line(row) for row in batch)
+            cur.execute(LOAD_DATA_QUERY, (path,))
+            conn.commit()
+            loaded += len(batch)
+            if progress:
+                progress(loaded)
+    finally:
+        cur.close()
+        os.remove(path)
+    return loaded
+
+
+def insert_rows(conn, rows, batch_rows, progress=None):
+    """Load rows with multi-row INSERTs, committing every batch_rows rows."""
+    cur = conn.cursor()
+    placeholders = '(' + ', '.join(['%s'] * len(INSERT_COLUMNS)) + ')'
+    loaded = 0
+    try:
+        for batch in _batches(rows, batch_rows):
+            for start in range(0, len(batch), INSERT_CHUNK_ROWS):
+                chunk = batch[start:start + INSERT_CHUNK_ROWS]
+                cur.execute(
+                    f"INSERT INTO sensor_data ({', '.join(INSERT_COLUMNS)}) VALUES "
+                    + ', '.join([placeholders] * len(chunk)),
+                    [value for row in chunk for value in row]
+                )
+            conn.commit()
+            loaded += len(batch)
+            if progress:
+                progress(loaded)
+    finally:
+        cur.close()
+    return loaded
+
+
+def is_local_infile_error(error):
+    return isinstance(error, MySQLdb.Error) and error.args and error.args[0] in LOCAL_INFILE_ERRORS
+
+
+class Progress:
+    """Prints rows loaded and the load rate at most every `every` seconds."""
+
+    def __init__(self, total, echo, every=2.0):
+        self.total = total
+        self.echo = echo
+        self.every = every
+        self.started = time.monotonic()
+        self._last = 0.0
+
+    def __call__(self, loaded):
+        now = time.monotonic()
+        if now - self._last < self.every and loaded < self.total:
+            return
+        self._last = now
+        rate = loaded / max(now - self.started, 1e-9)
+        self.echo(f'{loaded:,}/{self.total:,} rows ({rate:,.0f} rows/s)')
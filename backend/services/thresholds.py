@@ -0,0 +1,163 @@
+# services/thresholds.py
+
+import re
+import threading
+import time
+
+import MySQLdb
+
+PARAMETER_NAME = re.compile(r'^[a-z_][a-z0-9_]*$')
+NO_SUCH_TABLE = 1146
+
+
+class ThresholdRules:
+    """Warning thresholds per parameter, optionally overridden per location.
+
+    Rules come from the WARNING_THRESHOLDS config, overlaid with rows from the
+    optional warning_thresholds table, and are compiled into a single
+    conditional-aggregation query. The table is checked for changes at most
+    every WARNING_RULES_REFRESH seconds and the query is only rebuilt when
+    its contents actually changed.
+    """
+
+    def __init__(self, app=None):
+        self.defaults = {}
+        self.refresh_interval = 30
+        self._compiled = None
+        self._signature = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.defaults = parse_config(app.config['WARNING_THRESHOLDS'])
+        self.refresh_interval = app.config['WARNING_RULES_REFRESH']
+
+    def get(self, cur):
+        """Return the compiled rules, reloading them if the table changed."""
+        if self._checked_at is not None and time.monotonic() - self._checked_at < self.refresh_interval:
+            return self._compiled
+        with self._lock:
+            signature = self._table_signature(cur)
+            if self._compiled is None or signature != self._signature:
+                rules = {parameter: {'default': rule['default'], 'locations': dict(rule['locations'])}
+                         for parameter, rule in self.defaults.items()}
+                if signature is not None:
+                    self._overlay_table(cur, rules)
+                self._compiled = CompiledRules(rules)
+                self._signature = signature
+            self._checked_at = time.monotonic()
+            return self._compiled
+
+    def _table_signature(self, cur):
+        try:
+            cur.execute("""
+                SELECT COUNT(*), MAX(updated_at),
+                       BIT_XOR(CRC32(CONCAT_WS('|', parameter, location, min_value, max_value)))
+                FROM warning_thresholds
+            """)
+        except MySQLdb.ProgrammingError as e:
+            if e.args[0] == NO_SUCH_TABLE:
+                return None
+            raise
+        return cur.fetchone()
+
+    def _overlay_table(self, cur, rules):
+        cur.execute("SELECT parameter, location, min_value, max_value FROM warning_thresholds")
+        for parameter, location, min_value, max_value in cur.fetchall():
+            rule = rules.setdefault(parameter, {'default': (None, None), 'locations': {}})
+            if location is None:
+                rule['default'] = (min_value, max_value)
+            else:
+                rule['locations'][location.lower()] = (min_value, max_value)
+
+
+class CompiledRules:
+    """One SELECT that returns, per location, the violation count and the
+    lowest/highest out-of-range value of every parameter."""
+
+    def __init__(self, rules):
+        for parameter in rules:
+            if not PARAMETER_NAME.match(parameter):
+                raise ValueError(f'Invalid threshold parameter: {parameter!r}')
+        self.rules = rules
+        self.parameters = list(rules)
+
+        columns, params = [], []
+        for parameter in self.parameters:
+            low_sql, low_params = self._bound_sql(parameter, 0)
+            high_sql, high_params = self._bound_sql(parameter, 1)
+            # A NULL bound compares as NULL, so a missing limit never triggers
+            columns.append(f"COUNT(CASE WHEN `{parameter}` < {low_sql} OR `{parameter}` > {high_sql} THEN 1 END)")
+            params.extend(low_params + high_params)
+            columns.append(f"MIN(CASE WHEN `{parameter}` < {low_sql} THEN `{parameter}` END)")
+            params.extend(low_params)
+            columns.append(f"MAX(CASE WHEN `{parameter}` > {high_sql} THEN `{parameter}` END)")
+            params.extend(high_params)
+
+        self.sql = f"""
+            SELECT location, {', '.join(columns)}
+            FROM sensor_data
+            WHERE recorded_at >= %s
+            GROUP BY location
+        """
+        self.params = params
+
+    def _bound_sql(self, parameter, index):
+        rule = self.rules[parameter]
+        if not rule['locations']:
+            return '%s', [rule['default'][index]]
+        params = []
+        for location, bounds in sorted(rule['locations'].items()):
+            params.extend((location, bounds[index]))
+        params.append(rule['default'][index])
+        whens = ' '.join(['WHEN %s THEN %s'] * len(rule['locations']))
+        return f"(CASE location {whens} ELSE %s END)", params
+
+    def bounds(self, parameter, location):
+        rule = self.rules[parameter]
+        return rule['locations'].get(location.lower(), rule['default'])
+
+    def evaluate(self, cur, since):
+        """Run the rules over readings since `since`.
+
+        Returns {parameter: [{'location', 'violations', 'worst'}, ...]} with
+        only the locations that had at least one violation.
+        """
+        cur.execute(self.sql, self.params + [since])
+        results = {parameter: [] for parameter in self.parameters}
+        for row in cur.fetchall():
+            location = row[0]
+            for i, parameter in enumerate(self.parameters):
+                violations, lowest, highest = row[1 + 3 * i:4 + 3 * i]
+                if not violations:
+                    continue
+                low, high = self.bounds(parameter, location)
+                # Report whichever out-of-range value is furthest from its limit.
+                # DECIMAL columns come back as Decimal, which does not mix with
+                # the float limits, so compare as floats.
+                below = float(low) - float(lowest) if lowest is not None and low is not None else None
+                above = float(highest) - float(high) if highest is not None and high is not None else None
+                worst = lowest if above is None or (below is not None and below >= above) else highest
+                results[parameter].append({'location': location, 'violations': violations, 'worst': worst})
+        for parameter in results:
+            results[parameter].sort(key=lambda item: item['location'])
+        return results
+
+
+def parse_config(config):
+    """Normalize WARNING_THRESHOLDS.
+
+    Each parameter maps either to [min, max] or to
+    {"default": [min, max], "locations": {"<location>": [min, max]}}.
+    """
+    rules = {}
+    for parameter, value in config.items():
+        if isinstance(value, dict):
+            default = tuple(value.get('default', (None, None)))
+            locations = {location.lower(): tuple(bounds) for location, bounds in value.get('locations', {}).items()}
+        else:
+            default, locations = tuple(value), {}
+        rules[parameter] = {'default': default, 'locations': locations}
+    return rules
@@ -0,0 +1,61 @@
+# services/token_versions.py
+
+import threading
+import time
+
+VERSIONS_QUERY = "SELECT id, token_version FROM users WHERE token_version > 0"
+
+
+class TokenVersions:
+    """Per-process copy of users.token_version used to revoke stateless tokens.
+
+    Only users whose version was ever bumped have a non-zero version, so the
+    whole map is reloaded with one small query every TOKEN_VERSION_REFRESH
+    seconds instead of looking a user up on every request.
+    """
+
+    def __init__(self, app=None):
+        self.refresh_interval = 30
+        self._versions = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.refresh_interval = app.config['TOKEN_VERSION_REFRESH']
+
+    def current(self, user_id):
+        if self.stale():
+            self.refresh()
+        return self._versions.get(user_id, 0)
+
+    def stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_interval
+
+    def get(self, user_id):
+        """Version from the last load, without refreshing."""
+        return self._versions.get(user_id, 0)
+
+    def refresh(self):
+        from app import mysql  # Import here to avoid circular import
+
+        cur = mysql.connection.cursor()
+        cur.execute(VERSIONS_QUERY)
+        self.load(cur.fetchall())
+        cur.close()
+
+    def load(self, rows):
+        with self._lock:
+            self._versions = dict(rows)
+            self._loaded_at = time.monotonic()
+
+    def bump(self, user_id):
+        """Invalidate every token issued to a user so far."""
+        from app import mysql  # Import here to avoid circular import
+
+        cur = mysql.connection.cursor()
+        cur.execute("UPDATE users SET token_version = token_version + 1 WHERE id = %s", (user_id,))
+        mysql.connection.commit()
+        cur.close()
+        self.refresh()
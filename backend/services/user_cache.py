@@ -0,0 +1,86 @@
+# services/user_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class UserCache:
+    """Per-process LRU cache of User objects keyed by user id, with a TTL.
+
+    Staleness is bounded by the TTL only: users are changed or deleted
+    outside the API (the API itself only inserts them), so no running
+    process hears about it, and a changed or deleted user keeps being served
+    from the cache for up to USER_CACHE_TTL seconds. Lower the TTL to make
+    such changes take effect sooner; revoking stateless tokens goes through
+    token_versions instead.
+    """
+
+    def __init__(self, app=None):
+        self.maxsize = 0
+        self.ttl = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.maxsize = app.config['USER_CACHE_SIZE']
+        self.ttl = app.config['USER_CACHE_TTL']
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, user_id):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self._misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self._hits += 1
+            return user
+
+    def set(self, user):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[user.id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, user_id=None):
+        """Drop one user, or every cached user when no id is given, for
+        changes made inside this process."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_ratio': self._hits / lookups if lookups else 0.0,
+            }
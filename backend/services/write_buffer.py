@@ -0,0 +1,201 @@
+# services/write_buffer.py
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+from services import ingest
+
+# MySQL errors a flush is retried for: lock wait timeout, deadlock, and the
+# server being unreachable or dropping the connection
+RETRYABLE_MYSQL_ERRORS = (1205, 1213, 2002, 2003, 2006, 2013, 2055)
+
+
+def is_retryable(error):
+    """Whether a failed flush may succeed when tried again, as opposed to
+    failing on a row MySQL will not take however often it is sent."""
+    if isinstance(error, TimeoutError):  # includes db_pool.PoolTimeout
+        return True
+    return bool(error.args) and error.args[0] in RETRYABLE_MYSQL_ERRORS
+
+
+class BufferFull(Exception):
+    """Raised when a reading cannot be queued within the put timeout."""
+
+
+class WriteBuffer:
+    """Bounded in-memory queue of sensor rows written to MySQL in bulk.
+
+    Rows are flushed by a background thread once flush_rows have built up or
+    flush_ms have passed since the oldest queued row, whichever comes first.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'queued': 0,
+            'rejected': 0,
+            'flushes': 0,
+            'flushed_rows': 0,
+            'failed_rows': 0,
+            'retries': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config['INGEST_WRITE_BEHIND']
+        if not self.enabled:
+            return
+        self.flush_rows = app.config['INGEST_BUFFER_FLUSH_ROWS']
+        self.flush_interval = app.config['INGEST_BUFFER_FLUSH_MS'] / 1000
+        self.put_timeout = app.config['INGEST_BUFFER_PUT_TIMEOUT_MS'] / 1000
+        self.chunk_size = app.config['INGEST_BATCH_CHUNK_SIZE']
+        self.retries = app.config['INGEST_BUFFER_FLUSH_RETRIES']
+        self.retry_backoff = app.config['INGEST_BUFFER_RETRY_BACKOFF_MS'] / 1000
+        self._queue = queue.Queue(maxsize=app.config['INGEST_BUFFER_MAX_ROWS'])
+        atexit.register(self.stop)
+
+    def put(self, row):
+        """Queue a row, blocking for at most the put timeout when the buffer is full."""
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats['rejected'] += 1
+            raise BufferFull()
+        with self._stats_lock:
+            self._stats['queued'] += 1
+
+    def stop(self, timeout=10):
+        """Stop the flusher after it has written everything still queued."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['enabled'] = self.enabled
+        stats['queue_depth'] = self._queue.qsize() if self._queue is not None else 0
+        stats['avg_flush_ms'] = stats['total_flush_ms'] / stats['flushes'] if stats['flushes'] else 0.0
+        return stats
+
+    def _ensure_started(self):
+        # gunicorn forks workers after the app is created, so each worker
+        # process starts its own flusher on first use
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='write-buffer-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._drain()
+            if batch:
+                self._flush(batch)
+
+    def _drain(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.flush_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        failed = self._write(batch)
+        if failed < len(batch):
+            self._notify_readers()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            self._stats['flushes'] += 1
+            self._stats['flushed_rows'] += len(batch) - failed
+            self._stats['failed_rows'] += failed
+            self._stats['last_flush_ms'] = elapsed_ms
+            self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], elapsed_ms)
+            self._stats['total_flush_ms'] += elapsed_ms
+
+    def _write(self, rows):
+        """Write rows in one transaction and return how many had to be dropped.
+
+        Errors that may clear up (see is_retryable) are retried with
+        exponential backoff. Any other error comes from a row MySQL will not
+        take, so the rows are split in half and each half is written on its
+        own, narrowing down to the bad rows so that only they are dropped.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                self._insert(rows)
+                return 0
+            except Exception as e:
+                if not is_retryable(e):
+                    error = e
+                    break
+                if attempt == self.retries:
+                    self.app.logger.error(f"Error flushing {len(rows)} buffered readings, giving up after "
+                                          f"{attempt + 1} attempts: {e}", exc_info=True)
+                    return len(rows)
+                with self._stats_lock:
+                    self._stats['retries'] += 1
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
+        if len(rows) == 1:
+            self.app.logger.error(f"Dropping buffered reading {rows[0]}: {error}")
+            return 1
+        middle = len(rows) // 2
+        return self._write(rows[:middle]) + self._write(rows[middle:])
+
+    def _insert(self, rows):
+        from app import mysql  # Import here to avoid circular import
+
+        # A fresh app context per attempt, so a failed attempt's connection
+        # goes back to the pool (rolled back, or discarded if it broke)
+        with self.app.app_context():
+            cur = mysql.connection.cursor()
+            ingest.insert_readings(cur, rows, self.chunk_size)
+            mysql.connection.commit()
+            cur.close()
+
+    def _notify_readers(self):
+        # Runs once per flush, after the rows are committed and outside the
+        # retry loop: a failure here must not get stored rows written again
+        from app import live_feed, response_cache
+
+        try:
+            with self.app.app_context():
+                response_cache.bump_version()
+                live_feed.notify()
+        except Exception as e:
+            self.app.logger.error(f"Error announcing flushed readings: {e}", exc_info=True)
@@ -0,0 +1,37 @@
+# tests/test_columnar.py
+
+import pytest
+
+from services import columnar
+
+
+def test_wants_columnar():
+    assert columnar.wants_columnar({'format': 'columnar'})
+    assert not columnar.wants_columnar({})
+    with pytest.raises(ValueError, match='format must be'):
+        columnar.wants_columnar({'format': 'csv'})
+
+
+def test_to_columnar_dictionary_encodes_locations():
+    rows = [(1, 'US', 7.0), (2, 'UK', 7.5), (3, 'US', 6.9)]
+    result = columnar.to_columnar(['id', 'location', 'ph_value'], rows)
+    assert result == {
+        'format': 'columnar',
+        'count': 3,
+        'columns': ['id', 'location', 'ph_value'],
+        'data': {'id': [1, 2, 3], 'location': [0, 1, 0], 'ph_value': [7.0, 7.5, 6.9]},
+        'dictionaries': {'location': ['US', 'UK']},
+    }
+
+
+def test_to_columnar_drops_trailing_sort_keys():
+    result = columnar.to_columnar(['id', 'ph_value'], [(1, 7.0, 'sort-key')])
+    assert result['data'] == {'id': [1], 'ph_value': [7.0]}
+    assert 'dictionaries' not in result
+
+
+def test_to_columnar_with_no_rows_keeps_columns():
+    result = columnar.to_columnar(['id', 'location'], [])
+    assert result['count'] == 0
+    assert result['data'] == {'id': [], 'location': []}
+    assert result['dictionaries'] == {'location': []}
@@ -0,0 +1,82 @@
+# tests/test_conditional.py
+
+import pytest
+from flask import Flask
+
+from services import conditional
+
+
+class MissingTable(Exception):
+    """Stands in for the driver's ProgrammingError, which carries the MySQL error code."""
+
+
+class Cursor:
+    def __init__(self, error=None):
+        self.error = error
+        self.executed = []
+
+    def execute(self, query, params=()):
+        self.executed.append(' '.join(query.split()))
+        if self.error:
+            raise self.error
+
+
+def etag(path, row):
+    with Flask(__name__).test_request_context(path) as ctx:
+        return conditional.make_etag(ctx.request, row)
+
+
+def test_etag_query_covers_inserts_and_changes():
+    query, params = conditional.etag_query(trailing_ids=500)
+    assert params == (500,)
+    assert 'MAX(id)' in query and 'sensor_data_version' in query
+
+
+def test_window_endpoints_also_count_the_window():
+    query, params = conditional.etag_query(window_hours=24)
+    assert len(params) == 2
+    assert 'recorded_at >= %s' in query
+
+
+def test_etag_is_stable_for_the_same_data_and_arguments():
+    row = (120, 120, 3, '2024-01-01 00:00:00')
+    assert etag('/data?a=1&b=2', row) == etag('/data?b=2&a=1', row)
+    assert etag('/data?a=1', row) != etag('/data?a=2', row)
+
+
+@pytest.mark.parametrize('changed', [
+    (121, 121, 3, '2024-01-01 00:00:00'),  # a new reading
+    (120, 119, 3, '2024-01-01 00:00:00'),  # a late commit below MAX(id), or a recent delete
+    (120, 120, 4, '2024-01-01 00:00:05'),  # an update or delete anywhere
+])
+def test_etag_changes_with_the_data(changed):
+    assert etag('/data', (120, 120, 3, '2024-01-01 00:00:00')) != etag('/data', changed)
+
+
+def test_missing_version_table_disables_tagging_once(caplog):
+    app = Flask(__name__)
+    app.config['CONDITIONAL_GET'] = True
+    assert conditional.tagging_enabled(app)
+    conditional.etag_failed(app, MissingTable(1146, "Table 'sensor_data_version' doesn't exist"))
+    assert not conditional.tagging_enabled(app)
+    assert [r.levelname for r in caplog.records] == ['WARNING']
+
+
+def test_other_etag_errors_keep_tagging_on(caplog):
+    app = Flask(__name__)
+    app.config['CONDITIONAL_GET'] = True
+    conditional.etag_failed(app, MissingTable(2013, 'Lost connection to MySQL server'))
+    assert conditional.tagging_enabled(app)
+    assert [r.levelname for r in caplog.records] == ['ERROR']
+
+
+def test_bump_data_version_updates_the_row():
+    cur = Cursor()
+    conditional.bump_data_version(cur)
+    assert cur.executed == ['UPDATE sensor_data_version SET version = version + 1 WHERE id = 1']
+
+
+def test_bump_data_version_tolerates_missing_table():
+    conditional.bump_data_version(Cursor(MissingTable(1146, "Table 'sensor_data_version' doesn't exist")))
+    with pytest.raises(MissingTable):
+        conditional.bump_data_version(Cursor(MissingTable(1205, 'Lock wait timeout exceeded')))
@@ -0,0 +1,197 @@
+# tests/test_db_pool.py
+
+import threading
+
+import pytest
+from flask import Flask
+
+MySQLdb = pytest.importorskip('MySQLdb')
+
+from services import db_pool  # noqa: E402
+from services.db_pool import ConnectionPool, MySQLPool, PoolTimeout  # noqa: E402
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.pings = 0
+        self.rollbacks = 0
+        self.broken = False
+
+    def ping(self):
+        self.pings += 1
+        if self.broken:
+            raise MySQLdb.OperationalError(2006, 'MySQL server has gone away')
+
+    def rollback(self):
+        self.rollbacks += 1
+        if self.broken:
+            raise MySQLdb.OperationalError(2013, 'Lost connection to MySQL server during query')
+
+    def close(self):
+        self.closed = True
+
+
+class Connector:
+    """The pool's `connect` callable, keeping every connection it opened."""
+
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self, **options):
+        conn = FakeConnection(len(self.opened))
+        self.opened.append(conn)
+        return conn
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(db_pool.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def make_pool(**options):
+    connect = Connector()
+    settings = dict(min_size=0, max_size=2, timeout=0.05, ping_interval=30, recycle=3600)
+    settings.update(options)
+    return ConnectionPool(connect, **settings), connect
+
+
+def test_fill_opens_min_size():
+    pool, connect = make_pool(min_size=2)
+    pool.fill()
+    assert len(connect.opened) == 2
+    assert pool.get_stats()['idle'] == 2
+
+
+def test_released_connection_is_reused_and_rolled_back():
+    pool, connect = make_pool()
+    conn = pool.acquire()
+    pool.release(conn)
+    assert conn.rollbacks == 1
+    assert pool.acquire() is conn
+    assert len(connect.opened) == 1
+
+
+def test_exhausted_pool_times_out():
+    pool, connect = make_pool(max_size=2)
+    pool.acquire(), pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert isinstance(PoolTimeout(), TimeoutError)
+    stats = pool.get_stats()
+    assert (stats['timeouts'], stats['in_use'], len(connect.opened)) == (1, 2, 2)
+
+
+def test_waiting_checkout_gets_the_released_connection():
+    pool, connect = make_pool(max_size=1, timeout=5)
+    conn = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    pool.release(conn)
+    waiter.join(5)
+    assert got == [conn]
+    assert len(connect.opened) == 1
+
+
+def test_old_connections_are_recycled(clock):
+    pool, connect = make_pool(recycle=60)
+    conn = pool.acquire()
+    pool.release(conn)
+    clock[0] += 61
+    fresh = pool.acquire()
+    assert fresh is not conn and conn.closed
+    assert pool.get_stats()['recycled'] == 1
+
+
+def test_idle_connections_are_pinged_before_reuse(clock):
+    pool, connect = make_pool(ping_interval=30)
+    conn = pool.acquire()
+    pool.release(conn)
+    clock[0] += 10
+    assert pool.acquire() is conn and conn.pings == 0
+    pool.release(conn)
+    clock[0] += 31
+    assert pool.acquire() is conn and conn.pings == 1
+
+
+def test_connection_failing_its_ping_is_replaced(clock):
+    pool, connect = make_pool(ping_interval=30)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.broken = True
+    clock[0] += 31
+    fresh = pool.acquire()
+    assert fresh is not conn and conn.closed
+    assert pool.get_stats()['failed_pings'] == 1
+
+
+def test_connection_failing_rollback_is_discarded():
+    pool, connect = make_pool()
+    conn = pool.acquire()
+    conn.broken = True
+    pool.release(conn)
+    assert conn.closed
+    assert pool.get_stats()['size'] == 0
+
+
+def test_with_block_discards_on_operational_error():
+    pool, connect = make_pool()
+    with pytest.raises(MySQLdb.OperationalError):
+        with pool.connection() as conn:
+            raise MySQLdb.OperationalError(2013, 'Lost connection to MySQL server during query')
+    assert conn.closed and conn.rollbacks == 0
+    assert pool.get_stats()['size'] == 0
+
+
+def test_with_block_returns_connection_on_other_errors():
+    pool, connect = make_pool()
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            raise ValueError('bad row')
+    assert not conn.closed
+    assert pool.get_stats()['idle'] == 1
+
+
+def test_failed_open_frees_its_slot():
+    def refuse(**options):
+        raise MySQLdb.OperationalError(2003, "Can't connect to MySQL server")
+
+    pool = ConnectionPool(refuse, min_size=0, max_size=1, timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(MySQLdb.OperationalError):
+            pool.acquire()
+    assert pool.get_stats()['size'] == 0
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config.update(MYSQL_POOL_MIN_SIZE=0, MYSQL_POOL_MAX_SIZE=2, MYSQL_POOL_TIMEOUT=0.05,
+                      MYSQL_POOL_PING_INTERVAL=30, MYSQL_POOL_RECYCLE=3600)
+    mysql = MySQLPool(app)
+    connect = Connector()
+    mysql._connect = connect
+    return app, mysql, connect
+
+
+def test_request_connection_is_returned_on_teardown():
+    app, mysql, connect = make_app()
+    with app.app_context():
+        first = mysql.connection
+        assert mysql.connection is first
+        assert mysql.get_stats()['in_use'] == 1
+    assert mysql.get_stats()['in_use'] == 0
+    assert first.rollbacks == 1
+
+
+def test_request_connection_is_discarded_after_operational_error():
+    app, mysql, connect = make_app()
+    with pytest.raises(MySQLdb.OperationalError):
+        with app.app_context():
+            conn = mysql.connection
+            raise MySQLdb.OperationalError(2006, 'MySQL server has gone away')
+    assert conn.closed
+    assert mysql.get_stats()['size'] == 0
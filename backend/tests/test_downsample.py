@@ -0,0 +1,127 @@
+# tests/test_downsample.py
+
+import math
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from services import downsample
+
+
+def reference_lttb(x, y, threshold):
+    # The textbook loop, one point at a time
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    kept, a = [0], 0
+    for k in range(threshold - 2):
+        lo = int(math.floor(k * every)) + 1
+        hi = int(math.floor((k + 1) * every)) + 1
+        # The next bucket; for the last one that is just the final point
+        next_hi = min(int(math.floor((k + 2) * every)) + 1, n)
+        avg_x = sum(x[hi:next_hi]) / (next_hi - hi)
+        avg_y = sum(y[hi:next_hi]) / (next_hi - hi)
+        best, best_area = lo, -1.0
+        for i in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[i] - y[a]) - (x[a] - x[i]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = i, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+@pytest.mark.parametrize('value, seconds', [('30s', 30), ('15m', 900), ('1h', 3600), ('7d', 7 * 86400)])
+def test_parse_bucket(value, seconds):
+    assert downsample.parse_bucket(value) == seconds
+
+
+@pytest.mark.parametrize('value', ['', None, '0m', '15', '1w', '-1h', '1.5h'])
+def test_parse_bucket_rejects_bad_values(value):
+    with pytest.raises(ValueError, match='bucket'):
+        downsample.parse_bucket(value)
+
+
+@pytest.mark.parametrize('seconds, text', [(45, '45s'), (900, '15m'), (7200, '2h'), (86400, '1d'), (90, '90s')])
+def test_format_bucket(seconds, text):
+    assert downsample.format_bucket(seconds) == text
+
+
+def test_parse_range_dates_cover_whole_days():
+    assert downsample.parse_range('2024-03-01', '2024-03-02') == (datetime(2024, 3, 1), datetime(2024, 3, 3))
+
+
+def test_parse_range_datetimes_are_exact():
+    start, end = downsample.parse_range('2024-03-01T06:00:00', '2024-03-01T09:30:00')
+    assert (start, end) == (datetime(2024, 3, 1, 6), datetime(2024, 3, 1, 9, 30))
+
+
+@pytest.mark.parametrize('start, end, message', [
+    ('yesterday', '2024-03-01', 'ISO'),
+    ('2024-03-01T10:00:00', '2024-03-01T09:00:00', 'after'),
+])
+def test_parse_range_rejects_bad_ranges(start, end, message):
+    with pytest.raises(ValueError, match=message):
+        downsample.parse_range(start, end)
+
+
+@pytest.mark.parametrize('end, points, size', [
+    (datetime(2024, 3, 2), 500, 300),          # a day in 500 points: 5 minutes
+    (datetime(2024, 3, 2), 24, 3600),
+    (datetime(2024, 3, 1, 0, 1), 500, 1),
+    (datetime(2025, 3, 1), 500, 86400),
+])
+def test_pick_bucket(end, points, size):
+    assert downsample.pick_bucket(datetime(2024, 3, 1), end, points) == size
+
+
+def test_pick_bucket_beyond_the_largest_size():
+    start, end = datetime(2000, 1, 1), datetime(2024, 1, 1)
+    size = downsample.pick_bucket(start, end, 10)
+    assert size > downsample.BUCKET_SIZES[-1]
+    assert (end - start).total_seconds() / size <= 10
+
+
+def test_bucket_origin_aligns_to_the_bucket_size():
+    start = datetime(2024, 3, 1, 13, 47, 12)
+    assert downsample.bucket_origin(start, 3600) == datetime(2024, 3, 1, 13)
+    assert downsample.bucket_origin(start, 900) == datetime(2024, 3, 1, 13, 45)
+    assert downsample.bucket_origin(start, 7 * 86400) == datetime(2024, 3, 1)
+
+
+@pytest.mark.parametrize('n, threshold', [(10, 10), (10, 20), (10, 2)])
+def test_lttb_keeps_everything_when_not_reducing(n, threshold):
+    x = np.arange(n, dtype=float)
+    assert list(downsample.lttb(x, x, threshold)) == list(range(n))
+
+
+@pytest.mark.parametrize('n, threshold', [(100, 3), (100, 10), (1000, 37), (5000, 500)])
+def test_lttb_matches_the_reference(n, threshold):
+    rng = random.Random(n * threshold)
+    x = [float(i) for i in range(n)]
+    y = [rng.gauss(0, 1) for _ in range(n)]
+    kept = downsample.lttb(np.array(x), np.array(y), threshold)
+    assert list(kept) == reference_lttb(x, y, threshold)
+
+
+def test_lttb_keeps_the_spike():
+    y = np.zeros(1000)
+    y[613] = 50.0
+    kept = downsample.lttb(np.arange(1000, dtype=float), y, 20)
+    assert len(kept) == 20
+    assert kept[0] == 0 and kept[-1] == 999
+    assert 613 in kept
+    assert list(kept) == sorted(set(kept))
+
+
+def test_lttb_rows_returns_offsets_and_values():
+    rows = [(slot, float(slot % 7)) for slot in range(0, 200, 2)]
+    points = downsample.lttb_rows(rows, 60, 10)
+    assert len(points) == 10
+    assert points[0] == (0, 0.0)
+    assert points[-1] == (198 * 60, float(198 % 7))
+    assert all(offset % 120 == 0 and isinstance(value, float) for offset, value in points)
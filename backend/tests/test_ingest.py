@@ -0,0 +1,87 @@
+# tests/test_ingest.py
+
+import pytest
+from flask import Flask
+
+from services import ingest
+
+READING = {'location': 'US', 'ph_value': '7.1', 'temperature': 22, 'turbidity': 3.5}
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, query, params=()):
+        self.statements.append((query, params))
+
+
+def test_parse_reading_returns_row_tuple():
+    row = ingest.parse_reading(dict(READING, date='2024-01-02', time='03:04:05'))
+    assert row == ('US', 7.1, 22.0, 3.5, '2024-01-02', '03:04:05')
+
+
+def test_parse_reading_stamps_missing_date_and_time():
+    row = ingest.parse_reading(READING)
+    assert len(row[4]) == 10 and len(row[5]) == 8
+
+
+@pytest.mark.parametrize('changes, message', [
+    ({'location': ''}, 'location is required'),
+    ({'ph_value': None}, 'ph_value is required'),
+    ({'temperature': 'warm'}, 'temperature must be a number'),
+    ({'turbidity': 'nan'}, 'turbidity must be a finite number'),
+    ({'ph_value': 'inf'}, 'ph_value must be a finite number'),
+    ({'temperature': '1e999'}, 'temperature must be a finite number'),
+    ({'date': '2024-13-01', 'time': '00:00:00'}, 'date and time'),
+    ({'date': '2024-01-01'}, 'date and time'),
+])
+def test_parse_reading_rejects_invalid_fields(changes, message):
+    with pytest.raises(ValueError, match=message):
+        ingest.parse_reading(dict(READING, **changes))
+
+
+def test_parse_reading_rejects_non_objects():
+    with pytest.raises(ValueError, match='JSON object'):
+        ingest.parse_reading(['US', 7])
+
+
+def test_parse_reading_can_require_timestamp():
+    with pytest.raises(ValueError, match='date and time are required'):
+        ingest.parse_reading(READING, require_timestamp=True)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'json': [READING, READING]},
+    {'json': {'readings': [READING, READING]}},
+])
+def test_read_batch_accepts_json_shapes(kwargs):
+    with Flask(__name__).test_request_context(method='POST', **kwargs) as ctx:
+        readings, errors = ingest.read_batch(ctx.request)
+    assert [index for index, _ in readings] == [0, 1]
+    assert errors == []
+
+
+def test_read_batch_reports_bad_ndjson_lines_by_index():
+    body = '{"location": "US"}\n\nnot json\n{"location": "UK"}\n'
+    with Flask(__name__).test_request_context(method='POST', data=body,
+                                              content_type='application/x-ndjson') as ctx:
+        readings, errors = ingest.read_batch(ctx.request)
+    assert [index for index, _ in readings] == [0, 3]
+    assert errors == [{'index': 2, 'error': 'Invalid JSON'}]
+
+
+def test_read_batch_rejects_other_bodies():
+    with Flask(__name__).test_request_context(method='POST', json={'location': 'US'}) as ctx:
+        assert ingest.read_batch(ctx.request) == (None, None)
+
+
+def test_insert_readings_chunks_rows_and_fills_recorded_at():
+    app = Flask(__name__)
+    app.config['ROLLUPS_ENABLED'] = False
+    rows = [('US', 7.0, 20.0, 1.0, '2024-01-01', f'00:00:0{i}') for i in range(5)]
+    cur = RecordingCursor()
+    with app.app_context():
+        assert ingest.insert_readings(cur, rows, chunk_size=2) == 5
+    assert [len(params) for _, params in cur.statements] == [14, 14, 7]
+    assert cur.statements[2][1][-1] == '2024-01-01 00:00:04'
@@ -0,0 +1,118 @@
+# tests/test_live_feed.py
+
+from flask import Flask
+
+from services import live_feed
+from services.live_feed import LiveFeed, RecentIds, Subscription, TailState
+
+
+def reading(row_id, location='US'):
+    return (row_id, location, 7.0, 20.0, 1.0, '2024-01-01', '00:00:00')
+
+
+def tail_pass(state, table):
+    """What LiveFeed._dispatch does, against a dict of committed rows."""
+    low, high = state.late_range()
+    late = state.missing(row_id for row_id in sorted(table) if low < row_id <= high)
+    sent = state.advance([table[row_id] for row_id in late])
+    sent += state.advance([table[row_id] for row_id in sorted(table) if row_id > state.high])
+    return [row[0] for row in sent]
+
+
+def test_recent_ids_forget_oldest():
+    ids = RecentIds(2)
+    assert ids.add(1) and ids.add(2) and not ids.add(2)
+    ids.add(3)
+    assert 1 not in ids and 2 in ids and 3 in ids
+
+
+def test_tail_sends_new_rows_once():
+    table = {row_id: reading(row_id) for row_id in range(1, 11)}
+    state = TailState(10, rescan=100)
+    assert tail_pass(state, table) == []
+    table.update({11: reading(11), 12: reading(12)})
+    assert tail_pass(state, table) == [11, 12]
+    assert tail_pass(state, table) == []
+
+
+def test_tail_picks_up_rows_committed_out_of_order():
+    table = {row_id: reading(row_id) for row_id in range(1, 11)}
+    state = TailState(10, rescan=100)
+    # id 11 is still uncommitted when 12 becomes visible
+    table[12] = reading(12)
+    assert tail_pass(state, table) == [12]
+    table[11] = reading(11)
+    assert tail_pass(state, table) == [11]
+    assert tail_pass(state, table) == []
+
+
+def test_tail_never_sends_rows_from_before_the_start():
+    table = {row_id: reading(row_id) for row_id in (1, 2, 3, 5)}
+    state = TailState(5, rescan=100)
+    table[4] = reading(4)
+    assert tail_pass(state, table) == []
+
+
+def test_subscription_filters_location_and_drops_when_full():
+    sub = Subscription('us', maxlen=2)
+    sub.push([(1, 'US', 'a'), (2, 'UK', 'b'), (3, 'us', 'c')])
+    assert sub.wait(0) == ([(1, 'a'), (3, 'c')], False)
+    sub.push([(4, 'US', 'd'), (5, 'US', 'e'), (6, 'US', 'f')])
+    assert sub.wait(0) == ([(6, 'f')], True)
+
+
+class QuietFeed(LiveFeed):
+    """LiveFeed with the database reads replaced and no tailer thread."""
+
+    def __init__(self, start_id, backlog):
+        app = Flask(__name__)
+        app.config.update(SSE_POLL_INTERVAL=0.01, SSE_HEARTBEAT=0.01, SSE_QUEUE_SIZE=10,
+                          SSE_BACKLOG_LIMIT=10, SSE_RESCAN_IDS=100)
+        super().__init__(app)
+        self.start_id = start_id
+        self.backlog = backlog
+
+    def _ensure_started(self):
+        pass
+
+    def _max_id(self):
+        return self.start_id
+
+    def _fetch_after(self, last_id, location):
+        return [(row_id, str(row_id)) for row_id in self.backlog if row_id > last_id]
+
+
+def message_ids(events, count):
+    ids = []
+    for message in events:
+        if message.startswith('id: '):
+            ids.append(int(message.split()[1]))
+            if len(ids) == count:
+                return ids
+
+
+def test_events_start_at_subscription_and_accept_late_rows():
+    feed = QuietFeed(start_id=10, backlog=[])
+    events = feed.events()
+    assert next(events).startswith('retry:')
+    next(events)  # subscribes and reads the start, then waits for rows
+    [sub] = feed._subscribers
+    sub.push([(9, 'US', '9'), (12, 'US', '12'), (11, 'US', '11'), (12, 'US', '12')])
+    assert message_ids(events, 2) == [12, 11]
+    events.close()
+    assert feed.subscriber_count() == 0
+
+
+def test_events_replay_without_repeating_live_rows():
+    feed = QuietFeed(start_id=12, backlog=[11, 12])
+    events = feed.events(last_id=10)
+    next(events)
+    assert message_ids(events, 2) == [11, 12]
+    [sub] = feed._subscribers
+    sub.push([(12, 'US', '12'), (13, 'US', '13')])
+    assert message_ids(events, 1) == [13]
+    events.close()
+
+
+def test_row_queries_bind_every_id():
+    assert live_feed.rows_by_id_query([4, 7]).endswith('WHERE id IN (%s, %s) ORDER BY id')
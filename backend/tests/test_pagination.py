@@ -0,0 +1,62 @@
+# tests/test_pagination.py
+
+import pytest
+
+from services import pagination
+
+CONFIG = {'DATA_PAGE_DEFAULT_LIMIT': 500, 'DATA_PAGE_MAX_LIMIT': 5000}
+
+
+@pytest.mark.parametrize('args, expected', [
+    ({}, 500),
+    ({'limit': '20'}, 20),
+    ({'limit': '99999'}, 5000),
+])
+def test_page_limit(args, expected):
+    assert pagination.page_limit(args, CONFIG) == expected
+
+
+@pytest.mark.parametrize('limit, message', [('ten', 'integer'), ('0', 'at least 1')])
+def test_page_limit_rejects_bad_values(limit, message):
+    with pytest.raises(ValueError, match=message):
+        pagination.page_limit({'limit': limit}, CONFIG)
+
+
+def test_cursor_round_trip():
+    cursor = pagination.encode_cursor({'id': 42, 'location': 'US'})
+    assert '=' not in cursor
+    assert pagination.decode_cursor(cursor, ['location', 'id']) == ['US', 42]
+
+
+def test_cursor_encodes_dates_as_strings():
+    from datetime import date
+    cursor = pagination.encode_cursor({'date': date(2024, 1, 2), 'id': 1})
+    assert pagination.decode_cursor(cursor, ['date', 'id']) == ['2024-01-02', 1]
+
+
+def test_missing_cursor_decodes_to_none():
+    assert pagination.decode_cursor(None, ['id']) is None
+    assert pagination.decode_cursor('', ['id']) is None
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', pagination.encode_cursor({'other': 1}), 'bnVsbA'])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        pagination.decode_cursor(cursor, ['id'])
+
+
+def test_since_marks():
+    from datetime import datetime
+    assert pagination.since_marks({}) is None
+    assert pagination.since_marks({'since_id': '41'}) == (41, None)
+    assert pagination.since_marks({'since_ts': '2024-01-02T03:04:05', 'since_id': '7'}) == (
+        7, datetime(2024, 1, 2, 3, 4, 5))
+
+
+@pytest.mark.parametrize('args, message', [
+    ({'since_id': 'abc'}, 'since_id must be an integer'),
+    ({'since_ts': 'yesterday'}, 'since_ts must be an ISO timestamp'),
+])
+def test_since_marks_reject_bad_values(args, message):
+    with pytest.raises(ValueError, match=message):
+        pagination.since_marks(args)
@@ -0,0 +1,29 @@
+# tests/test_query_profiler.py
+
+import pytest
+
+pytest.importorskip('MySQLdb')
+
+from services.query_profiler import MAX_LOGGED_PARAMS, Statement  # noqa: E402
+
+
+def make_statement(params, redact=False):
+    return Statement('SELECT *\n    FROM sensor_data WHERE id = %s', params, redact, 12.345, 1)
+
+
+def test_to_dict_collapses_sql_whitespace_and_rounds_time():
+    data = make_statement((7,)).to_dict()
+    assert data['sql'] == 'SELECT * FROM sensor_data WHERE id = %s'
+    assert data['params'] == '(7,)'
+    assert data['ms'] == 12.35
+
+
+def test_to_dict_truncates_batch_params():
+    rows = [('LOC001', 7.0, 25.0, 3.0, '2024-01-01', '12:00:00')] * 1000
+    params = make_statement(rows).to_dict()['params']
+    assert len(params) == MAX_LOGGED_PARAMS
+    assert params == repr(rows)[:MAX_LOGGED_PARAMS]
+
+
+def test_to_dict_redacts_params():
+    assert make_statement(('secret',), redact=True).to_dict()['params'] == '<redacted>'
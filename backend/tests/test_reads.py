@@ -0,0 +1,41 @@
+# tests/test_reads.py
+
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('MySQLdb')
+
+from services import reads  # noqa: E402
+
+CONFIG = {'DATA_PAGE_DEFAULT_LIMIT': 500, 'DATA_PAGE_MAX_LIMIT': 5000, 'ROLLUPS_ENABLED': False}
+COLUMNS = reads.DATA_COLUMNS + ['recorded_at']
+
+
+def row(row_id, recorded_at='2024-01-01 00:00:00'):
+    return (row_id, 'US', 7.0, 20.0, 1.0, '2024-01-01', '00:00:00', recorded_at)
+
+
+def test_delta_by_id_returns_the_next_mark():
+    plan = reads.data({'since_id': '10', 'limit': '2'}, CONFIG)
+    assert 'id > %s' in plan.query and plan.params[-2:] == [10, 3]
+    body, status = plan.shape([row(11), row(12), row(13)], COLUMNS)
+    assert status == 200 and body['has_more']
+    assert [item['id'] for item in body['data']] == [11, 12]
+    assert body['high_water_mark'] == {'since_id': 12, 'since_ts': None}
+
+
+def test_delta_by_timestamp_seeks_on_timestamp_and_id():
+    plan = reads.data({'since_ts': '2024-01-01T00:00:00', 'since_id': '5'}, CONFIG)
+    assert '(recorded_at > %s OR (recorded_at = %s AND id > %s))' in plan.query
+    assert 'ORDER BY recorded_at, id' in ' '.join(plan.query.split())
+    body, _ = plan.shape([row(6, '2024-01-01 00:00:01')], COLUMNS)
+    assert body['high_water_mark'] == {'since_id': 6, 'since_ts': '2024-01-01 00:00:01'}
+    assert not body['has_more']
+
+
+def test_empty_delta_hands_the_mark_back():
+    plan = reads.data({'since_ts': '2024-01-01T00:00:00'}, CONFIG)
+    body, _ = plan.shape([], COLUMNS)
+    assert body['data'] == []
+    assert body['high_water_mark'] == {'since_id': None, 'since_ts': datetime(2024, 1, 1)}
@@ -0,0 +1,111 @@
+# tests/test_response_cache.py
+
+import pytest
+from flask import Flask, jsonify
+
+from services import response_cache as response_cache_module
+from services.response_cache import InProcessBackend, ResponseCache
+
+
+def make_app(backend='memory', ttl=15):
+    app = Flask(__name__)
+    app.config.update(RESPONSE_CACHE_BACKEND=backend, RESPONSE_CACHE_TTL=ttl, RESPONSE_CACHE_SIZE=2,
+                      RESPONSE_CACHE_URL='redis://localhost:6379/0')
+    cache = ResponseCache(app)
+    calls = []
+
+    @app.route('/readings')
+    @cache.cached()
+    def readings():
+        calls.append(1)
+        return jsonify({'calls': len(calls)})
+
+    return app, cache, calls
+
+
+def test_backend_evicts_least_recently_used():
+    backend = InProcessBackend(maxsize=2)
+    backend.set('a', b'1', 60)
+    backend.set('b', b'2', 60)
+    backend.get('a')
+    backend.set('c', b'3', 60)
+    assert backend.get('b') is None
+    assert backend.get('a') == b'1' and backend.get('c') == b'3'
+
+
+def test_backend_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(response_cache_module.time, 'monotonic', lambda: now[0])
+    backend = InProcessBackend(maxsize=2)
+    backend.set('a', b'1', 10)
+    now[0] += 10
+    assert backend.get('a') is None
+
+
+def test_none_backend_disables_cache():
+    app, cache, calls = make_app('none')
+    client = app.test_client()
+    client.get('/readings')
+    client.get('/readings')
+    assert not cache.enabled and len(calls) == 2
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match='Invalid RESPONSE_CACHE_BACKEND'):
+        make_app('memcached')
+
+
+def test_second_request_is_a_hit():
+    app, cache, calls = make_app()
+    client = app.test_client()
+    first, second = client.get('/readings'), client.get('/readings')
+    assert first.headers['X-Cache'] == 'MISS' and second.headers['X-Cache'] == 'HIT'
+    assert second.get_json() == {'calls': 1}
+    assert cache.get_stats()['hits'] == 1
+
+
+def test_query_string_order_does_not_matter():
+    app, cache, calls = make_app()
+    client = app.test_client()
+    client.get('/readings?a=1&b=2')
+    assert client.get('/readings?b=2&a=1').headers['X-Cache'] == 'HIT'
+    assert client.get('/readings?a=2&b=2').headers['X-Cache'] == 'MISS'
+
+
+def test_bump_version_invalidates_entries():
+    app, cache, calls = make_app()
+    client = app.test_client()
+    client.get('/readings')
+    cache.bump_version()
+    response = client.get('/readings')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json() == {'calls': 2}
+
+
+class DownBackend(InProcessBackend):
+    """A backend whose server is unreachable."""
+
+    errors = (ConnectionError,)
+
+    def get(self, key):
+        raise ConnectionError('redis is down')
+
+    set = incr = get_counter = get
+
+
+def test_unreachable_backend_serves_uncached(caplog):
+    app, cache, calls = make_app()
+    cache.backend = DownBackend(maxsize=2)
+    client = app.test_client()
+    first, second = client.get('/readings'), client.get('/readings')
+    assert first.status_code == second.status_code == 200
+    assert second.headers['X-Cache'] == 'MISS' and len(calls) == 2
+    assert 'serving uncached' in caplog.text
+
+
+def test_bump_version_does_not_raise_when_backend_is_down(caplog):
+    app, cache, calls = make_app()
+    cache.backend = DownBackend(maxsize=2)
+    cache.bump_version()
+    assert 'Could not bump' in caplog.text
+    assert cache.get_stats()['data_version'] is None
@@ -0,0 +1,74 @@
+# tests/test_thresholds.py
+
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip('MySQLdb')
+
+from services.thresholds import CompiledRules, parse_config  # noqa: E402
+
+
+class RowsCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = None
+
+    def execute(self, query, params=()):
+        self.executed = (query, params)
+
+    def fetchall(self):
+        return self.rows
+
+
+def compile_rules(config):
+    return CompiledRules(parse_config(config))
+
+
+def test_parse_config_accepts_pairs_and_location_overrides():
+    rules = parse_config({
+        'ph_value': [6.5, 8.5],
+        'temperature': {'default': [0, 30], 'locations': {'LK': [10, 35]}},
+    })
+    assert rules['ph_value'] == {'default': (6.5, 8.5), 'locations': {}}
+    assert rules['temperature'] == {'default': (0, 30), 'locations': {'lk': (10, 35)}}
+
+
+def test_compiled_query_binds_every_limit():
+    rules = compile_rules({
+        'ph_value': [6.5, 8.5],
+        'temperature': {'default': [0, 30], 'locations': {'LK': [10, 35]}},
+    })
+    assert rules.sql.count('%s') == len(rules.params) + 1  # plus the window start
+    assert rules.params[:4] == [6.5, 8.5, 6.5, 8.5]
+    assert 'CASE location WHEN %s THEN %s ELSE %s END' in rules.sql
+    assert rules.bounds('temperature', 'lk') == (10, 35)
+    assert rules.bounds('temperature', 'US') == (0, 30)
+
+
+def test_invalid_parameter_names_are_rejected():
+    with pytest.raises(ValueError, match='Invalid threshold parameter'):
+        compile_rules({'ph_value; DROP TABLE users': [0, 1]})
+
+
+def test_evaluate_reports_worst_value_per_location():
+    rules = compile_rules({'ph_value': [6.5, 8.5], 'turbidity': [None, 5]})
+    cur = RowsCursor([
+        ('US', 3, 6.0, 9.5, 0, None, None),
+        ('LK', 1, None, 8.6, 2, None, 12.0),
+    ])
+    results = rules.evaluate(cur, '2024-01-01 00:00:00')
+    assert cur.executed[1][-1] == '2024-01-01 00:00:00'
+    assert results['ph_value'] == [
+        {'location': 'LK', 'violations': 1, 'worst': 8.6},
+        {'location': 'US', 'violations': 3, 'worst': 9.5},
+    ]
+    assert results['turbidity'] == [{'location': 'LK', 'violations': 2, 'worst': 12.0}]
+
+
+def test_evaluate_handles_decimal_aggregates():
+    rules = compile_rules({'ph_value': [6.5, 8.5]})
+    cur = RowsCursor([('US', 2, Decimal('4.00'), Decimal('8.60'))])
+    assert rules.evaluate(cur, '2024-01-01 00:00:00')['ph_value'] == [
+        {'location': 'US', 'violations': 2, 'worst': Decimal('4.00')},
+    ]
@@ -0,0 +1,37 @@
+# tests/test_token_versions.py
+
+from flask import Flask
+
+from services import token_versions as token_versions_module
+from services.token_versions import TokenVersions
+
+
+def make_versions(refresh=30):
+    app = Flask(__name__)
+    app.config['TOKEN_VERSION_REFRESH'] = refresh
+    return TokenVersions(app)
+
+
+def test_unknown_users_are_at_version_zero():
+    versions = make_versions()
+    versions.load([(7, 2)])
+    assert versions.get(7) == 2
+    assert versions.get(8) == 0
+
+
+def test_versions_go_stale_after_refresh_interval(monkeypatch):
+    now = [500.0]
+    monkeypatch.setattr(token_versions_module.time, 'monotonic', lambda: now[0])
+    versions = make_versions(refresh=30)
+    assert versions.stale()
+    versions.load([])
+    now[0] += 29
+    assert not versions.stale()
+    now[0] += 1
+    assert versions.stale()
+
+
+def test_current_refreshes_stale_versions(monkeypatch):
+    versions = make_versions()
+    monkeypatch.setattr(versions, 'refresh', lambda: versions.load([(3, 1)]))
+    assert versions.current(3) == 1
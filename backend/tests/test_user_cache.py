@@ -0,0 +1,68 @@
+# tests/test_user_cache.py
+
+from types import SimpleNamespace
+
+from flask import Flask
+
+from services import user_cache as user_cache_module
+from services.user_cache import UserCache
+
+
+def make_cache(size=2, ttl=60):
+    app = Flask(__name__)
+    app.config.update(USER_CACHE_SIZE=size, USER_CACHE_TTL=ttl)
+    return UserCache(app)
+
+
+def user(user_id):
+    return SimpleNamespace(id=user_id)
+
+
+def test_get_returns_cached_user():
+    cache = make_cache()
+    alice = user(1)
+    cache.set(alice)
+    assert cache.get(1) is alice
+    assert cache.get(2) is None
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['hit_ratio']) == (1, 1, 0.5)
+
+
+def test_least_recently_used_user_is_evicted():
+    cache = make_cache(size=2)
+    cache.set(user(1))
+    cache.set(user(2))
+    cache.get(1)
+    cache.set(user(3))
+    assert cache.get(2) is None
+    assert cache.get(1) is not None and cache.get(3) is not None
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(user_cache_module.time, 'monotonic', lambda: now[0])
+    cache = make_cache(ttl=30)
+    cache.set(user(1))
+    now[0] += 29
+    assert cache.get(1) is not None
+    now[0] += 1
+    assert cache.get(1) is None
+    assert cache.get_stats()['size'] == 0
+
+
+def test_invalidate_one_or_all():
+    cache = make_cache(size=5)
+    for user_id in (1, 2, 3):
+        cache.set(user(user_id))
+    cache.invalidate(2)
+    assert cache.get(2) is None and cache.get(1) is not None
+    cache.invalidate()
+    assert cache.get_stats()['size'] == 0
+
+
+def test_zero_size_or_ttl_disables_cache():
+    for cache in (make_cache(size=0), make_cache(ttl=0)):
+        cache.set(user(1))
+        assert not cache.enabled
+        assert cache.get(1) is None
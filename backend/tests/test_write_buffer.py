@@ -0,0 +1,145 @@
+# tests/test_write_buffer.py
+
+import sys
+import threading
+import types
+
+from flask import Flask
+
+from services.write_buffer import WriteBuffer, is_retryable
+
+
+class LostConnection(Exception):
+    """Stands in for the driver's OperationalError, which carries the MySQL error code."""
+
+
+class RecordingBuffer(WriteBuffer):
+    """WriteBuffer whose inserts are recorded instead of sent to MySQL.
+
+    `fail` maps a row to the exception inserting any batch containing it
+    raises; `outages` is the number of leading attempts that lose the
+    connection.
+    """
+
+    def __init__(self, app, fail=None, outages=0):
+        super().__init__(app)
+        self.fail = fail or {}
+        self.outages = outages
+        self.attempts = []
+        self.written = []
+        self.notified = 0
+
+    def _insert(self, rows):
+        self.attempts.append(list(rows))
+        if self.outages:
+            self.outages -= 1
+            raise LostConnection(2013, 'Lost connection to MySQL server during query')
+        for row in rows:
+            if row in self.fail:
+                raise self.fail[row]
+        self.written.extend(rows)
+
+    def _notify_readers(self):
+        self.notified += 1
+
+
+def make_app(**config):
+    app = Flask(__name__)
+    app.config.update({
+        'INGEST_WRITE_BEHIND': True,
+        'INGEST_BUFFER_MAX_ROWS': 100,
+        'INGEST_BUFFER_FLUSH_ROWS': 10,
+        'INGEST_BUFFER_FLUSH_MS': 20,
+        'INGEST_BUFFER_PUT_TIMEOUT_MS': 10,
+        'INGEST_BATCH_CHUNK_SIZE': 500,
+        'INGEST_BUFFER_FLUSH_RETRIES': 3,
+        'INGEST_BUFFER_RETRY_BACKOFF_MS': 0,
+    })
+    app.config.update(config)
+    return app
+
+
+def test_is_retryable():
+    assert is_retryable(LostConnection(2006, 'MySQL server has gone away'))
+    assert is_retryable(LostConnection(1213, 'Deadlock found'))
+    assert is_retryable(TimeoutError('No database connection available'))
+    assert not is_retryable(LostConnection(1366, 'Incorrect decimal value'))
+    assert not is_retryable(ValueError("time data 'x' does not match format"))
+
+
+def test_flush_writes_whole_batch():
+    buffer = RecordingBuffer(make_app())
+    buffer._flush(list(range(8)))
+    assert buffer.written == list(range(8))
+    assert len(buffer.attempts) == 1
+    stats = buffer.get_stats()
+    assert (stats['flushes'], stats['flushed_rows'], stats['failed_rows']) == (1, 8, 0)
+
+
+def test_flush_notifies_once_after_writing():
+    buffer = RecordingBuffer(make_app(), fail={3: ValueError('bad date')})
+    buffer._flush(list(range(8)))
+    assert buffer.notified == 1
+
+
+def test_flush_does_not_notify_when_nothing_was_written():
+    buffer = RecordingBuffer(make_app(), outages=10)
+    buffer._flush(list(range(4)))
+    assert buffer.notified == 0
+
+
+def test_notify_errors_are_logged_not_raised(monkeypatch, caplog):
+    # Stand-ins for the app's response cache and live feed, with redis down
+    class DownCache:
+        def bump_version(self):
+            raise ConnectionError('redis is down')
+
+    notified = []
+    fake_app = types.ModuleType('app')
+    fake_app.response_cache = DownCache()
+    fake_app.live_feed = types.SimpleNamespace(notify=lambda: notified.append(True))
+    monkeypatch.setitem(sys.modules, 'app', fake_app)
+
+    buffer = WriteBuffer(make_app())
+    buffer._notify_readers()
+    assert 'redis is down' in caplog.text
+    assert notified == []
+
+
+def test_flush_retries_transient_errors():
+    buffer = RecordingBuffer(make_app(), outages=2)
+    buffer._flush(list(range(4)))
+    assert buffer.written == list(range(4))
+    assert buffer.get_stats()['retries'] == 2
+
+
+def test_flush_gives_up_after_retries():
+    buffer = RecordingBuffer(make_app(), outages=10)
+    buffer._flush(list(range(4)))
+    assert buffer.written == []
+    assert len(buffer.attempts) == 4
+    assert buffer.get_stats()['failed_rows'] == 4
+
+
+def test_flush_isolates_bad_rows():
+    bad = {3: ValueError('bad date'), 6: LostConnection(1366, 'Incorrect decimal value')}
+    buffer = RecordingBuffer(make_app(), fail=bad)
+    buffer._flush(list(range(10)))
+    assert sorted(buffer.written) == [0, 1, 2, 4, 5, 7, 8, 9]
+    stats = buffer.get_stats()
+    assert (stats['flushed_rows'], stats['failed_rows']) == (8, 2)
+
+
+def test_queued_rows_are_flushed_on_stop():
+    buffer = RecordingBuffer(make_app())
+    for row in range(25):
+        buffer.put(row)
+    buffer.stop()
+    assert buffer.written == list(range(25))
+    assert not any(thread.name == 'write-buffer-flusher' for thread in threading.enumerate())
+
+
+def test_disabled_buffer_does_not_start():
+    buffer = WriteBuffer(make_app(INGEST_WRITE_BEHIND=False))
+    assert not buffer.enabled
+    assert buffer.get_stats()['queue_depth'] == 0
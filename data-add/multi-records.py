@@ -1,80 +1,296 @@
-import requests
+import argparse
+import asyncio
+import json
+import math
+import os
 import random
 import time
 
-# API endpoints
-LOGIN_URL = "http://52.91.221.166:5000/login"
-CREATE_DATA_URL = "http://52.91.221.166:5000/create-data"
+import aiohttp
 
-# User credentials
-username = "admin1"
-password = "123456"
+# Simulates many field devices posting readings to the backend at once.
+#
+#   pip install -r requirements.txt
+#   WATER360_USERNAME=... WATER360_PASSWORD=... python multi-records.py \
+#       --base-url http://localhost:5000 --devices 2000 \
+#       --rate 500 --duration 120 --gateway-share 0.2 --batch-size 50
+#
+# It targets a local backend unless --base-url (or WATER360_BASE_URL) says
+# otherwise; only point it at a server you are allowed to load. It logs in
+# with --username/--password (or WATER360_USERNAME/WATER360_PASSWORD), or
+# uses --token as is.
+#
+# Every device reports on a fixed schedule (open loop): a slow response does
+# not delay its next reading, so latency is measured from when the reading
+# was due, including any wait for a free connection. Devices share one pool
+# of keep-alive connections. Gateways collect --batch-size readings and send
+# them in one request to /create-data/batch; other devices post each reading
+# to /create-data.
 
-def login_and_get_token(username, password):
-    login_payload = {
-        "username": username,
-        "password": password
-    }
-    try:
-        response = requests.post(LOGIN_URL, json=login_payload)
-        if response.status_code == 200:
-            token = response.json().get('token')
-            if token:
-                print("Login successful. Token obtained.")
-                return token
-            else:
-                print("Login failed: Token not found in response.")
-                return None
+DEFAULT_BASE_URL = os.getenv('WATER360_BASE_URL', 'http://localhost:5000')
+
+# Ranges for random values
+ph_value_range = (5, 10)
+temperature_range = (1, 33)
+turbidity_range = (1, 10)
+locations = ["US", "UK", "LK", "IN"]
+
+# Upper bounds (ms) of the latency histogram buckets
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+class PathStats:
+    def __init__(self, path):
+        self.path = path
+        self.requests = 0
+        self.readings = 0
+        self.ok = 0
+        self.ok_readings = 0
+        self.errors = {}
+        # From when the request was due, and from when it went out
+        self.latencies_ms = []
+        self.service_ms = []
+
+    def record(self, readings, status, due, sent, done):
+        self.requests += 1
+        self.readings += readings
+        if status in (200, 201):
+            self.ok += 1
+            self.ok_readings += readings
+            self.latencies_ms.append((done - due) * 1000)
+            self.service_ms.append((done - sent) * 1000)
         else:
-            print(f"Login failed with status code {response.status_code}: {response.text}")
-            return None
-    except Exception as e:
-        print(f"Exception during login: {e}")
-        return None
+            self.errors[str(status)] = self.errors.get(str(status), 0) + 1
 
-def add_multiple_records(token):
-    # Ranges for random values
-    ph_value_range = (5, 10)
-    temperature_range = (1, 33)
-    turbidity_range = (1, 10)
-    locations = ["US", "UK", "LK", "IN"]
+    def report(self, elapsed):
+        failed = self.requests - self.ok
+        return {
+            'path': self.path,
+            'requests': self.requests,
+            'ok': self.ok,
+            'errors': self.errors,
+            'error_rate': round(failed / self.requests, 4) if self.requests else 0.0,
+            'requests_per_second': round(self.ok / elapsed, 1),
+            'readings_per_second': round(self.ok_readings / elapsed, 1),
+            'latency_ms': percentiles(self.latencies_ms),
+            'service_time_ms': percentiles(self.service_ms),
+            'histogram': histogram(self.latencies_ms),
+        }
 
-    # User input for rows per location
-    user_count = 2  # You can change this value as needed
 
-    headers = {
-        "Authorization": f"Bearer {token}"
-    }
+class Simulation:
+    def __init__(self, args, session, token):
+        self.args = args
+        self.session = session
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.stats = {'/create-data': PathStats('/create-data'),
+                      '/create-data/batch': PathStats('/create-data/batch')}
+        self.in_flight = set()
+        self.dropped = 0
+        self.due_readings = 0
+
+    def send(self, path, payload, readings, due):
+        if len(self.in_flight) >= self.args.max_in_flight:
+            # The client itself is saturated; count it rather than queue forever
+            self.dropped += readings
+            return
+        task = asyncio.ensure_future(self.post(path, payload, readings, due))
+        self.in_flight.add(task)
+        task.add_done_callback(self.in_flight.discard)
 
-    for location in locations:
-        for _ in range(user_count):
-            # Generate random values
-            ph_value = round(random.uniform(*ph_value_range), 1)
-            temperature = round(random.uniform(*temperature_range), 1)
-            turbidity = round(random.uniform(*turbidity_range), 1)
+    async def post(self, path, payload, readings, due):
+        sent = time.monotonic()
+        try:
+            async with self.session.post(self.args.base_url + path, json=payload, headers=self.headers) as response:
+                await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = type(e).__name__
+        self.stats[path].record(readings, status, due, sent, time.monotonic())
 
-            # Prepare the data payload
-            data = {
+    async def device(self, index, rng, started, deadline):
+        args = self.args
+        location = locations[index % len(locations)]
+        gateway = index < round(args.devices * args.gateway_share)
+        # Each device keeps its own schedule, spread over one interval so
+        # they do not all fire together
+        interval = args.interval * rng.uniform(1 - args.interval_spread, 1 + args.interval_spread)
+        next_at = started + rng.uniform(0, interval)
+        pending = []
+
+        while next_at < deadline:
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            reading = {
                 "location": location,
-                "ph_value": ph_value,
-                "temperature": temperature,
-                "turbidity": turbidity
+                "ph_value": round(rng.uniform(*ph_value_range), 1),
+                "temperature": round(rng.uniform(*temperature_range), 1),
+                "turbidity": round(rng.uniform(*turbidity_range), 1),
             }
+            self.due_readings += 1
+            if gateway:
+                # Gateways send the time each reading was taken
+                taken = time.localtime(time.time() - (time.monotonic() - next_at))
+                reading["date"] = time.strftime('%Y-%m-%d', taken)
+                reading["time"] = time.strftime('%H:%M:%S', taken)
+                pending.append(reading)
+                if len(pending) >= args.batch_size:
+                    self.send('/create-data/batch', pending, len(pending), next_at)
+                    pending = []
+            else:
+                self.send('/create-data', reading, 1, next_at)
+            jitter = rng.uniform(-args.jitter, args.jitter) if args.jitter else 0.0
+            next_at += max(0.001, interval + jitter)
+        if pending:
+            self.send('/create-data/batch', pending, len(pending), time.monotonic())
+
+    async def progress(self, started, deadline):
+        last_ok, last_at = 0, started
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.args.report_every)
+            now = time.monotonic()
+            ok = sum(s.ok_readings for s in self.stats.values())
+            failed = sum(s.requests - s.ok for s in self.stats.values())
+            print(f"[{now - started:6.1f}s] {(ok - last_ok) / (now - last_at):8.1f} readings/s  "
+                  f"in flight {len(self.in_flight):5d}  failed requests {failed}  dropped {self.dropped}", flush=True)
+            last_ok, last_at = ok, now
+
+    async def run(self):
+        args = self.args
+        started = time.monotonic()
+        deadline = started + args.duration
+        reporter = asyncio.ensure_future(self.progress(started, deadline))
+        await asyncio.gather(*(
+            self.device(i, random.Random(args.seed * 100003 + i), started, deadline)
+            for i in range(args.devices)
+        ))
+        reporter.cancel()
+        # Let requests already sent finish; they count towards the results
+        if self.in_flight:
+            await asyncio.wait(self.in_flight, timeout=args.drain_timeout)
+        return time.monotonic() - started
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def at(q):
+        return round(ordered[min(len(ordered) - 1, int(math.ceil(q * len(ordered))) - 1)], 2)
+
+    return {'p50': at(0.50), 'p90': at(0.90), 'p99': at(0.99), 'p999': at(0.999),
+            'max': round(ordered[-1], 2), 'mean': round(sum(ordered) / len(ordered), 2)}
+
+
+def histogram(values):
+    counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    for value in values:
+        for i, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f'<= {bound} ms' for bound in HISTOGRAM_BOUNDS_MS] + [f'> {HISTOGRAM_BOUNDS_MS[-1]} ms']
+    return dict(zip(labels, counts))
+
+
+def print_report(report):
+    print(f"\nTarget {report['target_readings_per_second']:.1f} readings/s, "
+          f"achieved {report['achieved_readings_per_second']:.1f} over {report['elapsed_seconds']:.1f}s "
+          f"({report['devices']} devices, {report['dropped_readings']} readings dropped by the client)")
+    for stats in report['paths']:
+        if not stats['requests']:
+            continue
+        print(f"\n{stats['path']}: {stats['requests']} requests, {stats['ok']} ok, "
+              f"error rate {stats['error_rate'] * 100:.2f}%, {stats['requests_per_second']} req/s, "
+              f"{stats['readings_per_second']} readings/s")
+        if stats['errors']:
+            print(f"  errors: {stats['errors']}")
+        if stats['latency_ms']:
+            latency = stats['latency_ms']
+            print(f"  latency from due time (ms): p50 {latency['p50']}  p90 {latency['p90']}  "
+                  f"p99 {latency['p99']}  p99.9 {latency['p999']}  max {latency['max']}")
+            service = stats['service_time_ms']
+            print(f"  service time (ms):          p50 {service['p50']}  p90 {service['p90']}  "
+                  f"p99 {service['p99']}  p99.9 {service['p999']}  max {service['max']}")
+            total = max(stats['ok'], 1)
+            for label, count in stats['histogram'].items():
+                if count:
+                    print(f"  {label:>12} {count:8d} {'#' * max(1, round(40 * count / total))}")
+
+
+async def login(session, base_url, username, password):
+    async with session.post(f"{base_url}/login", json={"username": username, "password": password}) as response:
+        body = await response.json(content_type=None)
+        if response.status != 200 or not body.get('token'):
+            raise SystemExit(f"Login failed with status code {response.status}: {body}")
+        return body['token']
+
+
+async def main(args):
+    # One pool of keep-alive connections shared by every device
+    connector = aiohttp.TCPConnector(limit=args.connections, keepalive_timeout=60)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        token = args.token or await login(session, args.base_url, args.username, args.password)
+        simulation = Simulation(args, session, token)
+        elapsed = await simulation.run()
+
+    paths = [stats.report(elapsed) for stats in simulation.stats.values()]
+    report = {
+        'devices': args.devices,
+        'interval_seconds': args.interval,
+        'target_readings_per_second': round(args.devices / args.interval, 1),
+        'achieved_readings_per_second': round(sum(s.ok_readings for s in simulation.stats.values()) / elapsed, 1),
+        'due_readings': simulation.due_readings,
+        'dropped_readings': simulation.dropped,
+        'elapsed_seconds': round(elapsed, 2),
+        'paths': paths,
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
 
-            try:
-                response = requests.post(CREATE_DATA_URL, json=data, headers=headers)
-                if response.status_code == 201:
-                    print(f"Data inserted successfully: {data}")
-                else:
-                    print(f"Error inserting data: {response.status_code}, {response.text}")
-            except Exception as e:
-                print(f"Exception occurred: {e}")
+def parse_args():
+    parser = argparse.ArgumentParser(description='Simulate many devices posting readings concurrently.')
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL)
+    parser.add_argument('--username', default=os.getenv('WATER360_USERNAME'))
+    parser.add_argument('--password', default=os.getenv('WATER360_PASSWORD'))
+    parser.add_argument('--token', help='Use this bearer token instead of logging in')
+    parser.add_argument('--devices', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds between readings of one device')
+    parser.add_argument('--rate', type=float, help='Target readings/s across all devices; sets --interval')
+    parser.add_argument('--interval-spread', type=float, default=0.1,
+                        help='Device intervals vary by up to this fraction of --interval')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random +/- seconds added to each send')
+    parser.add_argument('--gateway-share', type=float, default=0.0,
+                        help='Fraction of devices that batch readings to /create-data/batch')
+    parser.add_argument('--batch-size', type=int, default=50, help='Readings per gateway request')
+    parser.add_argument('--duration', type=float, default=60)
+    parser.add_argument('--connections', type=int, default=100, help='Keep-alive connections shared by all devices')
+    parser.add_argument('--max-in-flight', type=int, default=10000, help='Requests outstanding before readings are dropped')
+    parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request counts as failed')
+    parser.add_argument('--drain-timeout', type=float, default=30, help='Seconds to wait for in-flight requests at the end')
+    parser.add_argument('--report-every', type=float, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the report as JSON to this file')
+    args = parser.parse_args()
+    if args.rate:
+        args.interval = args.devices / args.rate
+    if args.devices < 1 or args.interval <= 0:
+        parser.error('--devices and the interval must be positive')
+    if not 0 <= args.gateway_share <= 1 or not 0 <= args.interval_spread < 1 or args.batch_size < 1:
+        parser.error('--gateway-share must be within 0-1, --interval-spread below 1 and --batch-size positive')
+    if not args.token and not (args.username and args.password):
+        parser.error('give --token, or --username and --password (or WATER360_USERNAME/WATER360_PASSWORD)')
+    args.base_url = args.base_url.rstrip('/')
+    return args
 
-            # Wait 100 milliseconds before the next POST request
-            #time.sleep(0.1)
-            time.sleep(1)
 
 if __name__ == "__main__":
-    token = login_and_get_token(username, password)
-    if token:
-        add_multiple_records(token)
+    asyncio.run(main(parse_args()))